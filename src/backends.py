@@ -0,0 +1,364 @@
+import importlib.util
+import logging
+
+# Порядок предпочтения при автоматическом выборе: от быстрого к медленному
+AUTO_BACKEND = "auto"
+BACKEND_PRIORITY = ("selectolax", "lxml", "bs4")
+# Адаптеры, которые дают те же записи, что и bs4, на наборе benchmarks/equivalence_corpus.
+# Режим auto выбирает только из них: остальные используются, лишь если указаны явно
+EQUIVALENT_BACKENDS = frozenset(("bs4",))
+# Пометка для остальных адаптеров в интерфейсе, справке и журнале
+NOT_EQUIVALENT_NOTE = "результаты могут отличаться"
+
+# Элементы, текст которых не входит в текст строки (как в BeautifulSoup.get_text)
+HIDDEN_TEXT_ELEMENTS = frozenset(('script', 'style', 'template'))
+
+
+class DocumentBackend:
+    """Базовый класс адаптера HTML-документа.
+
+    Экстракторы HtmlParser работают только через методы адаптера, поэтому
+    одни и те же правила разбора выполняются на любой библиотеке. Семантика
+    методов повторяет BeautifulSoup с построителем 'html.parser'. Само дерево
+    строит библиотека: на разметке с ошибками (незакрытые TR/TD, элементы
+    внутри TABLE вне ячеек, TR без TABLE) деревья разных библиотек
+    различаются, и результат разбора может отличаться от bs4.
+    """
+
+    name = None
+
+    def parse(self, content):
+        """Строит документ из строки HTML и возвращает его корень."""
+        raise NotImplementedError
+
+    def iter_elements(self, root, tags):
+        """Перебирает потомков root с указанными именами в порядке документа."""
+        raise NotImplementedError
+
+    def tag_name(self, element):
+        """Имя тега в нижнем регистре."""
+        raise NotImplementedError
+
+    def get_attr(self, element, name):
+        """Значение атрибута или None."""
+        raise NotImplementedError
+
+    def parent(self, element):
+        """Родительский элемент."""
+        raise NotImplementedError
+
+    def find_next(self, element, tag):
+        """Первый элемент с именем tag после начала element (включая потомков)."""
+        raise NotImplementedError
+
+    def iter_children(self, element):
+        """Перебирает дочерние узлы: строки для текстовых узлов, элементы как есть.
+
+        Комментарии и служебные узлы пропускаются.
+        """
+        raise NotImplementedError
+
+    def iter_strings(self, element):
+        """Перебирает текстовые узлы элемента, кроме комментариев и скриптов."""
+        if self.tag_name(element) in HIDDEN_TEXT_ELEMENTS:
+            return
+
+        # Обход без рекурсии: незакрытые теги дают очень глубокие деревья
+        stack = [iter(self.iter_children(element))]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+            elif isinstance(child, str):
+                yield child
+            elif self.tag_name(child) not in HIDDEN_TEXT_ELEMENTS:
+                stack.append(iter(self.iter_children(child)))
+
+    def table_rows(self, table):
+        """Возвращает строки таблицы как списки ячеек [части текста, colspan, rowspan].
+
+        Строка таблицы — tr, ближайшая таблица-предок которого table; ячейка —
+        td/th, ближайший tr-предок которого эта строка. Так разбираются и
+        таблицы с незакрытыми тегами, где строки вложены друг в друга. Текст
+        вложенных таблиц входит в текст ячейки, но их строки не учитываются.
+        Элемент br дает в тексте ячейки перевод строки, как в pandas.read_html.
+        """
+        rows = []
+        # (дочерние узлы, текущая строка, текущая ячейка, внутри вложенной таблицы)
+        stack = [(iter(self.iter_children(table)), None, None, False)]
+        while stack:
+            children, row, cell, nested = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+
+            if isinstance(child, str):
+                if cell is not None:
+                    cell[0].append(child)
+                continue
+
+            tag = self.tag_name(child)
+            if tag in HIDDEN_TEXT_ELEMENTS:
+                continue
+            if tag == 'br' and cell is not None:
+                cell[0].append('\n')
+
+            if not nested:
+                if tag == 'table':
+                    nested = True
+                elif tag == 'tr':
+                    row = []
+                    rows.append(row)
+                    cell = None
+                elif tag in ('td', 'th'):
+                    if row is None:
+                        cell = None
+                    else:
+                        cell = [[], int(self.get_attr(child, 'colspan') or 1),
+                                int(self.get_attr(child, 'rowspan') or 1)]
+                        row.append(cell)
+
+            stack.append((iter(self.iter_children(child)), row, cell, nested))
+
+        return rows
+
+    def row_text(self, element):
+        """Текст элемента как get_text(separator=' ', strip=True)."""
+        return ' '.join(text for text in (string.strip() for string in self.iter_strings(element)) if text)
+
+    def text(self, element):
+        """Текст элемента как свойство text в BeautifulSoup."""
+        return ''.join(self.iter_strings(element))
+
+    def find_all_by_class(self, element, tag, class_name):
+        """Потомки element с именем tag, у которых есть класс class_name."""
+        return [
+            child for child in self.iter_elements(element, (tag,))
+            if class_name in (self.get_attr(child, 'class') or '').split()
+        ]
+
+
+class Bs4Backend(DocumentBackend):
+    """Адаптер BeautifulSoup со встроенным построителем 'html.parser'."""
+
+    name = "bs4"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup, CData, NavigableString, Tag
+        self._soup_class = BeautifulSoup
+        self._tag_class = Tag
+        # Типы строк, входящие в текст (без комментариев, скриптов и т.п.)
+        self._text_types = (NavigableString, CData)
+
+    def parse(self, content):
+        return self._soup_class(content, 'html.parser')
+
+    def iter_elements(self, root, tags):
+        for element in root.descendants:
+            if isinstance(element, self._tag_class) and element.name in tags:
+                yield element
+
+    def tag_name(self, element):
+        return element.name
+
+    def get_attr(self, element, name):
+        value = element.get(name)
+        # Многозначные атрибуты (class) BeautifulSoup хранит списком
+        if isinstance(value, list):
+            return ' '.join(value)
+        return value
+
+    def parent(self, element):
+        return element.parent
+
+    def find_next(self, element, tag):
+        # У корня документа нет цепочки next_element, ищем среди потомков
+        if isinstance(element, self._soup_class):
+            return element.find(tag)
+        return element.find_next(tag)
+
+    def iter_children(self, element):
+        for child in element.children:
+            if isinstance(child, self._tag_class):
+                yield child
+            elif type(child) in self._text_types:
+                yield child
+
+    def iter_strings(self, element):
+        return element.strings
+
+    def row_text(self, element):
+        return element.get_text(separator=' ', strip=True)
+
+    def text(self, element):
+        return element.text
+
+    def find_all_by_class(self, element, tag, class_name):
+        return element.find_all(tag, class_=class_name)
+
+
+class LxmlBackend(DocumentBackend):
+    """Адаптер lxml.html (libxml2).
+
+    libxml2 закрывает незакрытые TR и TD, поэтому строки таблиц не вложены
+    друг в друга, как в html.parser, и текст строки (имя компьютера, ОС)
+    может отличаться от bs4.
+    """
+
+    name = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self._html = lxml.html
+        self._etree = etree
+
+    def parse(self, content):
+        try:
+            return self._html.document_fromstring(content)
+        except (self._etree.ParserError, ValueError):
+            # Пустой или нераспознанный документ
+            return self._html.document_fromstring("<html></html>")
+
+    def iter_elements(self, root, tags):
+        return root.iterdescendants(*tags)
+
+    def tag_name(self, element):
+        return element.tag
+
+    def get_attr(self, element, name):
+        return element.get(name)
+
+    def parent(self, element):
+        return element.getparent()
+
+    def find_next(self, element, tag):
+        found = element.xpath(f'(descendant::{tag} | following::{tag})[1]')
+        return found[0] if found else None
+
+    def iter_children(self, element):
+        if element.text:
+            yield element.text
+        for child in element:
+            # Комментарии и инструкции обработки: пропускаем текст, но не хвост
+            if isinstance(child.tag, str):
+                yield child
+            if child.tail:
+                yield child.tail
+
+
+class SelectolaxBackend(DocumentBackend):
+    """Адаптер selectolax (движок lexbor).
+
+    lexbor строит дерево по правилам HTML5: закрывает незакрытые TR и TD,
+    выносит перед таблицей элементы, стоящие в TABLE вне ячеек (в том числе
+    якоря разделов), и отбрасывает теги TR и TD вне таблиц.
+    """
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser_class = LexborHTMLParser
+
+    def parse(self, content):
+        return self._parser_class(content).root
+
+    def iter_elements(self, root, tags):
+        elements = root.traverse()
+        next(elements)  # Первым traverse() возвращает сам root
+        for element in elements:
+            if element.tag in tags:
+                yield element
+
+    def tag_name(self, element):
+        return element.tag
+
+    def get_attr(self, element, name):
+        return element.attributes.get(name)
+
+    def parent(self, element):
+        return element.parent
+
+    def find_next(self, element, tag):
+        # Потомки элемента
+        for child in self.iter_elements(element, (tag,)):
+            return child
+        # Следующие соседи элемента и его предков
+        node = element
+        while node is not None:
+            sibling = node.next
+            while sibling is not None:
+                for child in sibling.traverse():
+                    if child.tag == tag:
+                        return child
+                sibling = sibling.next
+            node = node.parent
+        return None
+
+    def iter_children(self, element):
+        child = element.child
+        while child is not None:
+            if child.is_text_node:
+                yield child.text_content
+            elif child.is_element_node:
+                yield child
+            child = child.next
+
+
+# Реестр адаптеров: имя -> (модуль для проверки наличия, класс)
+BACKENDS = {
+    Bs4Backend.name: ("bs4", Bs4Backend),
+    LxmlBackend.name: ("lxml", LxmlBackend),
+    SelectolaxBackend.name: ("selectolax", SelectolaxBackend),
+}
+
+
+def is_backend_available(name):
+    """Проверяет, установлена ли библиотека адаптера."""
+    if name not in BACKENDS:
+        return False
+    module_name, _ = BACKENDS[name]
+    return importlib.util.find_spec(module_name) is not None
+
+
+def available_backends():
+    """Возвращает имена установленных адаптеров в порядке предпочтения."""
+    return [name for name in BACKEND_PRIORITY if is_backend_available(name)]
+
+
+def backend_label(name):
+    """Название адаптера для выбора в интерфейсе: с пометкой, если записи могут отличаться от bs4."""
+    if name == AUTO_BACKEND or name in EQUIVALENT_BACKENDS:
+        return name
+    return f"{name} ({NOT_EQUIVALENT_NOTE})"
+
+
+def resolve_backend_name(name=None):
+    """Определяет адаптер, который будет использован.
+
+    'auto' или None — самый быстрый из установленных адаптеров, результаты
+    которых совпадают с bs4 (EQUIVALENT_BACKENDS). Если запрошенная
+    библиотека не установлена, выполняется откат на bs4.
+    """
+    if name in (None, AUTO_BACKEND):
+        for backend in available_backends():
+            if backend in EQUIVALENT_BACKENDS:
+                return backend
+        return Bs4Backend.name
+
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный парсер: {name}. Доступны: {', '.join(BACKENDS)}")
+
+    if not is_backend_available(name):
+        logging.warning(f"Библиотека для парсера {name} не установлена. Используется bs4")
+        return Bs4Backend.name
+
+    return name
+
+
+def get_backend(name=None):
+    """Создает адаптер документа по имени (с автоматическим откатом на bs4)."""
+    _, backend_class = BACKENDS[resolve_backend_name(name)]
+    return backend_class()
@@ -0,0 +1,117 @@
+"""Проверка HTML-парсеров на отчетах с разметкой, которую библиотеки разбирают по-разному.
+
+В equivalence_corpus собраны отчеты с незакрытыми TR/TD, якорями разделов
+внутри TABLE, строками таблиц без TABLE, объединенными ячейками
+(colspan/rowspan) и BR внутри ячеек. Записи эталона (bs4, полный DOM)
+сравниваются с сохраненными в expected.json, а записи каждого
+установленного парсера в обычном и потоковом режимах — с эталоном
+(compare_backends).
+
+Парсеры из backends.EQUIVALENT_BACKENDS (только из них выбирает режим auto)
+обязаны совпадать с эталоном. Расхождения остальных выводятся для сведения:
+парсер можно добавить в EQUIVALENT_BACKENDS, только когда их не останется.
+
+Запуск из каталога src:
+    python benchmarks/equivalence.py
+    python benchmarks/equivalence.py --save-expected   # после намеренного изменения правил разбора
+
+Код завершения 1, если эталон не совпал с expected.json или расходится парсер из EQUIVALENT_BACKENDS.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCHMARKS_DIR)
+DEFAULT_CORPUS_DIR = os.path.join(BENCHMARKS_DIR, "equivalence_corpus")
+EXPECTED_FILE = "expected.json"
+
+sys.path.insert(0, SRC_DIR)
+from backends import EQUIVALENT_BACKENDS, available_backends  # noqa: E402
+from html_parser import HtmlParser, compare_backends, find_html_files  # noqa: E402
+
+
+def reference_records(directory):
+    """Записи эталона (bs4, полный DOM) по именам файлов, в том виде, в каком они хранятся в JSON."""
+    parser = HtmlParser(directory, backend='bs4')
+    records = {}
+    for file_path in sorted(find_html_files(directory)):
+        data = parser.parse_html_file(file_path)
+        records[data['file_name']] = json.loads(json.dumps(data, ensure_ascii=False))
+    return records
+
+
+def record_differences(expected, actual):
+    """Расхождения эталона с expected.json: (имя файла, поле или None, если файла нет в одном из наборов)."""
+    differences = []
+    for file_name in sorted(expected.keys() | actual.keys()):
+        if file_name not in expected or file_name not in actual:
+            differences.append((file_name, None))
+            continue
+        for field in sorted(expected[file_name].keys() | actual[file_name].keys()):
+            if expected[file_name].get(field) != actual[file_name].get(field):
+                differences.append((file_name, field))
+    return differences
+
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description="Проверка HTML-парсеров на отчетах с трудной разметкой")
+    parser.add_argument('--corpus-dir', default=DEFAULT_CORPUS_DIR, help="Директория с отчетами и expected.json")
+    parser.add_argument(
+        '--save-expected',
+        action='store_true',
+        help="Сохранить записи эталона в expected.json вместо проверки"
+    )
+    parser.add_argument('-v', '--verbose', action='store_true', help="Выводить журнал разбора")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    expected_path = os.path.join(args.corpus_dir, EXPECTED_FILE)
+    records = reference_records(args.corpus_dir)
+    if args.save_expected:
+        with open(expected_path, 'w', encoding='utf-8', newline='\n') as file:
+            json.dump(records, file, ensure_ascii=False, indent=2)
+            file.write("\n")
+        print(f"Записи эталона сохранены в {expected_path} ({len(records)} отчетов)")
+        return 0
+
+    with open(expected_path, 'r', encoding='utf-8') as file:
+        expected = json.load(file)
+
+    passed = True
+    differences = record_differences(expected, records)
+    if differences:
+        passed = False
+        print(f"Эталон (bs4) не совпадает с {EXPECTED_FILE}:")
+        for file_name, field in differences:
+            print(f"    {file_name}: {field or 'отчет отсутствует в одном из наборов'}")
+    else:
+        print(f"Эталон (bs4): {len(records)} отчетов, совпадает с {EXPECTED_FILE}")
+
+    mismatches = compare_backends(args.corpus_dir, available_backends())
+    for backend in available_backends():
+        found = sorted((file_path, streaming) for file_path, name, streaming in mismatches if name == backend)
+        required = backend in EQUIVALENT_BACKENDS
+        if not found:
+            status = "OK"
+        elif required:
+            status = "РАСХОЖДЕНИЯ"
+            passed = False
+        else:
+            status = "расхождения (в режиме auto не используется)"
+        print(f"{backend:<12} {status}")
+        for file_path, streaming in found:
+            print(f"    {os.path.basename(file_path)}{' (потоковый)' if streaming else ''}")
+
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
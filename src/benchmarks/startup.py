@@ -0,0 +1,145 @@
+"""Контроль времени запуска программы.
+
+Для каждого модуля из startup_budget.json выполняет `python -X importtime -c "import <модуль>"`
+в отдельном процессе, берет медиану времени импорта по нескольким запускам и сравнивает
+с бюджетом. Также проверяет, что при импорте не загружаются запрещенные модули
+(например, Tk в режиме командной строки или openpyxl до появления окна).
+
+Запуск из каталога src:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 10 --budget-scale 2 --top 10
+
+Код завершения 1, если бюджет превышен или загружен запрещенный модуль.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCHMARKS_DIR)
+DEFAULT_BUDGET_FILE = os.path.join(BENCHMARKS_DIR, "startup_budget.json")
+
+IMPORTTIME_PREFIX = "import time:"
+
+
+def parse_importtime(output):
+    """Разбирает вывод -X importtime.
+
+    Returns:
+        list: Кортежи (имя модуля, собственное время мкс, суммарное время мкс, вложенность)
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        fields = line[len(IMPORTTIME_PREFIX):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Строка заголовка
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return imports
+
+
+def measure_import(module, python=sys.executable):
+    """Импортирует модуль в новом процессе и возвращает данные -X importtime."""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr}")
+    return parse_importtime(result.stderr)
+
+
+def module_time_us(imports, module):
+    """Суммарное время импорта модуля верхнего уровня в микросекундах."""
+    for name, _, cumulative, depth in imports:
+        if name == module and depth <= 1:
+            return cumulative
+    raise RuntimeError(f"Модуль {module} не найден в выводе -X importtime")
+
+
+def loaded_modules(imports):
+    """Множество имен загруженных модулей верхнего уровня (до первой точки)."""
+    return {name.split('.')[0] for name, _, _, _ in imports}
+
+
+def heaviest_imports(imports, count):
+    """Самые тяжелые по собственному времени импорты."""
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:count]
+
+
+def check_module(module, budget, repeat, budget_scale=1.0):
+    """Измеряет время импорта модуля и сверяет его с бюджетом."""
+    runs = [measure_import(module) for _ in range(repeat)]
+    times_ms = [module_time_us(imports, module) / 1000 for imports in runs]
+    median_ms = statistics.median(times_ms)
+    budget_ms = budget['budget_ms'] * budget_scale
+
+    forbidden = sorted(loaded_modules(runs[-1]) & set(budget.get('forbidden', ())))
+
+    return {
+        'module': module,
+        'description': budget.get('description', ''),
+        'median_ms': round(median_ms, 1),
+        'min_ms': round(min(times_ms), 1),
+        'budget_ms': round(budget_ms, 1),
+        'forbidden_loaded': forbidden,
+        'passed': median_ms <= budget_ms and not forbidden,
+        'imports': runs[-1],
+    }
+
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description="Контроль времени запуска (python -X importtime)")
+    parser.add_argument('--budget-file', default=DEFAULT_BUDGET_FILE, help="Файл с бюджетами времени импорта")
+    parser.add_argument('--repeat', type=int, default=5, help="Число запусков для каждого модуля")
+    parser.add_argument(
+        '--budget-scale',
+        type=float,
+        default=1.0,
+        help="Множитель бюджетов (для медленных машин)"
+    )
+    parser.add_argument('--top', type=int, default=0, help="Показать N самых тяжелых импортов каждого модуля")
+    parser.add_argument('--json', action='store_true', help="Вывести результаты в формате JSON")
+    parser.add_argument('modules', nargs='*', help="Модули для проверки (по умолчанию — все из файла бюджетов)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with open(args.budget_file, 'r', encoding='utf-8') as file:
+        budgets = json.load(file)
+
+    modules = args.modules or list(budgets)
+    results = [check_module(module, budgets[module], args.repeat, args.budget_scale) for module in modules]
+
+    if args.json:
+        print(json.dumps(
+            [{key: value for key, value in result.items() if key != 'imports'} for result in results],
+            ensure_ascii=False,
+            indent=2
+        ))
+    else:
+        for result in results:
+            status = "OK" if result['passed'] else "ПРЕВЫШЕН"
+            print(f"{result['module']:<12} {result['median_ms']:>8.1f} мс (мин. {result['min_ms']:.1f}, "
+                  f"бюджет {result['budget_ms']:.0f}) {status}  {result['description']}")
+            if result['forbidden_loaded']:
+                print(f"    загружены запрещенные модули: {', '.join(result['forbidden_loaded'])}")
+            for name, self_us, cumulative_us, _ in heaviest_imports(result['imports'], args.top):
+                print(f"    {name:<40} {self_us / 1000:>7.1f} мс (с вложенными {cumulative_us / 1000:.1f} мс)")
+
+    return 0 if all(result['passed'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
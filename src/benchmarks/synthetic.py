@@ -0,0 +1,204 @@
+"""Генератор синтетических отчетов AIDA64 для замеров производительности.
+
+Отчеты повторяют структуру настоящих: сводная таблица с именем компьютера и
+операционной системой, разделы с якорями <A NAME="...">, таблица раздела
+"installed programs" и блоки пользователей раздела "users". Файлы сохраняются
+в кодировке Windows-1251 с переводами строк CRLF. Число программ, пользователей
+и размер файла настраиваются; при одинаковом seed результат повторяется.
+
+Запуск из каталога src:
+    python benchmarks/synthetic.py каталог 1000
+    python benchmarks/synthetic.py каталог 100 --programs 300 --users 5 --size-kb 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from html import escape
+
+REPORT_ENCODING = 'Windows-1251'
+
+DEFAULT_PROGRAMS = 120
+DEFAULT_USERS = 3
+DEFAULT_SIZE_KB = 64
+DEFAULT_SUBDIRECTORIES = 10
+DEFAULT_SEED = 1
+# Доля отчетов с защитным ПО
+SECURITY_SHARE = 0.7
+
+# Описание сгенерированного набора (по нему набор переиспользуется)
+MANIFEST_FILE = "synthetic.json"
+
+PROGRAM_NAMES = (
+    "Microsoft Office профессиональный плюс 2016", "Microsoft Visual C++ 2015-2019 Redistributable (x64)",
+    "Google Chrome", "Mozilla Firefox (x64 ru)", "7-Zip 19.00 (x64)", "Adobe Acrobat Reader DC - Russian",
+    "Notepad++ (64-bit x64)", "WinRAR 6.02 (64-разрядная)", "1С:Предприятие 8 (8.3.18.1208)",
+    "Microsoft .NET Framework 4.8", "Java 8 Update 301", "VLC media player", "LibreOffice 7.1.5.2",
+    "Яндекс.Браузер", "TeamViewer", "AnyDesk", "Microsoft Edge", "PDF24 Creator", "Консультант Плюс",
+    "Справочная Правовая Система Гарант", "Git", "Python 3.9.7 (64-bit)", "FAR Manager 3 x64",
+)
+SECURITY_NAMES = (
+    "Kaspersky Endpoint Security для Windows", "Dr.Web Security Space", "ESET Endpoint Antivirus",
+    "Secret Net Studio", "ViPNet Client 4", "КриптоПро CSP", "Континент-АП 4.1",
+    "Security Studio Endpoint Protection", "Dallas Lock 8.0-K",
+)
+VERSIONS = ("16.0.4266.1001", "14.29.30133", "93.0.4577.82", "19.00", "21.007.20091", "8.3.18.1208",
+            "4.8.04084", "3.0.16", "7.1.5.2", "4.5.3.65535", "", "N/A")
+OS_NAMES = (
+    "Microsoft Windows 10 Pro 10.0.19044.1288  (Win10 21H2)",
+    "Microsoft Windows 7 Professional 6.1.7601.24544 (Win7 RTM)",
+    "Microsoft Windows 11 Pro 10.0.22000.258  (Win11 21H2)",
+    "Microsoft Windows Server 2016 Standard 10.0.14393.4651",
+)
+SECTION_TITLES = (
+    "Суммарная информация", "Имя компьютера", "DMI", "Системная плата", "ЦП", "Память", "Видео Windows",
+    "Монитор", "Хранение данных Windows", "Логические диски", "Сеть Windows", "Устройства Windows",
+    "Службы", "Автозагрузка", "Драйверы", "Переменные окружения", "Системные файлы",
+)
+USER_NAMES = ("Администратор", "Иванов И.И.", "Петров П.П.", "Сидорова А.А.", "Гость", "Operator", "Buh")
+
+CRLF = "\r\n"
+
+
+def _row(*cells):
+    return "<TR>" + "".join(f"<TD>{cell}</TD>" for cell in cells) + "</TR>"
+
+
+def _section_header(anchor, title):
+    return (f'<TABLE><TR><TD><A NAME="{anchor}"></A></TD>'
+            f'<TD CLASS="pt">{escape(title, quote=False)}</TD></TR></TABLE>')
+
+
+def generate_report(index, programs=DEFAULT_PROGRAMS, users=DEFAULT_USERS, size_kb=DEFAULT_SIZE_KB,
+                    seed=DEFAULT_SEED):
+    """Формирует текст синтетического отчета.
+
+    Args:
+        index: Номер отчета (входит в имя компьютера)
+        programs: Число строк в таблице установленных программ
+        users: Число пользователей
+        size_kb: Примерный размер файла; недостающий объем добавляется
+            разделами с параметрами системы перед таблицей программ
+        seed: Начальное значение генератора случайных чисел
+    """
+    rnd = random.Random(seed * 1000003 + index)
+    lines = [
+        '<HTML><HEAD><META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=windows-1251">'
+        '<TITLE>AIDA64 Business</TITLE></HEAD><BODY>',
+        "<TABLE>",
+        _row("Версия", "AIDA64 v6.60.5900"),
+        _row("Тип отчёта", "Мастер отчётов"),
+        _row("Компьютер", f"PC-{index:06d}"),
+        _row("Генератор", rnd.choice(USER_NAMES)),
+        _row("Операционная система", rnd.choice(OS_NAMES)),
+        _row("Дата", f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"),
+        _row("Время", f"{rnd.randint(8, 18):02d}:{rnd.randint(0, 59):02d}"),
+        "</TABLE>",
+    ]
+
+    # Разделы с параметрами системы до нужного размера
+    program_bytes = programs * 120 + users * 150 + 1024
+    size = sum(len(line) + 2 for line in lines)
+    section = 0
+    while size + program_bytes < size_kb * 1024:
+        title = SECTION_TITLES[section % len(SECTION_TITLES)]
+        block = [_section_header(f"section{section}", title), "<TABLE>"]
+        for field in range(rnd.randint(10, 40)):
+            block.append(_row("", f"{title} &amp; поле {field}", f"Значение {rnd.randint(0, 10 ** 6)}"))
+        block.append("</TABLE>")
+        lines.extend(block)
+        size += sum(len(line) + 2 for line in block)
+        section += 1
+
+    # Установленные программы: заголовок, пустая строка, строки программ
+    lines.append(_section_header("installed programs", "Установленные программы"))
+    lines.append("<TABLE>")
+    lines.append(_row("", "", "Программа", "Версия", "Размер", "GUID"))
+    lines.append(_row("", "", "", "", "", ""))
+    security = rnd.random() < SECURITY_SHARE
+    for number in range(programs):
+        if security and number % 40 == 0:
+            name = rnd.choice(SECURITY_NAMES)
+        else:
+            name = rnd.choice(PROGRAM_NAMES)
+        lines.append(_row("&nbsp;", '<IMG SRC="icon_prog.png">', escape(name, quote=False), rnd.choice(VERSIONS),
+                          f"{rnd.randint(1, 2000)} MB", f"{{{rnd.getrandbits(64):016X}}}"))
+    lines.append("</TABLE>")
+
+    # Пользователи: блок "[ имя ]" и строки свойств
+    lines.append(_section_header("users", "Пользователи"))
+    lines.append("<TABLE>")
+    for number in range(users):
+        name = USER_NAMES[number % len(USER_NAMES)]
+        lines.append(f'<TR><TD></TD><TD CLASS="dt" COLSPAN=2>[ {name} ]</TD></TR>')
+        lines.append(_row("", "Полное имя", name))
+        lines.append(_row("", "Последний вход", "2024-01-01 09:00"))
+    lines.append("</TABLE>")
+    lines.append("</BODY></HTML>")
+
+    return CRLF.join(lines) + CRLF
+
+
+def generate_corpus(directory, count, programs=DEFAULT_PROGRAMS, users=DEFAULT_USERS, size_kb=DEFAULT_SIZE_KB,
+                    subdirectories=DEFAULT_SUBDIRECTORIES, seed=DEFAULT_SEED):
+    """Создает набор отчетов в директории (по поддиректориям-отделам).
+
+    Если в директории уже есть набор с теми же параметрами, он используется
+    повторно. Returns: суммарный размер файлов в байтах.
+    """
+    manifest = {
+        'count': count,
+        'programs': programs,
+        'users': users,
+        'size_kb': size_kb,
+        'subdirectories': subdirectories,
+        'seed': seed,
+    }
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            existing = json.load(file)
+        if {key: existing.get(key) for key in manifest} == manifest:
+            return existing['bytes']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    total = 0
+    for index in range(count):
+        subdirectory = os.path.join(directory, f"Отдел {index % max(1, subdirectories) + 1:02d}")
+        os.makedirs(subdirectory, exist_ok=True)
+        data = generate_report(index, programs, users, size_kb, seed).encode(REPORT_ENCODING)
+        with open(os.path.join(subdirectory, f"PC-{index:06d}.htm"), 'wb') as file:
+            file.write(data)
+        total += len(data)
+
+    manifest['bytes'] = total
+    with open(manifest_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    return total
+
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description="Генератор синтетических отчетов AIDA64")
+    parser.add_argument('directory', help="Директория для отчетов")
+    parser.add_argument('count', type=int, help="Число отчетов")
+    parser.add_argument('--programs', type=int, default=DEFAULT_PROGRAMS, help="Программ в отчете")
+    parser.add_argument('--users', type=int, default=DEFAULT_USERS, help="Пользователей в отчете")
+    parser.add_argument('--size-kb', type=int, default=DEFAULT_SIZE_KB, help="Примерный размер отчета, КБ")
+    parser.add_argument('--subdirectories', type=int, default=DEFAULT_SUBDIRECTORIES, help="Число поддиректорий")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Начальное значение генератора")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    total = generate_corpus(args.directory, args.count, args.programs, args.users, args.size_kb,
+                            args.subdirectories, args.seed)
+    print(f"Отчетов: {args.count}, объем: {total / (1024 * 1024):.1f} МБ, директория: {args.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Замеры пропускной способности process_directory на синтетических отчетах.
+
+Для каждого размера пакета (по умолчанию 100, 1000 и 10000 файлов) создает
+набор отчетов генератором synthetic.py, запускает process_directory в
+отдельном процессе и измеряет файлы/с, МБ/с и пиковый объем памяти (вместе с
+рабочими процессами). Результаты сравниваются с базовыми из
+throughput_baseline.json: регрессией считается падение пропускной способности
+или рост пиковой памяти больше допуска.
+
+Базовые значения зависят от машины, поэтому файл не хранится в репозитории:
+сохраните его на своей машине до изменений (--save-baseline) и сравнивайте после.
+
+Запуск из каталога src:
+    python benchmarks/throughput.py --save-baseline
+    python benchmarks/throughput.py
+    python benchmarks/throughput.py --sizes 100 1000 --workers 4 --backend lxml --tolerance 0.15
+
+Наборы отчетов создаются в --corpus-dir (по умолчанию во временной директории
+пользователя) и используются повторно. Код завершения 1 при регрессии.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCHMARKS_DIR)
+DEFAULT_BASELINE_FILE = os.path.join(BENCHMARKS_DIR, "throughput_baseline.json")
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "aida64_benchmark")
+
+DEFAULT_SIZES = (100, 1000, 10000)
+# Допустимое отклонение от базовых значений
+DEFAULT_TOLERANCE = 0.2
+
+sys.path.insert(0, BENCHMARKS_DIR)
+import synthetic  # noqa: E402
+
+
+def run_key(count, args):
+    """Ключ результата в файле базовых значений: размер пакета и режим обработки."""
+    key = f"{count}/w{args.workers}/{args.backend}"
+    if args.streaming:
+        key += "/streaming"
+    return key
+
+
+def measure(directory, args):
+    """Обрабатывает набор отчетов в отдельном процессе и возвращает замеры."""
+    settings = {
+        'directory': directory,
+        'output_file': os.path.join(args.corpus_dir, "benchmark.xlsx"),
+        'workers': args.workers,
+        'backend': args.backend,
+        'streaming': args.streaming,
+    }
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', json.dumps(settings)],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Ошибка обработки набора {directory}:\n{result.stderr}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def child(settings):
+    """Выполняется в отдельном процессе: одна обработка набора отчетов."""
+    sys.path.insert(0, SRC_DIR)
+    from html_parser import process_directory
+    from metrics import peak_rss_bytes
+
+    summary = {}
+    started = time.perf_counter()
+    process_directory(
+        settings['directory'],
+        settings['output_file'],
+        workers=settings['workers'],
+        streaming=settings['streaming'],
+        backend=settings['backend'],
+        summary=summary
+    )
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'seconds': elapsed,
+        'files': summary.get('rows_written', 0),
+        'failed': summary.get('failed', 0),
+        'peak_rss_bytes': peak_rss_bytes(),
+    }))
+
+
+def benchmark(count, args):
+    """Замеры для пакета из count отчетов (лучший из нескольких запусков)."""
+    directory = os.path.join(args.corpus_dir, f"{count}_files")
+    size = synthetic.generate_corpus(directory, count, args.programs, args.users, args.size_kb)
+
+    runs = [measure(directory, args) for _ in range(args.repeat)]
+    seconds = min(run['seconds'] for run in runs)
+    if any(run['failed'] for run in runs):
+        raise RuntimeError(f"Набор {directory}: часть отчетов не разобрана")
+
+    return {
+        'files': count,
+        'megabytes': round(size / (1024 * 1024), 1),
+        'seconds': round(seconds, 3),
+        'files_per_second': round(count / seconds, 1),
+        'megabytes_per_second': round(size / seconds / (1024 * 1024), 2),
+        'peak_rss_megabytes': round(statistics.median(run['peak_rss_bytes'] or 0 for run in runs) / (1024 * 1024), 1),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Список регрессий результата относительно базового."""
+    regressions = []
+    for metric in ('files_per_second', 'megabytes_per_second'):
+        if baseline.get(metric) and result[metric] < baseline[metric] * (1 - tolerance):
+            regressions.append(f"{metric}: {result[metric]} < {baseline[metric]}")
+    if baseline.get('peak_rss_megabytes') and result['peak_rss_megabytes'] > baseline['peak_rss_megabytes'] * (1 + tolerance):
+        regressions.append(f"peak_rss_megabytes: {result['peak_rss_megabytes']} > {baseline['peak_rss_megabytes']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description="Замеры пропускной способности обработки отчетов")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Размеры пакетов")
+    parser.add_argument('--workers', type=int, default=1, help="Число рабочих процессов")
+    parser.add_argument('--backend', default='auto', help="Парсер HTML")
+    parser.add_argument('--streaming', action='store_true', help="Потоковый разбор")
+    parser.add_argument('--repeat', type=int, default=1, help="Число запусков для каждого размера (берется лучший)")
+    parser.add_argument('--programs', type=int, default=synthetic.DEFAULT_PROGRAMS, help="Программ в отчете")
+    parser.add_argument('--users', type=int, default=synthetic.DEFAULT_USERS, help="Пользователей в отчете")
+    parser.add_argument('--size-kb', type=int, default=synthetic.DEFAULT_SIZE_KB, help="Размер отчета, КБ")
+    parser.add_argument('--corpus-dir', default=DEFAULT_CORPUS_DIR, help="Директория наборов отчетов")
+    parser.add_argument('--baseline-file', default=DEFAULT_BASELINE_FILE, help="Файл базовых значений")
+    parser.add_argument('--save-baseline', action='store_true', help="Сохранить результаты как базовые")
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Допустимое отклонение от базовых значений (доля)"
+    )
+    parser.add_argument('--json', action='store_true', help="Вывести результаты в формате JSON")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        child(json.loads(args.child))
+        return 0
+
+    try:
+        with open(args.baseline_file, 'r', encoding='utf-8') as file:
+            baselines = json.load(file)
+    except FileNotFoundError:
+        baselines = {}
+
+    results = {}
+    failed = False
+    for count in args.sizes:
+        key = run_key(count, args)
+        result = benchmark(count, args)
+        baseline = baselines.get(key)
+        result['regressions'] = compare(result, baseline, args.tolerance) if baseline else []
+        failed = failed or bool(result['regressions'])
+        results[key] = result
+
+        if not args.json:
+            status = "РЕГРЕССИЯ" if result['regressions'] else ("OK" if baseline else "нет базы")
+            print(f"{key:<28} {result['files_per_second']:>8.1f} файлов/с {result['megabytes_per_second']:>7.2f} МБ/с "
+                  f"{result['peak_rss_megabytes']:>7.1f} МБ памяти  {status}")
+            for regression in result['regressions']:
+                print(f"    {regression}")
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+    if args.save_baseline:
+        for key, result in results.items():
+            baselines[key] = {name: value for name, value in result.items() if name != 'regressions'}
+        with open(args.baseline_file, 'w', encoding='utf-8') as file:
+            json.dump(baselines, file, ensure_ascii=False, indent=2)
+        print(f"Базовые значения сохранены в файл: {args.baseline_file}")
+        return 0
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
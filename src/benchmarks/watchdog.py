@@ -0,0 +1,143 @@
+"""Проверка сторожа пула разбора: зависший отчет не задерживает остальные.
+
+Создает набор синтетических отчетов (synthetic.py) и именованный канал
+(FIFO) с расширением .htm: открытие канала на чтение не завершается, пока
+в него никто не пишет, — так выглядит зависший разбор. Канал передается
+на разбор первым, за ним обычные отчеты.
+
+Проверяется, что:
+  * все обычные отчеты разобраны раньше, чем истек предел времени разбора
+    канала (остальные процессы пула не простаивают);
+  * канал попадает в ошибки с превышением времени, а обычные отчеты
+    разобраны один раз и без ошибок;
+  * _parse_files отдает результаты в порядке файлов, а вся обработка
+    занимает немногим больше предела времени.
+
+Только для POSIX: в Windows именованные каналы не создаются в файловой системе.
+
+Запуск из каталога src:
+    python benchmarks/watchdog.py
+    python benchmarks/watchdog.py --files 100 --workers 4 --file-timeout 10
+
+Код завершения 1, если проверка не прошла.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+DEFAULT_FILES = 40
+DEFAULT_WORKERS = 2
+DEFAULT_FILE_TIMEOUT = 5.0
+# Отчеты меньше обычных: проверяется сторож, а не скорость разбора
+DEFAULT_SIZE_KB = 16
+# Сколько времени сверх предела допускается на всю обработку, секунд
+SLACK_SECONDS = 3.0
+
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, SRC_DIR)
+import synthetic  # noqa: E402
+from html_parser import HtmlParser, _ParsePool, _parse_files, find_html_files  # noqa: E402
+
+
+def check_pool(parser, hang_path, report_paths, workers, file_timeout):
+    """Обычные отчеты разбираются, пока канал висит. Returns: список ошибок проверки."""
+    problems = []
+    pool = _ParsePool(parser, workers, file_timeout)
+    try:
+        started = time.monotonic()
+        hang_task = pool.submit(hang_path)
+        tasks = [pool.submit(file_path) for file_path in report_paths]
+        while not all(task.done() for task in tasks) and not hang_task.done():
+            pool.wait()
+        healthy_seconds = time.monotonic() - started
+
+        if hang_task.done():
+            problems.append(f"канал завершился раньше обычных отчетов ({healthy_seconds:.1f} с)")
+        else:
+            print(f"Обычные отчеты ({len(tasks)}) разобраны за {healthy_seconds:.1f} с, "
+                  f"канал еще разбирается (предел {file_timeout} с)")
+
+        _, data, error, _ = hang_task.result()
+        hang_seconds = time.monotonic() - started
+        if data is not None or not error or "Превышено время" not in error:
+            problems.append(f"канал: ожидалась ошибка превышения времени, получено {error!r}")
+        else:
+            print(f"Канал прерван через {hang_seconds:.1f} с: {error}")
+
+        failed = [(file_path, error) for file_path, data, error, _ in (task.result() for task in tasks) if data is None]
+        for file_path, error in failed:
+            problems.append(f"{os.path.basename(file_path)}: {error}")
+    finally:
+        pool.close()
+    return problems
+
+
+def check_order(parser, hang_path, report_paths, workers, file_timeout):
+    """_parse_files отдает результаты по порядку и не ждет канал дольше предела."""
+    problems = []
+    files = [hang_path, *report_paths]
+    started = time.monotonic()
+    results = list(_parse_files(parser, files, workers, file_timeout=file_timeout))
+    elapsed = time.monotonic() - started
+
+    if [result[0] for result in results] != files:
+        problems.append("результаты _parse_files не в порядке файлов")
+    if sum(1 for result in results if result[1] is not None) != len(report_paths):
+        problems.append("не все обычные отчеты разобраны")
+    if elapsed > file_timeout + SLACK_SECONDS:
+        problems.append(f"обработка заняла {elapsed:.1f} с при пределе {file_timeout} с")
+    else:
+        print(f"_parse_files: {len(files)} файлов за {elapsed:.1f} с")
+    return problems
+
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description="Проверка сторожа пула разбора на зависшем отчете")
+    parser.add_argument('--files', type=int, default=DEFAULT_FILES, help="Число обычных отчетов")
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Число процессов разбора (не меньше 2: один из них занят каналом)"
+    )
+    parser.add_argument('--file-timeout', type=float, default=DEFAULT_FILE_TIMEOUT, help="Предел времени разбора, с")
+    parser.add_argument('--size-kb', type=int, default=DEFAULT_SIZE_KB, help="Размер отчета, КБ")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Выводить журнал разбора")
+    args = parser.parse_args(argv)
+    if args.workers < 2:
+        parser.error("нужно не меньше 2 процессов разбора")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    if not hasattr(os, 'mkfifo'):
+        print("Проверка пропущена: нет именованных каналов (os.mkfifo)")
+        return 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic.generate_corpus(directory, args.files, size_kb=args.size_kb)
+        report_paths = sorted(find_html_files(directory))
+        hang_path = os.path.join(directory, "hang.htm")
+        os.mkfifo(hang_path)
+
+        parser = HtmlParser(directory)
+        problems = check_pool(parser, hang_path, report_paths, args.workers, args.file_timeout)
+        problems += check_order(parser, hang_path, report_paths, args.workers, args.file_timeout)
+
+    for problem in problems:
+        print(f"ОШИБКА: {problem}")
+    print("OK" if not problems else "Проверка не пройдена")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+# Суффикс файла кэша, создаваемого рядом с Excel отчетом
+CACHE_SUFFIX = ".parse_cache.sqlite"
+# Предельный суммарный размер сохраненных записей
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Число записей между фиксациями транзакции
+COMMIT_INTERVAL = 200
+
+DIGEST_CHUNK_SIZE = 1024 * 1024
+DIGEST_SIZE = 16
+
+
+def default_cache_path(output_file):
+    """Возвращает путь к кэшу рядом с файлом отчета."""
+    return os.path.splitext(output_file)[0] + CACHE_SUFFIX
+
+
+def content_hasher(data=b''):
+    """Объект хэша содержимого (BLAKE2b, 128 бит): данные можно добавлять частями по мере чтения."""
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE)
+
+
+def file_digest(file_path):
+    """Вычисляет хэш содержимого файла (BLAKE2b, 128 бит)."""
+    digest = content_hasher()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(DIGEST_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Постоянный кэш результатов разбора отчетов в SQLite.
+
+    Запись ищется по пути, размеру и времени изменения файла. Если файл
+    менялся (или переехал), но среди записей того же размера есть запись
+    с тем же хэшем содержимого, она тоже считается попаданием.
+
+    Кэш привязан к версии экстракторов: при открытии кэша другой версии
+    все записи удаляются. Суммарный размер записей ограничен max_bytes,
+    при превышении вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, path, version, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.version = str(version)
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        self._uncommitted = 0
+
+        import sqlite3
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                record TEXT NOT NULL,
+                record_size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS records_content ON records (size, digest);
+            CREATE INDEX IF NOT EXISTS records_last_used ON records (last_used);
+        """)
+
+        stored_version = self._connection.execute(
+            "SELECT value FROM meta WHERE key = 'version'"
+        ).fetchone()
+        if stored_version is None or stored_version[0] != self.version:
+            if stored_version is not None:
+                logging.info(f"Версия экстракторов изменилась ({stored_version[0]} -> {self.version}). "
+                             f"Кэш разбора сброшен")
+            self.invalidate()
+
+    def invalidate(self):
+        """Удаляет все записи кэша и сохраняет текущую версию экстракторов."""
+        with self._connection:
+            self._connection.execute("DELETE FROM records")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (self.version,)
+            )
+
+    def lookup(self, file_path):
+        """Возвращает сохраненный результат разбора файла или None.
+
+        Поле file_name в результат не входит: оно зависит от каталога запуска.
+        """
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, record FROM records WHERE path = ?", (key,)
+        ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            self._touch(key)
+            return self._hit(row[2])
+
+        # Хэш считаем, только если есть записи такого же размера
+        has_same_size = self._connection.execute(
+            "SELECT 1 FROM records WHERE size = ? LIMIT 1", (stat.st_size,)
+        ).fetchone()
+        if has_same_size is not None:
+            digest = file_digest(file_path)
+            row = self._connection.execute(
+                "SELECT record FROM records WHERE size = ? AND digest = ? LIMIT 1", (stat.st_size, digest)
+            ).fetchone()
+            if row is not None:
+                # Содержимое не изменилось: обновляем запись для быстрого поиска по пути
+                self._write(key, stat, digest, row[0])
+                return self._hit(row[0])
+
+        self.stats['misses'] += 1
+        return None
+
+    def store(self, file_path, data, digest=None):
+        """Сохраняет результат разбора файла.
+
+        digest — хэш содержимого, вычисленный при чтении файла; без него файл
+        читается еще раз.
+        """
+        stat = os.stat(file_path)
+        if digest is None:
+            digest = file_digest(file_path)
+
+        record = {key: value for key, value in data.items() if key != 'file_name'}
+        self._write(os.path.abspath(file_path), stat, digest, json.dumps(record, ensure_ascii=False))
+        self.stats['stored'] += 1
+
+    def close(self):
+        """Вытесняет лишние записи, фиксирует изменения и закрывает кэш."""
+        self._evict()
+        self._connection.commit()
+        self._connection.close()
+        logging.info(f"Кэш разбора: попаданий {self.stats['hits']}, промахов {self.stats['misses']}, "
+                     f"сохранено {self.stats['stored']}, вытеснено {self.stats['evicted']}")
+
+    def _hit(self, record):
+        self.stats['hits'] += 1
+        return json.loads(record)
+
+    def _touch(self, key):
+        self._connection.execute("UPDATE records SET last_used = ? WHERE path = ?", (time.time(), key))
+        self._commit_periodically()
+
+    def _write(self, key, stat, digest, record):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO records (path, size, mtime_ns, digest, record, record_size, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, stat.st_size, stat.st_mtime_ns, digest, record, len(record.encode('utf-8')), time.time())
+        )
+        self._commit_periodically()
+
+    def _commit_periodically(self):
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_INTERVAL:
+            self._connection.commit()
+            self._uncommitted = 0
+
+    def _evict(self):
+        """Удаляет давно не использованные записи сверх max_bytes."""
+        total = self._connection.execute("SELECT COALESCE(SUM(record_size), 0) FROM records").fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+
+        evicted = []
+        for path, record_size in self._connection.execute(
+                "SELECT path, record_size FROM records ORDER BY last_used"):
+            evicted.append((path,))
+            excess -= record_size
+            if excess <= 0:
+                break
+
+        self._connection.executemany("DELETE FROM records WHERE path = ?", evicted)
+        self.stats['evicted'] += len(evicted)
@@ -0,0 +1,84 @@
+import logging
+import re
+from functools import lru_cache
+
+# Ключевые слова защитного ПО по умолчанию (регистр не важен)
+SECURITY_SOFTWARE = (
+    "dallas",
+    "dr.Web",
+    "eset",
+    "kaspersky",
+    "nod",
+    "secret net",
+    "security Studio Endpoint Protection",
+    "viPNet Client",
+    "континент-АП",
+    "криптоПро"
+)
+
+# Число запоминаемых решений по различным названиям ПО
+VERDICT_CACHE_SIZE = 65536
+
+# Символ начала комментария в файле правил
+RULES_COMMENT = "#"
+
+
+def load_rules(rules_file):
+    """Читает ключевые слова защитного ПО из текстового файла.
+
+    Одно ключевое слово на строку, пустые строки и строки,
+    начинающиеся с '#', пропускаются. Файл в кодировке UTF-8.
+    """
+    rules = []
+    with open(rules_file, 'r', encoding='utf-8-sig') as file:
+        for line in file:
+            rule = line.strip()
+            if rule and not rule.startswith(RULES_COMMENT):
+                rules.append(rule)
+
+    logging.info(f"Загружено правил защитного ПО: {len(rules)} из файла {rules_file}")
+    return rules
+
+
+class SecurityClassifier:
+    """Определяет, относится ли программа к защитному ПО.
+
+    Все ключевые слова собираются в одно регулярное выражение без учета
+    регистра, поэтому название проверяется за один проход. Решения
+    запоминаются: одни и те же программы встречаются на тысячах ПК.
+    """
+
+    def __init__(self, rules=SECURITY_SOFTWARE):
+        # Ключевое слово в нижнем регистре -> правило в исходном написании
+        self._rules = {}
+        for rule in rules:
+            self._rules.setdefault(rule.casefold(), rule)
+
+        # Длинные ключевые слова раньше коротких: при совпадении в одной
+        # позиции указывается самое точное правило
+        keywords = sorted(self._rules, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(map(re.escape, keywords))) if keywords else None
+
+        self.match = lru_cache(maxsize=VERDICT_CACHE_SIZE)(self._match)
+
+    @classmethod
+    def from_file(cls, rules_file):
+        """Создает классификатор по файлу правил (см. load_rules)."""
+        return cls(load_rules(rules_file))
+
+    @property
+    def rules(self):
+        """Правила классификатора в исходном написании."""
+        return list(self._rules.values())
+
+    def is_security_software(self, software_name):
+        """Проверяет, является ли программа защитным ПО."""
+        return self.match(software_name) is not None
+
+    def _match(self, software_name):
+        """Возвращает сработавшее правило или None."""
+        if self._pattern is None:
+            return None
+
+        found = self._pattern.search(software_name.casefold())
+        return self._rules[found.group()] if found else None
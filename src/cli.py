@@ -0,0 +1,368 @@
+"""Запуск обработки отчетов AIDA64 без графического интерфейса.
+
+Предназначен для пакетных и плановых запусков (cron, планировщик задач, CI):
+не импортирует Tk и ttkbootstrap, пишет итоги в stdout в формате JSON
+и возвращает код завершения.
+
+Пример:
+    python cli.py отчеты -o результат.xlsx --workers 4 --cache
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+from backends import AUTO_BACKEND, BACKENDS, EQUIVALENT_BACKENDS, NOT_EQUIVALENT_NOTE
+from cache import default_cache_path
+from diff import default_snapshot_path
+from exporters import EXPORT_FORMATS
+from html_parser import DEFAULT_FILE_TIMEOUT, process_directory
+from journal import default_journal_path
+from metrics import PROFILERS, profiling
+from prefetch import DEFAULT_PREFETCH_BYTES, DEFAULT_PREFETCH_FILES, DEFAULT_READ_THREADS
+from shards import DEFAULT_SHARD_ROWS, DEFAULT_SHARD_WRITERS, SHARD_MODES
+
+# Коды завершения
+EXIT_OK = 0  # Все отчеты обработаны
+EXIT_PARTIAL = 1  # Отчет сохранен, но часть файлов обработать не удалось
+EXIT_USAGE = 2  # Неверные аргументы или входная директория
+EXIT_FAILURE = 3  # Обработка прервана ошибкой, отчет не сохранен
+EXIT_NO_REPORTS = 4  # В директории нет HTML отчетов
+
+DEFAULT_OUTPUT_FILE = "aida64_report.xlsx"
+
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        description="Парсер отчетов AIDA64 (без графического интерфейса)"
+    )
+    parser.add_argument('input', help="Директория с HTML отчетами AIDA64")
+    parser.add_argument(
+        '-o', '--output',
+        default=DEFAULT_OUTPUT_FILE,
+        help=f"Файл Excel отчета (по умолчанию {DEFAULT_OUTPUT_FILE})"
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Количество процессов для разбора (по умолчанию — по числу ядер)"
+    )
+    parser.add_argument(
+        '--backend',
+        choices=[AUTO_BACKEND, *BACKENDS],
+        default=AUTO_BACKEND,
+        help="HTML-парсер (если библиотека не установлена, используется bs4). "
+             f"{', '.join(name for name in BACKENDS if name not in EQUIVALENT_BACKENDS)}: "
+             f"{NOT_EQUIVALENT_NOTE} от bs4 на отчетах с ошибками разметки"
+    )
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        help="Потоковый разбор отчетов (экономия памяти)"
+    )
+    parser.add_argument(
+        '--cache',
+        nargs='?',
+        const='',
+        metavar='FILE',
+        help="Кэшировать результаты разбора. Без FILE кэш создается рядом с Excel отчетом"
+    )
+    parser.add_argument(
+        '--read-threads',
+        type=int,
+        default=DEFAULT_READ_THREADS,
+        help=f"Потоков упреждающего чтения файлов, 0 — без упреждающего чтения "
+             f"(по умолчанию {DEFAULT_READ_THREADS}). Используется только при разборе в основном "
+             f"процессе (-w 1 --file-timeout 0)"
+    )
+    parser.add_argument(
+        '--prefetch-files',
+        type=int,
+        default=DEFAULT_PREFETCH_FILES,
+        help=f"Сколько файлов читать заранее (по умолчанию {DEFAULT_PREFETCH_FILES})"
+    )
+    parser.add_argument(
+        '--prefetch-mb',
+        type=int,
+        default=DEFAULT_PREFETCH_BYTES // (1024 * 1024),
+        help=f"Предел памяти под прочитанные заранее файлы, МБ "
+             f"(по умолчанию {DEFAULT_PREFETCH_BYTES // (1024 * 1024)})"
+    )
+    parser.add_argument(
+        '--security-rules',
+        metavar='FILE',
+        help="Файл с ключевыми словами защитного ПО (по одному на строку, '#' — комментарий)"
+    )
+    parser.add_argument(
+        '--include',
+        action='append',
+        metavar='PATTERN',
+        help="Шаблон имени обрабатываемых файлов (можно указать несколько раз, по умолчанию *.htm и *.html)"
+    )
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        metavar='PATTERN',
+        help="Шаблон исключаемых файлов и директорий (имя или путь относительно входной директории)"
+    )
+    parser.add_argument(
+        '--follow-symlinks',
+        action='store_true',
+        help="Обходить символические ссылки на директории (с защитой от циклов)"
+    )
+    parser.add_argument(
+        '--no-dedup',
+        dest='deduplicate',
+        action='store_false',
+        help="Не искать копии отчетов (каждый файл разбирается и попадает в таблицу)"
+    )
+    parser.add_argument(
+        '--no-duplicates-sheet',
+        dest='duplicates_sheet',
+        action='store_false',
+        help="Не добавлять лист со списком копий отчетов"
+    )
+    parser.add_argument(
+        '--no-errors-sheet',
+        dest='errors_sheet',
+        action='store_false',
+        help="Не добавлять лист со списком файлов, которые не удалось обработать"
+    )
+    parser.add_argument(
+        '--file-timeout',
+        type=float,
+        default=DEFAULT_FILE_TIMEOUT,
+        metavar='SEC',
+        help=f"Предел времени разбора одного отчета, секунд: зависший процесс разбора завершается, "
+             f"файл попадает на лист \"Ошибки\". 0 — без предела (по умолчанию {DEFAULT_FILE_TIMEOUT})"
+    )
+    parser.add_argument(
+        '--memory-limit',
+        type=int,
+        metavar='MB',
+        help="Предел памяти процесса разбора, МБ: отчет, которому не хватило памяти, попадает "
+             "на лист \"Ошибки\""
+    )
+    parser.add_argument(
+        '--no-inventory',
+        dest='inventory',
+        action='store_false',
+        help="Не добавлять сводные листы по ПО (установки, версии, компьютеры без защитного ПО)"
+    )
+    parser.add_argument(
+        '--snapshot',
+        nargs='?',
+        const='',
+        metavar='FILE',
+        help="Сохранить снимок результатов для сравнения при следующем запуске. "
+             "Без FILE снимок создается рядом с Excel отчетом (<отчет>.snapshot.gz)"
+    )
+    parser.add_argument(
+        '--diff-with',
+        metavar='FILE',
+        help="Сравнить с снимком предыдущего запуска и вывести отличия на лист \"Изменения\". "
+             "Если файла еще нет, сравнение пропускается"
+    )
+    parser.add_argument(
+        '--journal',
+        nargs='?',
+        const='',
+        metavar='FILE',
+        help="Вести журнал обработки, чтобы прерванный запуск можно было продолжить: "
+             "повторный запуск с тем же журналом не разбирает уже обработанные отчеты. "
+             "Без FILE журнал создается рядом с Excel отчетом (<отчет>.journal.jsonl) "
+             "и удаляется после успешного сохранения"
+    )
+    parser.add_argument(
+        '--shard-by',
+        choices=SHARD_MODES,
+        help="Разбить отчет на книги-части: rows — по числу строк, folder — по папкам верхнего уровня, "
+             "os — по операционной системе. Файл отчета становится оглавлением со ссылками на части"
+    )
+    parser.add_argument(
+        '--shard-rows',
+        type=int,
+        default=DEFAULT_SHARD_ROWS,
+        help=f"Строк в части при --shard-by rows (по умолчанию {DEFAULT_SHARD_ROWS})"
+    )
+    parser.add_argument(
+        '--shard-writers',
+        type=int,
+        default=DEFAULT_SHARD_WRITERS,
+        help=f"Процессов, параллельно записывающих части (по умолчанию {DEFAULT_SHARD_WRITERS})"
+    )
+    parser.add_argument(
+        '--export',
+        action='append',
+        choices=EXPORT_FORMATS,
+        help="Дополнительно выгрузить таблицы компьютеров и ПО (<отчет>.hosts.* и <отчет>.software.*); "
+             "можно указать несколько раз. Для parquet нужна библиотека pyarrow"
+    )
+    parser.add_argument(
+        '--metrics',
+        metavar='FILE',
+        help="Сохранить замеры по каждому отчету (время фаз, объем чтения): .csv или .json"
+    )
+    parser.add_argument(
+        '--profile',
+        choices=PROFILERS,
+        help="Профилировать обработку (профилируется основной процесс; для профиля разбора укажите -w 1 --file-timeout 0)"
+    )
+    parser.add_argument(
+        '--profile-output',
+        metavar='FILE',
+        help="Файл профиля (по умолчанию aida_profile.prof для cprofile, aida_profile.html для pyinstrument)"
+    )
+    parser.add_argument(
+        '--log-file',
+        metavar='FILE',
+        help="Файл журнала (по умолчанию журнал выводится в stderr)"
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help="Подробный журнал"
+    )
+
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("количество процессов должно быть не меньше 1")
+    if args.read_threads < 0 or args.prefetch_files < 1 or args.prefetch_mb < 1:
+        parser.error("параметры упреждающего чтения должны быть положительными")
+    if args.shard_rows < 1 or args.shard_writers < 1:
+        parser.error("параметры разбиения отчета должны быть положительными")
+    if args.file_timeout < 0 or (args.memory_limit is not None and args.memory_limit < 1):
+        parser.error("пределы времени и памяти разбора должны быть положительными")
+    return args
+
+
+def configure_logging(log_file=None, verbose=False):
+    """Настройка журнала: в файл или в stderr."""
+    logging.basicConfig(
+        level=logging.INFO if verbose or log_file else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        filename=log_file,
+        filemode='a'
+    )
+
+
+def print_summary(summary):
+    """Выводит итоги обработки одной строкой JSON."""
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+def run(args):
+    """Выполняет обработку и возвращает код завершения."""
+    summary = {
+        'status': None,
+        'input': args.input,
+        'output': args.output,
+    }
+
+    if not os.path.isdir(args.input):
+        logging.error(f"Директория '{args.input}' не существует")
+        summary.update(status='error', error=f"Директория '{args.input}' не существует")
+        print_summary(summary)
+        return EXIT_USAGE
+
+    try:
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+    except OSError as e:
+        logging.error(f"Невозможно создать файл отчета: {e}")
+        summary.update(status='error', error=f"Невозможно создать файл отчета: {e}")
+        print_summary(summary)
+        return EXIT_USAGE
+
+    cache_path = None
+    if args.cache is not None:
+        cache_path = args.cache or default_cache_path(args.output)
+
+    snapshot_file = None
+    if args.snapshot is not None:
+        snapshot_file = args.snapshot or default_snapshot_path(args.output)
+
+    journal_file = None
+    if args.journal is not None:
+        journal_file = args.journal or default_journal_path(args.output)
+
+    previous_snapshot = args.diff_with
+    if previous_snapshot and not os.path.exists(previous_snapshot):
+        logging.warning(f"Снимок предыдущего запуска {previous_snapshot} не найден, сравнение пропускается")
+        previous_snapshot = None
+
+    profiler = nullcontext()
+    if args.profile:
+        profile_output = args.profile_output or (
+            "aida_profile.html" if args.profile == 'pyinstrument' else "aida_profile.prof"
+        )
+        profiler = profiling(args.profile, profile_output)
+
+    started = time.perf_counter()
+    try:
+        with profiler:
+            process_directory(
+                args.input,
+                args.output,
+                workers=args.workers,
+                streaming=args.streaming,
+                backend=args.backend,
+                cache_path=cache_path,
+                security_rules=args.security_rules,
+                summary=summary,
+                include=args.include,
+                exclude=args.exclude,
+                follow_symlinks=args.follow_symlinks,
+                deduplicate=args.deduplicate,
+                duplicates_sheet=args.duplicates_sheet,
+                read_threads=args.read_threads,
+                prefetch_files=args.prefetch_files,
+                prefetch_bytes=args.prefetch_mb * 1024 * 1024,
+                metrics_file=args.metrics,
+                export_formats=args.export,
+                inventory=args.inventory,
+                snapshot_file=snapshot_file,
+                previous_snapshot=previous_snapshot,
+                journal_file=journal_file,
+                shard_by=args.shard_by,
+                shard_rows=args.shard_rows,
+                shard_writers=args.shard_writers,
+                file_timeout=args.file_timeout or None,
+                memory_limit=args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+                errors_sheet=args.errors_sheet
+            )
+    except Exception as e:
+        logging.error(f"Ошибка обработки: {e}", exc_info=True)
+        summary.update(status='error', error=str(e))
+        exit_code = EXIT_FAILURE
+    else:
+        if not summary['files_found']:
+            summary['status'] = 'no_reports'
+            exit_code = EXIT_NO_REPORTS
+        elif summary['failed']:
+            summary['status'] = 'partial'
+            exit_code = EXIT_PARTIAL
+        else:
+            summary['status'] = 'ok'
+            exit_code = EXIT_OK
+
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    print_summary(summary)
+    return exit_code
+
+
+def main(argv=None):
+    """Точка входа командной строки."""
+    args = parse_args(argv)
+    configure_logging(args.log_file, args.verbose)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
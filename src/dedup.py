@@ -0,0 +1,53 @@
+import logging
+import os
+
+from cache import file_digest
+
+
+class DuplicateFinder:
+    """Находит одинаковые по содержимому отчеты.
+
+    Сначала сравнивается размер файла; хэш содержимого вычисляется
+    только для файлов, размер которых уже встречался. Так файлы с
+    уникальным размером (подавляющее большинство) не читаются лишний раз.
+    """
+
+    def __init__(self):
+        # Размер -> список [путь, хэш или None] уникальных файлов этого размера
+        self._by_size = {}
+
+    def check(self, file_path):
+        """Проверяет файл на совпадение с ранее переданными.
+
+        Returns:
+            tuple: (путь совпадающего файла или None, хэш содержимого или None,
+                если хэш не понадобился)
+        """
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            # Ошибку чтения покажет разбор файла
+            return None, None
+
+        candidates = self._by_size.get(size)
+        if candidates is None:
+            self._by_size[size] = [[file_path, None]]
+            return None, None
+
+        try:
+            digest = file_digest(file_path)
+        except OSError:
+            return None, None
+
+        for candidate in candidates:
+            if candidate[1] is None:
+                try:
+                    candidate[1] = file_digest(candidate[0])
+                except OSError as e:
+                    logging.warning(f"Не удалось прочитать файл {candidate[0]}: {str(e)}")
+                    candidate[1] = ''
+            if candidate[1] == digest:
+                return candidate[0], digest
+
+        candidates.append([file_path, digest])
+        return None, digest
@@ -0,0 +1,217 @@
+"""Сравнение с предыдущим запуском: снимок результатов и отчет об изменениях.
+
+Снимок — файл gzip, по строке на компьютер: "подпись<TAB>ключ<TAB>JSON записи".
+Подпись — хэш ОС, списка ПО и пользователей, поэтому при сравнении
+неизмененный компьютер определяется по совпадению подписей, без сравнения
+списков. Записи предыдущего снимка хранятся в памяти в компактном виде
+(HostRecord). Компьютеры сопоставляются по имени, если оно не найдено или
+повторяется — по имени файла.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+from inventory import normalize_program_name, version_key
+from records import HostRecord, StringTable
+
+SNAPSHOT_SUFFIX = ".snapshot.gz"
+SIGNATURE_SIZE = 16
+
+# Типы изменений в отчете
+HOST_ADDED = "Новый компьютер"
+HOST_REMOVED = "Компьютер не найден"
+OS_CHANGED = "Изменена ОС"
+SOFTWARE_ADDED = "Установлено ПО"
+SOFTWARE_REMOVED = "Удалено ПО"
+SOFTWARE_UPGRADED = "Обновлено ПО"
+SOFTWARE_DOWNGRADED = "Понижена версия ПО"
+SOFTWARE_CHANGED = "Изменены версии ПО"
+USER_ADDED = "Добавлен пользователь"
+USER_REMOVED = "Удален пользователь"
+
+
+def default_snapshot_path(output_file):
+    """Путь снимка по умолчанию: рядом с Excel отчетом."""
+    return os.path.splitext(output_file)[0] + SNAPSHOT_SUFFIX
+
+
+def host_signature(data):
+    """Подпись содержимого отчета: ОС, ПО и пользователи (без имени файла)."""
+    digest = hashlib.blake2b(digest_size=SIGNATURE_SIZE)
+    digest.update(data['os_info'].encode('utf-8'))
+    for name, version in sorted(map(tuple, data['programs'])):
+        digest.update(f"\0{name}\1{version}".encode('utf-8'))
+    digest.update(b"\2")
+    for user in sorted(data['users']):
+        digest.update(f"\0{user}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _programs_by_name(programs):
+    """Нормализованное название -> (название, множество версий)."""
+    result = {}
+    for name, version in programs:
+        entry = result.setdefault(normalize_program_name(name), (name, set()))
+        entry[1].add(version)
+    return result
+
+
+def _versions_text(versions):
+    return ", ".join(sorted(versions, key=version_key))
+
+
+def host_changes(previous, current):
+    """Изменения между двумя записями одного компьютера.
+
+    Returns:
+        list: (тип изменения, объект, было, стало)
+    """
+    changes = []
+    if previous['os_info'] != current['os_info']:
+        changes.append((OS_CHANGED, "", previous['os_info'], current['os_info']))
+
+    before = _programs_by_name(previous['programs'])
+    after = _programs_by_name(current['programs'])
+    for key in after.keys() - before.keys():
+        name, versions = after[key]
+        changes.append((SOFTWARE_ADDED, name, "", _versions_text(versions)))
+    for key in before.keys() - after.keys():
+        name, versions = before[key]
+        changes.append((SOFTWARE_REMOVED, name, _versions_text(versions), ""))
+    for key in before.keys() & after.keys():
+        (_, old_versions), (name, new_versions) = before[key], after[key]
+        if old_versions == new_versions:
+            continue
+        kind = SOFTWARE_CHANGED
+        if len(old_versions) == 1 and len(new_versions) == 1:
+            old_key, new_key = version_key(next(iter(old_versions))), version_key(next(iter(new_versions)))
+            kind = SOFTWARE_UPGRADED if new_key > old_key else SOFTWARE_DOWNGRADED
+        changes.append((kind, name, _versions_text(old_versions), _versions_text(new_versions)))
+
+    old_users, new_users = set(previous['users']), set(current['users'])
+    changes.extend((USER_ADDED, user, "", "") for user in sorted(new_users - old_users))
+    changes.extend((USER_REMOVED, user, "", "") for user in sorted(old_users - new_users))
+
+    # Порядок: ОС, ПО по названию, пользователи
+    order = {OS_CHANGED: 0, USER_ADDED: 2, USER_REMOVED: 2}
+    changes.sort(key=lambda change: (order.get(change[0], 1), change[1].casefold()))
+    return changes
+
+
+class SnapshotWriter:
+    """Записывает снимок запуска по мере обработки отчетов.
+
+    Запись идет во временный файл, который заменяет прежний снимок только
+    в close(): если запуск прервется, предыдущий снимок сохранится.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._temp_path = path + ".tmp"
+        self._file = gzip.open(self._temp_path, 'wt', encoding='utf-8')
+
+    def write(self, key, signature, data):
+        record = {
+            'file_name': data['file_name'],
+            'pc_name': data['pc_name'],
+            'os_info': data['os_info'],
+            'programs': data['programs'],
+            'users': data['users'],
+        }
+        self._file.write(f"{signature}\t{key}\t{json.dumps(record, ensure_ascii=False)}\n")
+
+    def close(self):
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+        logging.info(f"Снимок запуска сохранен в файл: {self.path}")
+
+    def abort(self):
+        """Удаляет незавершенный снимок, прежний остается без изменений."""
+        self._file.close()
+        try:
+            os.remove(self._temp_path)
+        except OSError:
+            pass
+
+
+class RunDiff:
+    """Сравнение текущего запуска с предыдущим снимком.
+
+    Отчеты добавляются по мере обработки (add). Для компьютера с той же
+    подписью сравнение завершается проверкой подписи; для измененных
+    записей вычисляются разности множеств ПО и пользователей.
+    """
+
+    def __init__(self, snapshot_path):
+        # Ключ -> (подпись, HostRecord); строки записей хранятся один раз в self.strings
+        self.previous = {}
+        self.strings = StringTable()
+        with gzip.open(snapshot_path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                signature, key, record = line.rstrip('\n').split('\t', 2)
+                self.previous[key] = (signature, HostRecord(json.loads(record), self.strings))
+        self._seen = set()
+        self.changes = []  # (компьютер, имя файла, тип, объект, было, стало)
+        self.unchanged = 0
+        self.changed = 0
+        self.added = 0
+        self.removed = 0
+        logging.info(f"Загружен снимок предыдущего запуска: {snapshot_path} ({len(self.previous)} компьютеров)")
+
+    def add(self, key, signature, data):
+        """Сравнивает отчет с записью того же компьютера в предыдущем снимке."""
+        self._seen.add(key)
+        previous = self.previous.get(key)
+        if previous is None:
+            self.added += 1
+            self.changes.append((data['pc_name'], data['file_name'], HOST_ADDED, "", "", data['os_info']))
+            return
+        if previous[0] == signature:
+            self.unchanged += 1
+            return
+
+        changes = host_changes(previous[1].to_data(self.strings), data)
+        if changes:
+            self.changed += 1
+            self.changes.extend((data['pc_name'], data['file_name'], *change) for change in changes)
+        else:
+            self.unchanged += 1
+
+    def finish(self):
+        """Отмечает компьютеры, которых нет в текущем запуске."""
+        for key, (_, record) in self.previous.items():
+            if key not in self._seen:
+                self.removed += 1
+                self.changes.append((record.pc_name, record.file_name, HOST_REMOVED, "",
+                                     record.os_info(self.strings), ""))
+
+    def totals(self):
+        return {
+            'unchanged': self.unchanged,
+            'changed': self.changed,
+            'added': self.added,
+            'removed': self.removed,
+            'changes': len(self.changes),
+        }
+
+
+class HostKeys:
+    """Ключи сопоставления компьютеров между запусками.
+
+    Ключ — имя компьютера; если имя не найдено или уже встречалось в
+    этом запуске — имя файла.
+    """
+
+    def __init__(self, name_not_found):
+        self.name_not_found = name_not_found
+        self._names = set()
+
+    def key(self, data):
+        # Табуляция разделяет поля строки снимка
+        name = data['pc_name'].replace('\t', ' ')
+        if name == self.name_not_found or name in self._names:
+            return f"file:{data['file_name']}".replace('\t', ' ')
+        self._names.add(name)
+        return f"pc:{name}"
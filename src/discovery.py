@@ -0,0 +1,149 @@
+import fnmatch
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Отчеты AIDA64 по умолчанию
+DEFAULT_INCLUDE = ("*.htm", "*.html")
+# Число потоков чтения директорий (на сетевых дисках чтение упирается в задержки, а не в CPU)
+DISCOVERY_THREADS = 8
+
+
+def _matches(rel_path, name, patterns):
+    """Проверяет имя или относительный путь на совпадение с шаблонами (без учета регистра)."""
+    rel_path = rel_path.casefold()
+    name = name.casefold()
+    return any(
+        fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(rel_path, pattern)
+        for pattern in patterns
+    )
+
+
+class FileDiscovery:
+    """Поиск отчетов в дереве директорий.
+
+    Директории читаются через os.scandir в пуле потоков: как только
+    прочитана директория, ее поддиректории ставятся в очередь. Файлы
+    выдаются по мере обнаружения, но в том же порядке, что и при обходе
+    os.walk, поэтому разбор можно начинать, не дожидаясь конца поиска.
+
+    Шаблоны include/exclude (glob, без учета регистра) сравниваются с
+    именем и с путем относительно корня (через '/'). Исключенные
+    директории не читаются. Символические ссылки на директории по
+    умолчанию не обходятся; при follow_symlinks=True каждая директория
+    читается один раз, что защищает от циклов.
+    """
+
+    def __init__(self, directory, include=None, exclude=None, follow_symlinks=False,
+                 threads=DISCOVERY_THREADS):
+        self.directory = directory
+        self.include = [pattern.casefold() for pattern in (include or DEFAULT_INCLUDE)]
+        self.exclude = [pattern.casefold() for pattern in (exclude or ())]
+        self.follow_symlinks = follow_symlinks
+        self.threads = threads
+
+        self.found = 0  # Найдено файлов в прочитанных директориях
+        self._pending = 0  # Директорий в очереди на чтение
+
+        self._visited = set()  # (устройство, inode) прочитанных директорий
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        """Все директории прочитаны, число найденных файлов окончательное."""
+        return self._pending == 0
+
+    def __iter__(self):
+        """Перебирает найденные файлы в порядке обхода дерева."""
+        pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="discovery")
+        try:
+            self._first_visit(self.directory)
+            stack = [self._submit(pool, self.directory, '')]
+            while stack:
+                files, subdirectories = stack.pop().result()
+                yield from files
+                # Поддиректории обходятся в порядке чтения
+                stack.extend(reversed(subdirectories))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, pool, path, rel_path):
+        with self._lock:
+            self._pending += 1
+        try:
+            return pool.submit(self._scan, pool, path, rel_path)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def _scan(self, pool, path, rel_path):
+        """Читает директорию и ставит в очередь чтение ее поддиректорий.
+
+        Returns:
+            tuple: (пути файлов, Future с результатами поддиректорий)
+        """
+        files = []
+        subdirectories = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    entry_rel_path = f"{rel_path}/{entry.name}" if rel_path else entry.name
+                    try:
+                        is_directory = entry.is_dir()
+                    except OSError:
+                        is_directory = False
+
+                    if is_directory:
+                        if self._matches_exclude(entry_rel_path, entry.name):
+                            continue
+                        if not self._should_descend(entry):
+                            continue
+                        try:
+                            subdirectories.append(self._submit(pool, entry.path, entry_rel_path))
+                        except RuntimeError:
+                            # Пул остановлен: обход прерван
+                            break
+                    elif (_matches(entry_rel_path, entry.name, self.include)
+                          and not self._matches_exclude(entry_rel_path, entry.name)):
+                        files.append(entry.path)
+        except OSError as e:
+            logging.warning(f"Не удалось прочитать директорию {path}: {str(e)}")
+
+        with self._lock:
+            self.found += len(files)
+            self._pending -= 1
+        return files, subdirectories
+
+    def _matches_exclude(self, rel_path, name):
+        return bool(self.exclude) and _matches(rel_path, name, self.exclude)
+
+    def _should_descend(self, entry):
+        """Проверяет, нужно ли обходить поддиректорию."""
+        if not self.follow_symlinks:
+            # Как os.walk: ссылки на директории не обходятся
+            return not entry.is_symlink()
+        return self._first_visit(entry.path)
+
+    def _first_visit(self, path):
+        """Отмечает директорию прочитанной. False — она уже встречалась (цикл ссылок)."""
+        if not self.follow_symlinks:
+            return True
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        key = (stat.st_dev, stat.st_ino)
+        with self._lock:
+            if key in self._visited:
+                logging.warning(f"Директория {path} уже обработана (цикл символических ссылок), пропуск")
+                return False
+            self._visited.add(key)
+        return True
+
+
+def iter_html_files(directory, include=None, exclude=None, follow_symlinks=False):
+    """Перебирает отчеты в директории и поддиректориях по мере обнаружения."""
+    return iter(FileDiscovery(directory, include, exclude, follow_symlinks))
@@ -0,0 +1,239 @@
+import csv
+import json
+import logging
+import os
+
+# Таблицы нормализованной выгрузки: компьютеры и установленное на них ПО
+HOSTS_TABLE = "hosts"
+SOFTWARE_TABLE = "software"
+
+# Столбцы таблиц. host_id совпадает с номером строки (№) в Excel отчете
+HOST_COLUMNS = ('host_id', 'file_name', 'pc_name', 'os_info', 'program_count', 'security_count', 'users')
+SOFTWARE_COLUMNS = ('host_id', 'name', 'version', 'security_rule')
+
+# Так выводится пустая ячейка таблицы программ (как в pandas); в выгрузке — пустое значение
+MISSING_VALUE = "nan"
+# Разделитель пользователей в CSV (в JSONL и Parquet — список)
+CSV_LIST_SEPARATOR = "; "
+# Строк в группе Parquet: столько строк держится в памяти до записи
+PARQUET_ROW_GROUP = 64 * 1024
+
+
+def export_base(output_file):
+    """Общая часть имен файлов выгрузки: путь к Excel отчету без расширения."""
+    return os.path.splitext(output_file)[0]
+
+
+def host_rows(host_id, data, classifier):
+    """Строки таблиц hosts и software для одного отчета.
+
+    Returns:
+        tuple: (строка hosts, список строк software) — кортежи в порядке
+            HOST_COLUMNS и SOFTWARE_COLUMNS
+    """
+    software = []
+    security_count = 0
+    for name, version in data['programs']:
+        # Как и в Excel отчете, правила проверяются по строке «программа версия»
+        rule = classifier.match(f"{name} {version}")
+        if rule is not None:
+            security_count += 1
+        software.append((
+            host_id,
+            None if name == MISSING_VALUE else name,
+            None if version == MISSING_VALUE else version,
+            rule,
+        ))
+
+    host = (
+        host_id,
+        data['file_name'],
+        data['pc_name'],
+        data['os_info'],
+        len(software),
+        security_count,
+        list(data['users']),
+    )
+    return host, software
+
+
+class Exporter:
+    """Базовый класс потоковой выгрузки в табличный формат.
+
+    Строки пишутся по мере разбора отчетов, в память целиком не собираются.
+    Каждая таблица сохраняется в отдельный файл <база>.<таблица>.<расширение>.
+    """
+
+    name = None
+    extension = None
+
+    def __init__(self, base_path):
+        self.paths = {
+            table: f"{base_path}.{table}.{self.extension}"
+            for table in (HOSTS_TABLE, SOFTWARE_TABLE)
+        }
+
+    def write(self, host, software):
+        """Записывает строку компьютера и строки его ПО."""
+        raise NotImplementedError
+
+    def close(self):
+        """Завершает запись файлов."""
+        raise NotImplementedError
+
+    def abort(self):
+        """Прерывает запись и удаляет незавершенные файлы."""
+        try:
+            self.close()
+        finally:
+            for path in self.paths.values():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class CsvExporter(Exporter):
+    """CSV в UTF-8 с BOM (открывается в Excel без настройки кодировки)."""
+
+    name = "csv"
+    extension = "csv"
+
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self._files = {}
+        self._writers = {}
+        for table, columns in ((HOSTS_TABLE, HOST_COLUMNS), (SOFTWARE_TABLE, SOFTWARE_COLUMNS)):
+            file = open(self.paths[table], 'w', newline='', encoding='utf-8-sig')
+            self._files[table] = file
+            self._writers[table] = csv.writer(file)
+            self._writers[table].writerow(columns)
+
+    def write(self, host, software):
+        self._writers[HOSTS_TABLE].writerow(host[:-1] + (CSV_LIST_SEPARATOR.join(host[-1]),))
+        self._writers[SOFTWARE_TABLE].writerows(software)
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+
+
+class JsonlExporter(Exporter):
+    """JSON Lines: объект на строку, UTF-8."""
+
+    name = "jsonl"
+    extension = "jsonl"
+
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self._files = {table: open(path, 'w', encoding='utf-8') for table, path in self.paths.items()}
+
+    def write(self, host, software):
+        self._write_row(HOSTS_TABLE, HOST_COLUMNS, host)
+        for row in software:
+            self._write_row(SOFTWARE_TABLE, SOFTWARE_COLUMNS, row)
+
+    def _write_row(self, table, columns, row):
+        self._files[table].write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        self._files[table].write("\n")
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+
+
+class ParquetExporter(Exporter):
+    """Parquet (нужна библиотека pyarrow). Строки пишутся группами по PARQUET_ROW_GROUP."""
+
+    name = "parquet"
+    extension = "parquet"
+
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Для выгрузки в Parquet установите библиотеку pyarrow: pip install pyarrow")
+
+        self._pyarrow = pyarrow
+        self._schemas = {
+            HOSTS_TABLE: pyarrow.schema([
+                ('host_id', pyarrow.int32()),
+                ('file_name', pyarrow.string()),
+                ('pc_name', pyarrow.string()),
+                ('os_info', pyarrow.string()),
+                ('program_count', pyarrow.int32()),
+                ('security_count', pyarrow.int32()),
+                ('users', pyarrow.list_(pyarrow.string())),
+            ]),
+            SOFTWARE_TABLE: pyarrow.schema([
+                ('host_id', pyarrow.int32()),
+                ('name', pyarrow.string()),
+                ('version', pyarrow.string()),
+                ('security_rule', pyarrow.string()),
+            ]),
+        }
+        self._writers = {
+            table: pyarrow.parquet.ParquetWriter(self.paths[table], schema)
+            for table, schema in self._schemas.items()
+        }
+        self._buffers = {table: [] for table in self._schemas}
+
+    def write(self, host, software):
+        self._append(HOSTS_TABLE, [host])
+        self._append(SOFTWARE_TABLE, software)
+
+    def _append(self, table, rows):
+        buffer = self._buffers[table]
+        buffer.extend(rows)
+        if len(buffer) >= PARQUET_ROW_GROUP:
+            self._flush(table)
+
+    def _flush(self, table):
+        buffer = self._buffers[table]
+        if not buffer:
+            return
+        schema = self._schemas[table]
+        columns = [list(column) for column in zip(*buffer)]
+        self._writers[table].write_table(self._pyarrow.Table.from_arrays(
+            [self._pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema
+        ))
+        buffer.clear()
+
+    def close(self):
+        try:
+            for table in self._writers:
+                self._flush(table)
+        finally:
+            for writer in self._writers.values():
+                writer.close()
+
+
+# Реестр форматов выгрузки: имя -> класс
+EXPORTERS = {
+    CsvExporter.name: CsvExporter,
+    JsonlExporter.name: JsonlExporter,
+    ParquetExporter.name: ParquetExporter,
+}
+EXPORT_FORMATS = tuple(EXPORTERS)
+
+
+def create_exporters(formats, output_file):
+    """Создает выгрузки в указанных форматах рядом с Excel отчетом."""
+    base_path = export_base(output_file)
+    exporters = []
+    try:
+        for export_format in dict.fromkeys(formats):
+            if export_format not in EXPORTERS:
+                raise ValueError(f"Неизвестный формат выгрузки: {export_format}. Доступны: {', '.join(EXPORTERS)}")
+            exporters.append(EXPORTERS[export_format](base_path))
+    except Exception:
+        for exporter in exporters:
+            exporter.abort()
+        raise
+
+    for exporter in exporters:
+        logging.info(f"Выгрузка {exporter.name}: {', '.join(exporter.paths.values())}")
+    return exporters
@@ -1,56 +1,308 @@
+import codecs
+import io
 import os
 import re
-from bs4 import BeautifulSoup
-import openpyxl
-from openpyxl.styles import Alignment, Font, Border, Side
-from openpyxl.utils import get_column_letter
-import pandas as pd
-from io import StringIO
-import ttkbootstrap as ttk
-import logging
 import sys
-from ui import AidaParserUI
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename='aida_parser.log',
-    filemode='a'
-)
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from html import escape
+from html.parser import HTMLParser as HtmlTokenizer
+import logging
+from backends import (AUTO_BACKEND, EQUIVALENT_BACKENDS, NOT_EQUIVALENT_NOTE, available_backends, get_backend,
+                      resolve_backend_name)
+from cache import DIGEST_CHUNK_SIZE, ParseCache, content_hasher
+from classifier import SecurityClassifier
+from dedup import DuplicateFinder
+from diff import HostKeys, RunDiff, SnapshotWriter, host_signature
+from discovery import FileDiscovery, iter_html_files
+from exporters import create_exporters, host_rows
+from inventory import SoftwareInventory
+from journal import RunJournal
+from metrics import MetricsRecorder, PhaseTimer, StageStats
+from prefetch import DEFAULT_PREFETCH_BYTES, DEFAULT_PREFETCH_FILES, DEFAULT_READ_THREADS, PrefetchReader
+from shards import DEFAULT_SHARD_ROWS, DEFAULT_SHARD_WRITERS, ShardSet
 
 # Константы
-SECURITY_SOFTWARE = (
-    "dallas",
-    "dr.Web",
-    "eset",
-    "kaspersky",
-    "nod",
-    "secret net",
-    "security Studio Endpoint Protection",
-    "viPNet Client",
-    "континент-АП",
-    "криптоПро"
+# Версия правил извлечения данных. Увеличивайте при любом изменении результата
+# разбора: записи кэша, созданные другой версией, будут сброшены
+EXTRACTOR_VERSION = 4
+
+# Якоря разделов отчета AIDA64
+PROGRAMS_ANCHOR = "installed programs"
+USERS_ANCHOR = "users"
+
+# Шаблоны строк сводной информации
+PC_NAME_PATTERN = re.compile(r'Компьютер\s+(.*?)(?:\s+Генератор|\s*$)')
+OS_INFO_PATTERN = re.compile(r'Операционная система\s+(.*?)(?:\s+Дата|\s*$)')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+PC_NAME_NOT_FOUND = "Имя компьютера не найдено"
+OS_INFO_NOT_FOUND = "Операционная система не найдена"
+
+# Преобразования таблицы программ, повторяющие pandas.read_html(header=0)
+CELL_WHITESPACE_PATTERN = re.compile(r"[\r\n]+|\s{2,}")
+THOUSANDS_NUMBER_PATTERN = re.compile(r"^[\-\+]?([0-9]+,|[0-9])*(\.[0-9]*)?([0-9]?(E|e)\-?[0-9]+)?$")
+INT_PATTERN = re.compile(r"^[\-\+]?[0-9]+$")
+FLOAT_PATTERN = re.compile(r"^[\-\+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][\-\+]?[0-9]+)?$|^[\-\+]?inf(inity)?$",
+                           re.IGNORECASE)
+# Значения, которые pandas считает пропусками (в отчете выводятся как "nan")
+NA_VALUES = frozenset((
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+))
+
+# Кодировка отчетов AIDA64, если в файле она не указана
+REPORT_ENCODING = 'Windows-1251'
+# Сколько первых байт файла просматривается в поисках BOM и meta charset
+ENCODING_SNIFF_BYTES = 4096
+# Метки порядка байтов: UTF-32 проверяется раньше UTF-16, их начало совпадает
+ENCODING_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
 )
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([\w.:\-]+)', re.IGNORECASE)
+# Обработчик ошибок декодирования: пропускает байты, как errors='ignore', и считает их
+DECODE_ERRORS_HANDLER = 'aida64-count'
+# Размер блока при потоковом чтении отчета
+STREAM_CHUNK_SIZE = 64 * 1024
+# Предел времени разбора одного отчета по умолчанию, секунд (обычный отчет разбирается за доли секунды)
+DEFAULT_FILE_TIMEOUT = 300
+# Как часто пул разбора проверяет отмену обработки, пока ждет результат, секунд
+CANCEL_POLL_SECONDS = 0.5
+# Сколько файлов на процесс разбора ждет в очереди пула: освободившийся процесс сразу получает следующий
+QUEUED_FILES_PER_WORKER = 1
+# Сколько ждать завершения процесса разбора при закрытии пула, секунд
+WORKER_STOP_SECONDS = 5
+# Сколько разобранных файлов может ждать результата более раннего (строки пишутся в порядке файлов)
+MAX_WAITING_RESULTS = 512
+# Объект задания Windows (Job Object): класс сведений о пределах и флаг предела памяти процесса
+JOB_OBJECT_EXTENDED_LIMIT_INFORMATION = 9
+JOB_OBJECT_LIMIT_PROCESS_MEMORY = 0x100
+
+
+def software_title(program_name, program_version):
+    """Название ПО с версией, как оно выводится в отчете: «программа версия»."""
+    return f"{program_name} {program_version}"
+
+
+def _expand_table_spans(rows):
+    """Разворачивает colspan/rowspan в сетку нормализованных текстов ячеек.
+
+    Повторяет pandas.read_html: текст объединенной ячейки копируется во все
+    покрытые ею позиции, пробелы и переводы строк схлопываются.
+    """
+    grid = []
+    remainder = []  # (позиция, текст, оставшийся rowspan) из предыдущих строк
+
+    for row in rows:
+        texts = []
+        next_remainder = []
+        index = 0
+
+        for parts, colspan, rowspan in row:
+            # Ячейки предыдущих строк с rowspan > 1, стоящие перед текущей
+            while remainder and remainder[0][0] <= index:
+                prev_index, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+                index += 1
+
+            text = CELL_WHITESPACE_PATTERN.sub(" ", ''.join(parts).strip())
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+
+        for prev_index, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+
+        grid.append(texts)
+        remainder = next_remainder
+
+    # Строки, которые образуются только из-за rowspan последних строк
+    while remainder:
+        grid.append([prev_text for _, prev_text, _ in remainder])
+        remainder = [(prev_index, prev_text, prev_rowspan - 1)
+                     for prev_index, prev_text, prev_rowspan in remainder if prev_rowspan > 1]
+
+    return grid
+
+
+def _cell(row, index):
+    """Текст ячейки строки сетки; короткие строки дополняются пустыми ячейками.
+
+    Как и pandas, убирает разделитель тысяч в значениях, похожих на числа.
+    """
+    value = row[index] if index < len(row) else ''
+    if ',' in value and THOUSANDS_NUMBER_PATTERN.search(value.strip()):
+        value = value.replace(',', '')
+    return value
+
+
+def _convert_column(values):
+    """Определяет тип столбца так же, как pandas.
+
+    Returns:
+        tuple: (значения, тип) — тип 'int' или 'float' для числовых столбцов,
+        None для текстовых. Пропуски в текстовых столбцах остаются None.
+    """
+    present = [value for value in values if value not in NA_VALUES]
+
+    # Столбец из одних пропусков pandas тоже считает дробным
+    if all(FLOAT_PATTERN.match(value) for value in present):
+        if present and len(present) == len(values) and all(INT_PATTERN.match(value) for value in values):
+            return [int(value) for value in values], 'int'
+        return [float(value) if value not in NA_VALUES else float('nan') for value in values], 'float'
+
+    return [value if value not in NA_VALUES else None for value in values], None
+
+
+def _format_columns(*columns):
+    """Превращает столбцы из _convert_column в строки, как str() от ячеек DataFrame.iterrows().
+
+    iterrows() приводит строку к общему типу: если все столбцы числовые и
+    среди них есть дробный, целые значения выводятся как дробные ("7" -> "7.0").
+    Пропуски выводятся как "nan".
+    """
+    kinds = {kind for _, kind in columns}
+    as_float = None not in kinds and 'float' in kinds
+
+    formatted = []
+    for values, kind in columns:
+        if as_float and kind == 'int':
+            values = [float(value) for value in values]
+        formatted.append(['nan' if value is None else str(value) for value in values])
+    return formatted
+
+
+_decode_errors = threading.local()
+
+
+def _count_decode_error(error):
+    """Пропускает недекодируемые байты и считает их (для потока, в котором идет декодирование)."""
+    _decode_errors.count = getattr(_decode_errors, 'count', 0) + 1
+    return '', error.end
+
+
+codecs.register_error(DECODE_ERRORS_HANDLER, _count_decode_error)
+
+
+def detect_encoding(head):
+    """Определяет кодировку отчета по первым байтам файла.
+
+    Сначала проверяется метка порядка байтов (BOM), затем meta charset.
+    Если кодировка не указана или неизвестна Python, используется
+    REPORT_ENCODING.
+
+    Args:
+        head (bytes): Начало файла (ENCODING_SNIFF_BYTES байт)
+
+    Returns:
+        tuple: (кодек, откуда взят: 'bom', 'meta' или 'default', длина BOM в байтах)
+    """
+    for bom, encoding in ENCODING_BOMS:
+        if head.startswith(bom):
+            return encoding, 'bom', len(bom)
+
+    match = META_CHARSET_PATTERN.search(head)
+    if match:
+        try:
+            encoding = codecs.lookup(match.group(1).decode('ascii')).name
+        except LookupError:
+            logging.warning(f"Неизвестная кодировка в meta charset: {match.group(1)!r}. "
+                            f"Используется {REPORT_ENCODING}")
+        else:
+            # Если meta прочитан побайтно, файл не в UTF-16/32: так указывают UTF-8 (как в браузерах)
+            if encoding.startswith(('utf-16', 'utf-32')):
+                encoding = 'utf-8'
+            return encoding, 'meta', 0
+
+    return codecs.lookup(REPORT_ENCODING).name, 'default', 0
+
+
+def decode_report(raw, timer=None):
+    """Декодирует отчет в кодировке, определенной detect_encoding.
+
+    Недекодируемые байты пропускаются, их число и кодировка записываются
+    в timer (PhaseTimer). Переводы строк приводятся к '\\n', как при
+    чтении в текстовом режиме.
+    """
+    encoding, source, bom_length = detect_encoding(raw[:ENCODING_SNIFF_BYTES])
+    _decode_errors.count = 0
+    content = str(memoryview(raw)[bom_length:], encoding, DECODE_ERRORS_HANDLER)
+    if timer is not None:
+        timer.encoding = f"{encoding} ({source})"
+        timer.decode_errors += _decode_errors.count
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def read_report(file_path, timer=None, digest=False):
+    """Читает и декодирует отчет (кодировка — по BOM или meta charset, см. detect_encoding).
+
+    Время чтения и декодирования, кодировка и число недекодируемых байтов
+    записываются в timer (PhaseTimer), если он передан. С digest=True в
+    timer.digest записывается хэш прочитанного содержимого для кэша разбора.
+
+    Returns:
+        tuple: (текст отчета, размер файла в байтах)
+    """
+    if timer is None:
+        timer = PhaseTimer()
+
+    with timer.phase('read'):
+        with open(file_path, 'rb') as file:
+            raw = file.read()
+        if digest:
+            timer.digest = content_hasher(raw).hexdigest()
+    timer.bytes_read += len(raw)
+
+    with timer.phase('decode'):
+        content = decode_report(raw, timer)
+    return content, len(raw)
+
+
+class ProcessingCancelled(Exception):
+    """Обработка остановлена по запросу пользователя."""
 
 
 class HtmlParser:
     """Класс для парсинга HTML файлов"""
 
-    def __init__(self, start_dir):
+    def __init__(self, start_dir, streaming=False, backend=AUTO_BACKEND, content_digest=False):
         self.start_dir = start_dir
+        self.streaming = streaming  # Потоковый разбор без построения полного DOM
+        self.content_digest = content_digest  # Вычислять хэш содержимого при чтении (для кэша разбора)
+        self.backend = get_backend(backend)  # Адаптер HTML-библиотеки
         self.processed_files = set()  # Множество для отслеживания обработанных файлов
+        self.timer = PhaseTimer()  # Замеры времени фаз разбора текущего файла
 
     def parse_html_file(self, file_path):
         """Парсинг HTML файла и извлечение нужной информации."""
+        if self.streaming:
+            return self.parse_html_file_streaming(file_path)
+
         try:
-            with open(file_path, 'r', encoding='Windows-1251', errors="ignore") as file:
-                content = file.read()
+            content, _ = read_report(file_path, self.timer, self.content_digest)
         except UnicodeDecodeError:
             logging.error(f"Невозможно прочитать файл {file_path}. Проблемы с кодировкой.")
             return None
 
-        soup = BeautifulSoup(content, 'html.parser')
+        return self.parse_html_content(file_path, content)
+
+    def parse_html_content(self, file_path, content):
+        """Извлечение информации из уже прочитанного отчета (полный DOM)."""
+        with self.timer.phase('dom'):
+            document = self.backend.parse(content)
 
         # Получаем относительный путь к файлу
         rel_path = os.path.relpath(file_path, start=self.start_dir)
@@ -63,116 +315,530 @@ class HtmlParser:
         # Добавляем файл в множество обработанных
         self.processed_files.add(rel_path)
 
-        # Анализ данных
+        # Анализ данных: все поля собираются за один проход по документу
+        with self.timer.phase('scan'):
+            fields = self._scan_document(document)
+
+        with self.timer.phase('software'):
+            programs = self._installed_programs(fields['programs_anchor'])
+
+        with self.timer.phase('users'):
+            users = self._users_from_anchor(fields['users_anchor'])
+
         data = {
             'file_name': rel_path,
-            'pc_name': self._extract_pc_name(soup),
-            'os_info': self._extract_os_info(soup),
-            'software': self._extract_software(soup),
-            'users': self._extract_users(soup)
+            'pc_name': fields['pc_name'],
+            'os_info': fields['os_info'],
+            'programs': programs,
+            'users': users
         }
 
         return data
 
-    def _extract_pc_name(self, soup):
-        """Извлечение имени компьютера"""
-        rows = soup.find_all('tr')
-
-        for row in rows:
-            row_text = row.get_text(separator=' ', strip=True)
+    def _scan_document(self, document):
+        """Однопроходное извлечение полей отчета.
+
+        Обходит документ один раз, сопоставляя каждую строку таблицы сразу
+        с именем компьютера и ОС и запоминая якоря разделов программ и
+        пользователей. Обход прекращается, как только найдены все поля.
+        Имя компьютера и ОС берутся из первой подходящей строки в порядке
+        документа, якоря — первые с нужным именем.
+        """
+        pc_name = None
+        os_info = None
+        programs_anchor = None
+        users_anchor = None
+
+        backend = self.backend
+        for element in backend.iter_elements(document, ('tr', 'a')):
+            if backend.tag_name(element) == 'tr':
+                if pc_name is not None and os_info is not None:
+                    continue
+                row_text = backend.row_text(element)
+                if pc_name is None:
+                    pc_name = self._match_pc_name(row_text)
+                if os_info is None:
+                    os_info = self._match_os_info(row_text)
+
+            else:
+                anchor_name = backend.get_attr(element, 'name')
+                if anchor_name == PROGRAMS_ANCHOR and programs_anchor is None:
+                    programs_anchor = element
+                elif anchor_name == USERS_ANCHOR and users_anchor is None:
+                    users_anchor = element
+
+            if (pc_name is not None and os_info is not None
+                    and programs_anchor is not None and users_anchor is not None):
+                break
+
+        return {
+            'pc_name': pc_name if pc_name is not None else PC_NAME_NOT_FOUND,
+            'os_info': os_info if os_info is not None else OS_INFO_NOT_FOUND,
+            'programs_anchor': programs_anchor,
+            'users_anchor': users_anchor
+        }
 
-            if "Компьютер" in row_text:
-                row_text = re.sub(r'\s+', ' ', row_text)
-                os_match = re.search(r'Компьютер\s+(.*?)(?:\s+Генератор|\s*$)', row_text)
+    @staticmethod
+    def _match_pc_name(row_text):
+        """Ищет имя компьютера в тексте строки таблицы. Возвращает None, если не найдено."""
+        if "Компьютер" in row_text:
+            row_text = WHITESPACE_PATTERN.sub(' ', row_text)
+            pc_match = PC_NAME_PATTERN.search(row_text)
+
+            if pc_match:
+                pc_name = pc_match.group(1).strip()
+                logging.info(f"Найдена строка имя пк: {pc_name}")
+                return pc_name
+
+        return None
+
+    @staticmethod
+    def _match_os_info(row_text):
+        """Ищет информацию об ОС в тексте строки таблицы. Возвращает None, если не найдено."""
+        if "Операционная система" in row_text:
+            row_text = WHITESPACE_PATTERN.sub(' ', row_text)
+            os_match = OS_INFO_PATTERN.search(row_text)
+
+            if os_match:
+                os_string = os_match.group(1).strip()
+                logging.info(f"Найдена строка ОС: {os_string}")
+                return os_string
+
+        return None
+
+    def _programs_from_anchor(self, anchor):
+        """Извлекает таблицу программ, следующую за якорем раздела."""
+        if anchor is None:
+            logging.warning("Таблица с установленными программами не найдена")
+            return []
 
-                if os_match:
-                    os_string = os_match.group(1).strip()
-                    logging.info(f"Найдена строка имя пк: {os_string}")
-                    return os_string
+        return self._programs_from_table(self.backend.find_next(anchor, "table"))  # Берем таблицу после заголовка
 
-        return "Имя компьютера не найдено"
+    def _programs_from_table(self, program_table):
+        """Возвращает список пар (программа, версия) из таблицы программ.
 
-    def _extract_os_info(self, soup):
-        """Извлечение информации об операционной системе"""
-        rows = soup.find_all('tr')
+        Ячейки читаются напрямую из разобранных строк таблицы. Результат
+        совпадает с прежним pd.read_html(header=0) и iloc[1:, [2, 3]]: первая
+        строка — заголовок, первая строка данных пропускается, программа и
+        версия берутся из третьего и четвертого столбцов. Как и в pandas,
+        <br> в ячейке становится переводом строки, а тот — пробелом
+        ("Dr.Web<BR>Agent" -> "Dr.Web Agent").
+        """
+        if program_table is None:
+            logging.error("Ошибка при извлечении программ: таблица не найдена")
+            return []
 
+        try:
+            grid = _expand_table_spans(self.backend.table_rows(program_table))
+            width = max((len(row) for row in grid), default=0)
+            if width < 4:
+                raise ValueError(f"в таблице {width} столбцов, ожидается не менее 4")
+
+            body = grid[1:]  # Первая строка — заголовок
+            names, versions = _format_columns(
+                _convert_column([_cell(row, 2) for row in body]),
+                _convert_column([_cell(row, 3) for row in body])
+            )
+            return list(zip(names, versions))[1:]  # Пропускаем первую строку
+        except Exception as e:
+            logging.error(f"Ошибка при извлечении программ: {str(e)}")
+            return []
 
-        for row in rows:
-            row_text = row.get_text(separator=' ', strip=True)
+    def _installed_programs(self, anchor):
+        """Пары (программа, версия) из таблицы программ после якоря раздела."""
+        try:
+            return self._programs_from_anchor(anchor)
+        except Exception as e:
+            logging.error(f"Ошибка при обработке списка ПО: {str(e)}")
+            return []
 
-            if "Операционная система" in row_text:
-                row_text = re.sub(r'\s+', ' ', row_text)
-                os_match = re.search(r'Операционная система\s+(.*?)(?:\s+Дата|\s*$)', row_text)
+    def _users_from_anchor(self, users_section):
+        """Извлекает пользователей из таблицы, следующей за якорем раздела."""
+        if users_section is None:
+            return []
 
-                if os_match:
-                    os_string = os_match.group(1).strip()
-                    logging.info(f"Найдена строка ОС: {os_string}")
-                    return os_string
+        try:
+            backend = self.backend
+            users_table = backend.find_next(backend.parent(backend.parent(users_section)), 'table')
+        except Exception as e:
+            logging.error(f"Ошибка при извлечении пользователей: {str(e)}")
+            return []
 
-        return "Операционная система не найдена"
+        return self._users_from_table(users_table)
 
-    def _extract_installed_programs(self, soup):
-        """Функция для извлечения установленных программ."""
-        program_table = soup.find("a", {"name": "installed programs"})  # Ищем якорь
-        if program_table:
-            program_table = program_table.find_next("table")  # Берем таблицу после заголовка
-            table_html = str(program_table)  # Преобразуем таблицу в строку
-        else:
-            logging.warning("Таблица с установленными программами не найдена")
-            return pd.DataFrame(columns=["Программа", "Версия"])
+    def _users_from_table(self, users_table):
+        """Извлекает имена пользователей из таблицы раздела пользователей."""
+        users_list = []
 
         try:
-            df = pd.read_html(StringIO(table_html), header=0)[0]  # Берем первую таблицу
-            df = df.iloc[1:, [2, 3]]  # Пропускаем первую строку, берем нужные столбцы
-            df.columns = ["Программа", "Версия"]
-            return df
+            # Ищем все блоки dt, которые содержат имена пользователей
+            user_blocks = self.backend.find_all_by_class(users_table, 'td', 'dt')
+            for block in user_blocks:
+                user_text = self.backend.text(block).strip()
+                # Извлекаем имя пользователя из строки [ UserName ]
+                user_match = re.search(r'\[\s*([^]]+)\s*\]', user_text)
+                if user_match:
+                    user_name = user_match.group(1).strip()
+                    users_list.append(user_name)
         except Exception as e:
-            logging.error(f"Ошибка при извлечении программ: {str(e)}")
-            return pd.DataFrame(columns=["Программа", "Версия"])
+            logging.error(f"Ошибка при извлечении пользователей: {str(e)}")
+
+        return users_list
+
+    def parse_html_file_streaming(self, file_path):
+        """Потоковый парсинг HTML файла без построения полного DOM.
+
+        Файл читается блоками по STREAM_CHUNK_SIZE и подается в
+        StreamingReportScanner. В память попадают только тексты строк
+        сводной информации и разметка таблиц программ и пользователей;
+        разбор прекращается, как только все поля найдены. Если нужен хэш
+        содержимого (content_digest), блоки хэшируются по мере чтения,
+        а остаток файла дочитывается только для хэша.
+        """
+        # Получаем относительный путь к файлу
+        rel_path = os.path.relpath(file_path, start=self.start_dir)
 
-    def _extract_software(self, soup):
-        """Извлечение списка программного обеспечения"""
-        software_list = []
+        # Проверяем, не был ли файл уже обработан
+        if rel_path in self.processed_files:
+            logging.info(f"Файл {rel_path} уже был обработан. Пропускаем.")
+            return None
 
+        scanner = StreamingReportScanner()
+        hasher = content_hasher() if self.content_digest else None
         try:
-            programs_df = self._extract_installed_programs(soup)
-            for index, row in programs_df.iterrows():
-                program_name = row["Программа"]
-                program_version = row["Версия"]
-                software_list.append(" ".join([str(program_name), str(program_version)]))
-        except Exception as e:
-            logging.error(f"Ошибка при обработке списка ПО: {str(e)}")
+            with open(file_path, 'rb') as file:
+                # Кодировка определяется по началу файла, затем блоки декодируются по мере чтения.
+                # Переводы строк приводятся к '\n', как при чтении в текстовом режиме
+                with self.timer.phase('read'):
+                    block = file.read(ENCODING_SNIFF_BYTES)
+                encoding, source, bom_length = detect_encoding(block)
+                self.timer.encoding = f"{encoding} ({source})"
+                decoder = io.IncrementalNewlineDecoder(
+                    codecs.getincrementaldecoder(encoding)(DECODE_ERRORS_HANDLER), translate=True)
+                _decode_errors.count = 0
+                start = bom_length
+                while True:
+                    with self.timer.phase('read'):
+                        if hasher is not None:
+                            hasher.update(block)
+                        text = decoder.decode(block[start:], final=not block)
+                    with self.timer.phase('scan'):
+                        scanner.feed(text)
+                        if not block:
+                            scanner.finish()
+                    if not block or scanner.done:
+                        break
+                    with self.timer.phase('read'):
+                        block = file.read(STREAM_CHUNK_SIZE)
+                    start = 0
+
+                # Все поля найдены до конца файла: остаток нужен только для хэша
+                if hasher is not None and block:
+                    with self.timer.phase('read'):
+                        for block in iter(lambda: file.read(DIGEST_CHUNK_SIZE), b''):
+                            hasher.update(block)
+                if hasher is not None:
+                    self.timer.digest = hasher.hexdigest()
+                # Прочитано с диска (без хэша чтение прекращается, когда найдены все поля)
+                self.timer.bytes_read += file.raw.tell()
+                self.timer.decode_errors += _decode_errors.count
+        except UnicodeDecodeError:
+            logging.error(f"Невозможно прочитать файл {file_path}. Проблемы с кодировкой.")
+            return None
 
-        return software_list
+        # Добавляем файл в множество обработанных
+        self.processed_files.add(rel_path)
 
-    def _extract_users(self, soup):
-        """Извлечение списка пользователей"""
-        users_list = []
-        users_section = soup.find('a', attrs={'name': 'users'})
-        users_count = 1
+        # Программы
+        if PROGRAMS_ANCHOR in scanner.anchors:
+            with self.timer.phase('sections'):
+                table = self._section_table(scanner, PROGRAMS_ANCHOR)
+            with self.timer.phase('software'):
+                programs = self._programs_from_table(table)
+        else:
+            logging.warning("Таблица с установленными программами не найдена")
+            programs = []
+
+        # Пользователи
+        if USERS_ANCHOR in scanner.anchors:
+            with self.timer.phase('sections'):
+                table = self._section_table(scanner, USERS_ANCHOR)
+            with self.timer.phase('users'):
+                users = self._users_from_table(table)
+        else:
+            users = []
 
-        if users_section:
-            try:
-                # Ищем все блоки dt, которые содержат имена пользователей
-                user_blocks = users_section.parent.parent.find_next('table').find_all('td', class_='dt')
-                for block in user_blocks:
-                    user_text = block.text.strip()
-                    # Извлекаем имя пользователя из строки [ UserName ]
-                    user_match = re.search(r'\[\s*([^]]+)\s*\]', user_text)
-                    if user_match:
-                        user_name = user_match.group(1).strip()
-                        users_list.append(f"{users_count}. {user_name} ")
-                        users_count += 1
-            except Exception as e:
-                logging.error(f"Ошибка при извлечении пользователей: {str(e)}")
+        data = {
+            'file_name': rel_path,
+            'pc_name': scanner.pc_name if scanner.pc_name is not None else PC_NAME_NOT_FOUND,
+            'os_info': scanner.os_info if scanner.os_info is not None else OS_INFO_NOT_FOUND,
+            'programs': programs,
+            'users': users
+        }
 
-        return users_list
+        return data
 
+    def _section_table(self, scanner, anchor):
+        """Разбирает сохраненную сканером таблицу раздела. Возвращает таблицу или None."""
+        markup = scanner.sections.get(anchor)
+        if markup is None:
+            return None
+        return self.backend.find_next(self.backend.parse(markup), 'table')
 
-class ExcelReportGenerator:
-    """Класс для создания и форматирования Excel отчетов"""
+
+class StreamingReportScanner(HtmlTokenizer):
+    """Потоковый сканер отчета AIDA64 на базе html.parser.HTMLParser.
+
+    Документ подается частями через feed(), полное дерево не строится.
+    Сканер повторяет модель вложенности BeautifulSoup('html.parser'):
+    незакрытые теги остаются открытыми, закрывающий тег закрывает ближайший
+    одноименный элемент. Поэтому тексты строк и границы таблиц совпадают
+    с разбором полного дерева.
+
+    Текст строк таблиц копится только пока не найдены имя компьютера и ОС.
+    Для разделов программ и пользователей сохраняется лишь разметка первой
+    таблицы после якоря (словарь sections), которая разбирается отдельно.
+    """
+
+    # Элементы без закрывающего тега (как в BeautifulSoup)
+    VOID_ELEMENTS = frozenset((
+        'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+        'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+        'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+    ))
+    # Элементы, текст которых не входит в get_text()
+    HIDDEN_TEXT_ELEMENTS = frozenset(('script', 'style', 'template'))
+    # Якоря разделов, таблицы которых нужно сохранить
+    SECTION_ANCHORS = (PROGRAMS_ANCHOR, USERS_ANCHOR)
 
     def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pc_name = None
+        self.os_info = None
+        self.anchors = set()  # Найденные якоря разделов
+        self.sections = {}  # Якорь -> разметка таблицы раздела
+
+        self._stack = []  # Имена открытых элементов
+        self._hidden_depth = 0  # Число открытых элементов из HIDDEN_TEXT_ELEMENTS
+        self._text = []  # Части текущего текстового узла
+        self._row_texts = []  # Тексты внутри открытых строк таблиц
+        self._open_rows = []  # (номер строки, начало в _row_texts, позиция в стеке)
+        self._row_count = 0
+        self._candidates = {}  # Поле -> (номер строки, значение)
+        self._pending_anchors = []  # Якоря, ожидающие следующую таблицу
+        self._captures = []  # [якоря, позиция таблицы в стеке, части разметки]
+
+    @property
+    def collecting_rows(self):
+        """Нужно ли еще собирать текст строк таблиц."""
+        return self.pc_name is None or self.os_info is None
+
+    @property
+    def done(self):
+        """Все поля найдены, дальнейшее чтение документа не требуется."""
+        return (not self.collecting_rows
+                and all(anchor in self.sections for anchor in self.SECTION_ANCHORS))
+
+    def finish(self):
+        """Завершает разбор: закрывает все открытые элементы, как в конце документа."""
+        self.close()
+        self._flush_text()
+        self._pop_to(0)
+
+    # Обработчики токенизатора
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self.get_starttag_text())
+        if tag in self.VOID_ELEMENTS:
+            self._pop_last(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self.get_starttag_text())
+        self._pop_last(tag)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        self._record(f"</{tag}>")
+        self._pop_last(tag)
+
+    def handle_data(self, data):
+        self._text.append(data)
+        self._record(escape(data, quote=False))
+
+    def handle_comment(self, data):
+        self._flush_text()
+        self._record(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def unknown_decl(self, data):
+        self._flush_text()
+
+    # Внутренние методы
+
+    def _record(self, markup):
+        """Добавляет разметку во все сохраняемые таблицы разделов."""
+        for capture in self._captures:
+            capture[2].append(markup)
+
+    def _start(self, tag, attrs, markup):
+        self._flush_text()
+        self._record(markup)
+
+        if tag == 'a':
+            anchor = dict(attrs).get('name')
+            if anchor in self.SECTION_ANCHORS and anchor not in self.anchors:
+                self.anchors.add(anchor)
+                # Таблица пользователей ищется от родителя родителя якоря:
+                # у якоря верхнего уровня его нет, как и таблицы раздела
+                if anchor != USERS_ANCHOR or self._stack:
+                    self._pending_anchors.append(anchor)
+
+        elif tag == 'table' and self._pending_anchors:
+            # Первая таблица после якоря — таблица раздела
+            self._captures.append([self._pending_anchors, len(self._stack), [markup]])
+            self._pending_anchors = []
+
+        elif tag == 'tr' and self.collecting_rows:
+            self._row_count += 1
+            self._open_rows.append((self._row_count, len(self._row_texts), len(self._stack)))
+
+        if tag in self.HIDDEN_TEXT_ELEMENTS:
+            self._hidden_depth += 1
+        self._stack.append(tag)
+
+    def _flush_text(self):
+        """Завершает текущий текстовый узел и добавляет его к открытым строкам."""
+        if not self._text:
+            return
+        text = ''.join(self._text).strip()
+        self._text = []
+        if text and self._open_rows and not self._hidden_depth:
+            self._row_texts.append(text)
+
+    def _pop_last(self, tag):
+        """Закрывает ближайший открытый элемент с указанным именем."""
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index] == tag:
+                self._pop_to(index)
+                return
+
+    def _pop_to(self, index):
+        """Закрывает все элементы стека начиная с позиции index."""
+        for tag in self._stack[index:]:
+            if tag in self.HIDDEN_TEXT_ELEMENTS:
+                self._hidden_depth -= 1
+        del self._stack[index:]
+
+        while self._open_rows and self._open_rows[-1][2] >= index:
+            self._close_row(self._open_rows.pop())
+        if not self._open_rows:
+            self._finalize_rows()
+
+        while self._captures and self._captures[-1][1] >= index:
+            anchors, _, parts = self._captures.pop()
+            markup = ''.join(parts)
+            for anchor in anchors:
+                self.sections[anchor] = markup
+
+    def _close_row(self, row):
+        """Сопоставляет текст закрытой строки с шаблонами полей."""
+        row_number, start, _ = row
+        if not self.collecting_rows:
+            return
+
+        row_text = ' '.join(self._row_texts[start:])
+        for field, match in (('pc_name', HtmlParser._match_pc_name), ('os_info', HtmlParser._match_os_info)):
+            if getattr(self, field) is not None:
+                continue
+            value = match(row_text)
+            candidate = self._candidates.get(field)
+            if value is not None and (candidate is None or row_number < candidate[0]):
+                self._candidates[field] = (row_number, value)
+
+    def _finalize_rows(self):
+        """Фиксирует найденные поля, когда не осталось открытых строк.
+
+        Поиск в BeautifulSoup идет в порядке начала строк, поэтому совпадение
+        во вложенной строке окончательно только после закрытия внешних строк.
+        """
+        for field, (_, value) in self._candidates.items():
+            if getattr(self, field) is None:
+                setattr(self, field, value)
+        self._candidates = {}
+        self._row_texts = []
+
+
+class ExcelReportGenerator:
+    """Класс для создания и форматирования Excel отчетов.
+
+    Книга создается в режиме только для записи: строки сразу уходят в файл,
+    поэтому потребление памяти не растет с числом обработанных отчетов.
+    """
+
+    HEADERS = ["№", "Имя файла", "Тип ПК", "Операционная система", "Прикладное ПО", "Защитное ПО", "Пользователи"]
+
+    # Ширина столбцов
+    COLUMN_WIDTHS = {
+        'A': 5,  # №
+        'B': 40,  # Имя файла
+        'C': 20,  # Тип ПК
+        'D': 60,  # Операционная система
+        'E': 60,  # Прикладное ПО
+        'F': 60,  # Защитное ПО
+        'G': 40,  # Пользователи
+    }
+
+    # Лист копий отчетов
+    DUPLICATES_HEADERS = ["№", "Имя файла", "Совпадает с файлом"]
+    DUPLICATES_COLUMN_WIDTHS = {'A': 5, 'B': 60, 'C': 60}
+
+    # Сводные листы по установленному ПО
+    INSTALLS_HEADERS = ["№", "Программа", "Компьютеров", "Версий", "Защитное ПО"]
+    INSTALLS_COLUMN_WIDTHS = {'A': 5, 'B': 60, 'C': 14, 'D': 10, 'E': 30}
+    VERSIONS_HEADERS = ["Программа", "Версия", "Компьютеров", "Компьютеры"]
+    VERSIONS_COLUMN_WIDTHS = {'A': 60, 'B': 20, 'C': 14, 'D': 80}
+    UNPROTECTED_HEADERS = ["№", "Имя файла", "Тип ПК", "Операционная система"]
+    UNPROTECTED_COLUMN_WIDTHS = {'A': 5, 'B': 40, 'C': 20, 'D': 60}
+    # Лист изменений относительно предыдущего запуска
+    CHANGES_HEADERS = ["№", "Тип ПК", "Имя файла", "Изменение", "ПО / пользователь", "Было", "Стало"]
+    CHANGES_COLUMN_WIDTHS = {'A': 5, 'B': 20, 'C': 40, 'D': 22, 'E': 50, 'F': 40, 'G': 40}
+    # Лист файлов, которые не удалось обработать
+    ERRORS_HEADERS = ["№", "Имя файла", "Ошибка"]
+    ERRORS_COLUMN_WIDTHS = {'A': 5, 'B': 60, 'C': 80}
+    # Оглавление отчета, разбитого на части
+    SHARDS_HEADERS = ["№", "Часть", "Файл", "Компьютеров"]
+    SHARDS_COLUMN_WIDTHS = {'A': 5, 'B': 50, 'C': 60, 'D': 14}
+    # Предел длины текста ячейки Excel
+    CELL_TEXT_LIMIT = 32767
+
+    # Имена стилей книги
+    HEADER_STYLE = "Заголовок"
+    TEXT_STYLE = "Текст"
+    WRAP_STYLE = "Текст с переносом"
+
+    def __init__(self, classifier=None):
+        # openpyxl загружается долго, поэтому импортируется только при создании отчета
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        from openpyxl.styles import Alignment, Font, Border, NamedStyle, Side
+        from openpyxl.styles.fonts import DEFAULT_FONT
+        from openpyxl.worksheet.worksheet import Worksheet
+        self._workbook_class = openpyxl.Workbook
+        self._cell_class = WriteOnlyCell
+        self._illegal_characters = ILLEGAL_CHARACTERS_RE
+        self._named_style_class = NamedStyle
+        self._default_font = DEFAULT_FONT
+        self._landscape = Worksheet.ORIENTATION_LANDSCAPE
+
+        # Классификатор защитного ПО
+        self.classifier = classifier or SecurityClassifier()
+
         # Стиль границ
         self.thin_border = Border(
             left=Side(style='thin'),
@@ -189,47 +855,76 @@ class ExcelReportGenerator:
         self.center_alignment = Alignment(vertical='top')
 
     def create_workbook(self, output_file):
-        """Создает новую книгу Excel и настраивает заголовки"""
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Результаты анализа"
+        """Создает новую книгу Excel и записывает заголовки"""
+        wb = self._new_workbook()
+
+        ws = wb.create_sheet("Результаты анализа")
 
         # Установка альбомной ориентации
-        ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
+        ws.page_setup.orientation = self._landscape
+
+        # Ширину столбцов нужно задать до записи первой строки
+        for col_letter, width in self.COLUMN_WIDTHS.items():
+            ws.column_dimensions[col_letter].width = width
 
         # Добавляем заголовки
-        headers = ["№", "Имя файла", "Тип ПК", "Операционная система", "Прикладное ПО", "Защитное ПО", "Пользователи"]
-        for col_num, header in enumerate(headers, 1):
-            col_letter = get_column_letter(col_num)
-            ws[f"{col_letter}1"] = header
-            # Стиль заголовка
-            ws[f"{col_letter}1"].font = self.header_font
-            ws[f"{col_letter}1"].alignment = self.header_alignment
-
-        # Настройка ширины столбцов
-        ws.column_dimensions['A'].width = 5  # №
-        ws.column_dimensions['B'].width = 40  # Имя файла
-        ws.column_dimensions['C'].width = 20  # Тип ПК
-        ws.column_dimensions['D'].width = 60  # Операционная система
-        ws.column_dimensions['E'].width = 60  # Прикладное ПО
-        ws.column_dimensions['F'].width = 60  # Защитное ПО
-        ws.column_dimensions['G'].width = 40  # Пользователи
+        ws.append([self._styled_cell(ws, header, self.HEADER_STYLE) for header in self.HEADERS])
 
         return wb, ws
 
-    def add_data_to_worksheet(self, ws, row_num, counter, data):
-        """Добавляет данные в таблицу и форматирует ячейки"""
-        ws[f"A{row_num}"] = counter
-        ws[f"B{row_num}"] = data['file_name']
-        ws[f"C{row_num}"] = data['pc_name']
-        ws[f"D{row_num}"] = data['os_info']
+    def create_index_workbook(self):
+        """Создает книгу-оглавление для отчета, разбитого на части.
+
+        Первый лист — "Части отчета" (заполняется в add_shard_rows), за ним
+        добавляются сводные листы. Строк компьютеров в оглавлении нет.
+        """
+        wb = self._new_workbook()
+        ws = self._create_sheet(wb, "Части отчета", self.SHARDS_HEADERS, self.SHARDS_COLUMN_WIDTHS)
+        return wb, ws
+
+    def add_shard_rows(self, ws, output_file, shards):
+        """Заполняет лист "Части отчета" ссылками на файлы частей.
+
+        Args:
+            output_file (str): Путь к оглавлению; ссылки задаются относительно его папки
+            shards (list): (название части, путь к файлу, строк)
+        """
+        index_dir = os.path.dirname(os.path.abspath(output_file))
+        for number, (key, path, rows) in enumerate(shards, 1):
+            link = os.path.relpath(os.path.abspath(path), index_dir)
+            file_cell = self._styled_cell(ws, link, self.TEXT_STYLE)
+            file_cell.hyperlink = link
+            ws.append([
+                self._styled_cell(ws, number, self.TEXT_STYLE),
+                self._styled_cell(ws, key, self.TEXT_STYLE),
+                file_cell,
+                self._styled_cell(ws, rows, self.TEXT_STYLE),
+            ])
+
+    def _new_workbook(self):
+        """Создает пустую книгу в режиме только для записи со стилями отчета."""
+        wb = self._workbook_class(write_only=True)
+
+        # Стили регистрируются в книге один раз, ячейки ссылаются на них по имени
+        wb.add_named_style(self._named_style_class(
+            name=self.HEADER_STYLE, font=self.header_font, alignment=self.header_alignment))
+        wb.add_named_style(self._named_style_class(
+            name=self.TEXT_STYLE, font=self._default_font, border=self.thin_border,
+            alignment=self.center_alignment))
+        wb.add_named_style(self._named_style_class(
+            name=self.WRAP_STYLE, font=self._default_font, border=self.thin_border,
+            alignment=self.wrap_alignment))
+        return wb
 
+    def add_data_to_worksheet(self, ws, row_num, counter, data):
+        """Добавляет строку с данными в таблицу. Возвращает номер следующей строки"""
         # Форматируем список ПО с нумерацией
         software_list = ""
         security_list = ""
         security_count = 1
 
-        for i, sw in enumerate(data['software'], 1):
+        for i, (program_name, program_version) in enumerate(data['programs'], 1):
+            sw = software_title(program_name, program_version)
             software_list += f"{i}. {sw}\n"
 
             # Проверяем, является ли ПО защитным
@@ -237,118 +932,1080 @@ class ExcelReportGenerator:
                 security_list += f"{security_count}. {sw}\n"
                 security_count += 1
 
-        ws[f"E{row_num}"] = software_list
-        ws[f"E{row_num}"].alignment = self.wrap_alignment
-
-        ws[f"F{row_num}"] = security_list
-        ws[f"F{row_num}"].alignment = self.wrap_alignment
-
         # Форматируем список пользователей
-        users_list = "\n".join(data['users'])
-        ws[f"G{row_num}"] = users_list
-
-        # Применение стилей ячеек
-        for col in range(1, 8):
-            col_letter = get_column_letter(col)
-            ws[f"{col_letter}{row_num}"].border = self.thin_border
-            if col != 5 and col != 6:  # Не для колонок E и F, они уже имеют свой стиль
-                ws[f"{col_letter}{row_num}"].alignment = self.center_alignment
+        users_list = "\n".join(f"{i}. {user_name} " for i, user_name in enumerate(data['users'], 1))
+
+        # Высота строки известна сразу: строка записывается в файл один раз
+        height = self.row_height(software_list)
+        if height is not None:
+            ws.row_dimensions[row_num].height = height
+
+        ws.append([
+            self._styled_cell(ws, counter, self.TEXT_STYLE),
+            self._styled_cell(ws, data['file_name'], self.TEXT_STYLE),
+            self._styled_cell(ws, data['pc_name'], self.TEXT_STYLE),
+            self._styled_cell(ws, data['os_info'], self.TEXT_STYLE),
+            self._styled_cell(ws, software_list, self.WRAP_STYLE),
+            self._styled_cell(ws, security_list, self.WRAP_STYLE),
+            self._styled_cell(ws, users_list, self.TEXT_STYLE),
+        ])
+
+        # Строка уже записана, ее размеры больше не нужны
+        ws.row_dimensions.pop(row_num, None)
 
         return row_num + 1
 
-    def adjust_row_heights(self, ws, last_row):
-        """Автоподбор высоты строк"""
-        char_per_line = 60 // 7
-        for row in range(2, last_row):
-            cell_value = ws[f"E{row}"].value
-            if cell_value:
-                # Подсчитываем количество строк в содержимом ячейки
-                line_count = sum(len(line) // char_per_line + 1 for line in cell_value.split("\n"))
-                # Устанавливаем высоту строки пропорционально количеству строк
-                ws.row_dimensions[row].height = max(30, min(line_count * 18, 1200))
+    def add_duplicates_sheet(self, wb, duplicates):
+        """Добавляет лист со списком копий отчетов.
+
+        Args:
+            duplicates (list): Пары (имя файла копии, имя файла оригинала)
+        """
+        ws = self._create_sheet(wb, "Дубликаты", self.DUPLICATES_HEADERS, self.DUPLICATES_COLUMN_WIDTHS)
+        for number, (file_name, original_name) in enumerate(duplicates, 1):
+            ws.append([
+                self._styled_cell(ws, number, self.TEXT_STYLE),
+                self._styled_cell(ws, file_name, self.TEXT_STYLE),
+                self._styled_cell(ws, original_name, self.TEXT_STYLE),
+            ])
+
+    def add_errors_sheet(self, wb, errors):
+        """Добавляет лист "Ошибки" со списком файлов, которые не удалось обработать.
+
+        Управляющие символы, которые нельзя записать в ячейку (они часто и есть
+        причина ошибки записи), из имени файла и текста ошибки удаляются.
+
+        Args:
+            errors (list): Пары (имя файла, текст ошибки)
+        """
+        ws = self._create_sheet(wb, "Ошибки", self.ERRORS_HEADERS, self.ERRORS_COLUMN_WIDTHS)
+        for number, (file_name, error) in enumerate(errors, 1):
+            ws.append([
+                self._styled_cell(ws, number, self.TEXT_STYLE),
+                self._styled_cell(ws, self._illegal_characters.sub("", file_name), self.TEXT_STYLE),
+                self._styled_cell(ws, self._illegal_characters.sub("", error or "")[:self.CELL_TEXT_LIMIT],
+                                  self.TEXT_STYLE),
+            ])
+
+    def add_inventory_sheets(self, wb, inventory):
+        """Добавляет сводные листы по индексу ПО (SoftwareInventory).
+
+        "Установки ПО" — программы по убыванию числа компьютеров, "Версии ПО" —
+        компьютеры по версиям каждой программы, "Без защитного ПО" — компьютеры,
+        на которых не найдено ни одной программы из правил защитного ПО.
+        """
+        ws = self._create_sheet(wb, "Установки ПО", self.INSTALLS_HEADERS, self.INSTALLS_COLUMN_WIDTHS)
+        for number, (name, host_count, version_count, rule) in enumerate(inventory.install_counts(), 1):
+            ws.append([
+                self._styled_cell(ws, number, self.TEXT_STYLE),
+                self._styled_cell(ws, name, self.TEXT_STYLE),
+                self._styled_cell(ws, host_count, self.TEXT_STYLE),
+                self._styled_cell(ws, version_count, self.TEXT_STYLE),
+                self._styled_cell(ws, rule or "", self.TEXT_STYLE),
+            ])
+
+        ws = self._create_sheet(wb, "Версии ПО", self.VERSIONS_HEADERS, self.VERSIONS_COLUMN_WIDTHS)
+        for name, version, host_ids in inventory.version_spread():
+            pc_names = ", ".join(inventory.hosts[host_id][1] for host_id in host_ids)
+            ws.append([
+                self._styled_cell(ws, name, self.TEXT_STYLE),
+                self._styled_cell(ws, version, self.TEXT_STYLE),
+                self._styled_cell(ws, len(host_ids), self.TEXT_STYLE),
+                self._styled_cell(ws, pc_names[:self.CELL_TEXT_LIMIT], self.TEXT_STYLE),
+            ])
+
+        ws = self._create_sheet(wb, "Без защитного ПО", self.UNPROTECTED_HEADERS, self.UNPROTECTED_COLUMN_WIDTHS)
+        for host_id, file_name, pc_name, os_info in inventory.hosts_without_security():
+            ws.append([
+                self._styled_cell(ws, host_id, self.TEXT_STYLE),
+                self._styled_cell(ws, file_name, self.TEXT_STYLE),
+                self._styled_cell(ws, pc_name, self.TEXT_STYLE),
+                self._styled_cell(ws, os_info, self.TEXT_STYLE),
+            ])
+
+    def add_changes_sheet(self, wb, changes):
+        """Добавляет лист "Изменения" со списком отличий от предыдущего запуска.
+
+        Args:
+            changes (list): (имя компьютера, имя файла, изменение, объект, было, стало)
+        """
+        ws = self._create_sheet(wb, "Изменения", self.CHANGES_HEADERS, self.CHANGES_COLUMN_WIDTHS)
+        for number, change in enumerate(changes, 1):
+            ws.append([self._styled_cell(ws, number, self.TEXT_STYLE)] +
+                      [self._styled_cell(ws, value, self.TEXT_STYLE) for value in change])
+
+    def _create_sheet(self, wb, title, headers, column_widths):
+        """Создает лист с шириной столбцов и строкой заголовков."""
+        ws = wb.create_sheet(title)
+        for col_letter, width in column_widths.items():
+            ws.column_dimensions[col_letter].width = width
+        ws.append([self._styled_cell(ws, header, self.HEADER_STYLE) for header in headers])
+        return ws
+
+    @staticmethod
+    def row_height(cell_value):
+        """Автоподбор высоты строки по списку ПО. None — высота по умолчанию"""
+        if not cell_value:
+            return None
 
+        char_per_line = 60 // 7
+        # Подсчитываем количество строк в содержимом ячейки
+        line_count = sum(len(line) // char_per_line + 1 for line in cell_value.split("\n"))
+        # Высота строки пропорциональна количеству строк
+        return max(30, min(line_count * 18, 1200))
 
+    def _styled_cell(self, ws, value, style):
+        """Создает ячейку для записи с именованным стилем"""
+        cell = self._cell_class(ws, value=value)
+        cell.style = style
+        return cell
 
     def _contains_security_software(self, software_name):
         """Проверяет, является ли программа защитным ПО."""
-        lower_name = software_name.lower()
-        for keyword in SECURITY_SOFTWARE:
-            if keyword in lower_name:
-                return True
+        return self.classifier.is_security_software(software_name)
+
+
+def find_html_files(directory, include=None, exclude=None, follow_symlinks=False):
+    """Находит все .htm/.html файлы в директории и поддиректориях."""
+    return list(iter_html_files(directory, include, exclude, follow_symlinks))
+
+
+def compare_backends(directory, backends=None):
+    """Проверяет, что все HTML-парсеры дают одинаковые записи.
+
+    Каждый отчет из directory разбирается эталоном (bs4, полный DOM) и
+    каждым из backends (по умолчанию — всеми установленными) в обычном
+    и потоковом режимах.
+
+    Returns:
+        list: Расхождения в виде кортежей (file_path, backend, streaming)
+    """
+    if backends is None:
+        backends = available_backends()
+
+    reference = HtmlParser(directory, backend='bs4')
+    candidates = [
+        HtmlParser(directory, streaming=streaming, backend=backend)
+        for backend in backends
+        for streaming in (False, True)
+    ]
+
+    mismatches = []
+    for file_path in find_html_files(directory):
+        expected = reference.parse_html_file(file_path)
+        for candidate in candidates:
+            if candidate.parse_html_file(file_path) != expected:
+                logging.warning(f"Расхождение парсера {candidate.backend.name} "
+                                f"(потоковый: {candidate.streaming}) в файле {file_path}")
+                mismatches.append((file_path, candidate.backend.name, candidate.streaming))
+
+    return mismatches
+
+
+# Парсер рабочего процесса пула (создается в _init_worker)
+_worker_parser = None
+
+
+def _logging_config():
+    """Возвращает настройки журнала основного процесса для рабочих процессов."""
+    root_logger = logging.getLogger()
+    config = {'level': root_logger.level}
+    for handler in root_logger.handlers:
+        if isinstance(handler, logging.FileHandler):
+            config.update(filename=handler.baseFilename, filemode='a')
+            if handler.formatter is not None:
+                config['format'] = handler.formatter._fmt
+            break
+    return config
+
+
+def _memory_limit_supported():
+    """Можно ли ограничить память процесса разбора на этой платформе (_limit_memory)."""
+    if sys.platform == 'win32':
+        return True
+    try:
+        import resource  # noqa: F401
+    except ImportError:
         return False
+    return True
 
 
-def process_directory(directory, output_file, progress_callback=None):
-    """Обрабатывает указанную директорию и создает Excel отчет.
+def _limit_memory(memory_limit):
+    """Ограничивает память текущего процесса: превышение предела вызывает MemoryError.
 
-    Args:
-        directory (str): Путь к директории с HTML файлами
-        output_file (str): Путь для сохранения Excel отчета
-        progress_callback (function): Функция обратного вызова для обновления прогресса
+    В Windows процесс помещается в объект задания (Job Object) с пределом
+    выделенной памяти, в остальных системах ограничивается адресное
+    пространство (RLIMIT_AS).
     """
-    # Инициализация классов
-    parser = HtmlParser(directory)
-    excel_generator = ExcelReportGenerator()
+    if sys.platform == 'win32':
+        _limit_job_memory(memory_limit)
+        return
+
+    import resource
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+    if hard_limit != resource.RLIM_INFINITY:
+        memory_limit = min(memory_limit, hard_limit)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard_limit))
+
+
+def _limit_job_memory(memory_limit):
+    """Помещает текущий процесс в объект задания Windows с пределом памяти процесса."""
+    import ctypes
+    from ctypes import wintypes
+
+    class BasicLimitInformation(ctypes.Structure):
+        _fields_ = [
+            ('PerProcessUserTimeLimit', ctypes.c_int64),
+            ('PerJobUserTimeLimit', ctypes.c_int64),
+            ('LimitFlags', wintypes.DWORD),
+            ('MinimumWorkingSetSize', ctypes.c_size_t),
+            ('MaximumWorkingSetSize', ctypes.c_size_t),
+            ('ActiveProcessLimit', wintypes.DWORD),
+            ('Affinity', ctypes.c_size_t),
+            ('PriorityClass', wintypes.DWORD),
+            ('SchedulingClass', wintypes.DWORD),
+        ]
+
+    class IoCounters(ctypes.Structure):
+        _fields_ = [(name, ctypes.c_uint64) for name in (
+            'ReadOperationCount', 'WriteOperationCount', 'OtherOperationCount',
+            'ReadTransferCount', 'WriteTransferCount', 'OtherTransferCount',
+        )]
+
+    class ExtendedLimitInformation(ctypes.Structure):
+        _fields_ = [
+            ('BasicLimitInformation', BasicLimitInformation),
+            ('IoInfo', IoCounters),
+            ('ProcessMemoryLimit', ctypes.c_size_t),
+            ('JobMemoryLimit', ctypes.c_size_t),
+            ('PeakProcessMemoryUsed', ctypes.c_size_t),
+            ('PeakJobMemoryUsed', ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+    kernel32.CreateJobObjectW.argtypes = (wintypes.LPVOID, wintypes.LPCWSTR)
+    kernel32.SetInformationJobObject.argtypes = (wintypes.HANDLE, ctypes.c_int, wintypes.LPVOID, wintypes.DWORD)
+    kernel32.AssignProcessToJobObject.argtypes = (wintypes.HANDLE, wintypes.HANDLE)
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+
+    information = ExtendedLimitInformation()
+    information.BasicLimitInformation.LimitFlags = JOB_OBJECT_LIMIT_PROCESS_MEMORY
+    information.ProcessMemoryLimit = memory_limit
+    # Задание существует, пока в нем есть процесс: описатель не закрываем
+    job = kernel32.CreateJobObjectW(None, None)
+    if (not job
+            or not kernel32.SetInformationJobObject(job, JOB_OBJECT_EXTENDED_LIMIT_INFORMATION,
+                                                    ctypes.byref(information), ctypes.sizeof(information))
+            or not kernel32.AssignProcessToJobObject(job, kernel32.GetCurrentProcess())):
+        raise ctypes.WinError(ctypes.get_last_error())
+
+
+def _init_worker(start_dir, streaming=False, backend=AUTO_BACKEND, log_config=None, memory_limit=None,
+                 content_digest=False):
+    """Инициализирует парсер в рабочем процессе пула."""
+    global _worker_parser
+    # Запущенный заново процесс (spawn) не наследует настройки журнала
+    if log_config and not logging.getLogger().handlers:
+        logging.basicConfig(**log_config)
+    if memory_limit:
+        # Превышение предела вызывает MemoryError при разборе, а не нехватку памяти у всего пакета
+        try:
+            _limit_memory(memory_limit)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Не удалось ограничить память процесса разбора: {str(e)}")
+    _worker_parser = HtmlParser(start_dir, streaming=streaming, backend=backend, content_digest=content_digest)
 
-    # Создаем книгу Excel
-    wb, ws = excel_generator.create_workbook(output_file)
 
-    row_num = 2  # Начинаем с 2-й строки (после заголовков)
-    counter = 1  # Счетчик для номера строки
+def _parse_in_worker(file_path):
+    """Парсит один файл в рабочем процессе.
 
-    # Находим все .htm файлы в директории и поддиректориях
-    html_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.lower().endswith('.htm') or file.lower().endswith('.html'):
-                html_files.append(os.path.join(root, file))
+    Возвращает кортеж (file_path, data, error, timer), где data — словарь
+    с результатами разбора (или None), error — текст ошибки (или None),
+    timer — замеры времени фаз (PhaseTimer). Все значения сериализуемы
+    для передачи между процессами.
+    """
+    return _parse_file(_worker_parser, file_path)
 
-    total_files = len(html_files)
-    processed_files = 0
 
-    # Сообщаем о начале обработки
-    logging.info(f"Найдено {total_files} HTML файлов для обработки в {directory}")
+def _worker_main(connection, initargs):
+    """Рабочий процесс _ParsePool: получает пути к файлам и отправляет результаты разбора.
+
+    После инициализации отправляет None (процесс готов), затем на каждый
+    путь — результат _parse_in_worker. None вместо пути завершает процесс.
+    """
+    _init_worker(*initargs)
+    connection.send(None)
+    while True:
+        try:
+            file_path = connection.recv()
+        except EOFError:
+            break
+        if file_path is None:
+            break
+        result = _parse_in_worker(file_path)
+        try:
+            connection.send(result)
+        except Exception as e:
+            # Результат не удалось передать (например, не хватило памяти на сериализацию)
+            logging.error(f"Ошибка при обработке файла {file_path}: {str(e)}")
+            connection.send((file_path, None, str(e), result[3]))
 
-    if progress_callback:
-        progress_callback(0, total_files, "Начало обработки файлов...")
 
-    # Обрабатываем каждый файл
-    for file_path in html_files:
+def _parse_file(parser, file_path, content=None):
+    """Парсит один файл, перехватывая ошибки. Возвращает (file_path, data, error, timer).
+
+    Если content передан, файл уже прочитан стадией упреждающего чтения.
+    """
+    logging.info(f"Обработка файла: {file_path}")
+    parser.timer = timer = PhaseTimer()
+    try:
+        with timer.phase('parse'):
+            if content is None:
+                data = parser.parse_html_file(file_path)
+            else:
+                data = parser.parse_html_content(file_path, content)
+        return file_path, data, None, timer
+    except MemoryError:
+        logging.error(f"Ошибка при обработке файла {file_path}: превышен предел памяти процесса разбора")
+        return file_path, None, "Превышен предел памяти процесса разбора", timer
+    except Exception as e:
+        logging.error(f"Ошибка при обработке файла {file_path}: {str(e)}", exc_info=True)
+        return file_path, None, str(e), timer
+
+
+def _completed(result):
+    """Оборачивает готовый результат в завершенный Future."""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class _ParseTask:
+    """Разбор файла в пуле _ParsePool. Как и Future, имеет методы done() и result()."""
+
+    __slots__ = ('pool', 'file_path', 'outcome')
+
+    def __init__(self, pool, file_path):
+        self.pool = pool
+        self.file_path = file_path
+        self.outcome = None  # (file_path, data, error, timer), когда разбор завершен
+
+    def done(self):
+        return self.outcome is not None
+
+    def result(self):
+        return self.pool.result(self)
+
+
+class _ParseWorker:
+    """Процесс разбора пула _ParsePool и переданная ему задача."""
+
+    __slots__ = ('process', 'connection', 'task', 'started')
+
+    def __init__(self, context, initargs):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_connection, initargs), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.task = None  # Задача, которую процесс разбирает
+        self.started = None  # Начало разбора задачи (time.monotonic)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class _ParsePool:
+    """Пул процессов разбора со сторожем.
+
+    Процессу передается один файл, остальные ждут в очереди пула и достаются
+    процессам по мере освобождения; время разбора отсчитывается для каждого
+    процесса с начала его файла. Если разбор дольше file_timeout, завершается
+    только этот процесс: файл попадает в список ошибок, вместо процесса
+    запускается новый, а остальные процессы продолжают работу. Так же
+    заменяется процесс, аварийно завершившийся на файле (нехватка памяти,
+    сбой библиотеки разбора): файл, который он разбирал, попадает в список
+    ошибок. memory_limit ограничивает память процесса разбора (_limit_memory):
+    превышение дает MemoryError, и файл попадает в список ошибок. Пока результата нет, пул проверяет
+    cancel_event: зависший разбор не задерживает отмену обработки.
+
+    Результаты принимаются, только пока вызывающий код обращается к пулу
+    (submit, wait, result).
+    """
+
+    def __init__(self, parser, workers, file_timeout=None, memory_limit=None, cancel_event=None):
+        import multiprocessing
+
+        if memory_limit and not _memory_limit_supported():
+            logging.warning("Ограничение памяти процесса разбора не поддерживается на этой платформе")
+            memory_limit = None
+        self.file_timeout = file_timeout
+        # Больше задач передавать незачем: они только ждали бы свободного процесса
+        self.capacity = workers * (1 + QUEUED_FILES_PER_WORKER)
+        self._cancel_event = cancel_event
+        self._cancelled = False
+        self._context = multiprocessing.get_context()
+        self._initargs = (parser.start_dir, parser.streaming, parser.backend.name, _logging_config(), memory_limit,
+                          parser.content_digest)
+        self._queue = deque()  # Задачи, еще не переданные процессам
+        self._unfinished = 0
+        self._workers = [_ParseWorker(self._context, self._initargs) for _ in range(workers)]
+
+    @property
+    def full(self):
+        """Незавершенных задач не меньше capacity."""
+        return self._unfinished >= self.capacity
+
+    def submit(self, file_path):
+        task = _ParseTask(self, file_path)
+        self._queue.append(task)
+        self._unfinished += 1
+        self._poll(0)
+        return task
+
+    def wait(self):
+        """Дожидается завершения хотя бы одной задачи."""
+        unfinished = self._unfinished
+        while self._unfinished and self._unfinished == unfinished:
+            self._poll()
+
+    def result(self, task):
+        """Дожидается результата задачи: (file_path, data, error, timer)."""
+        while task.outcome is None:
+            self._poll()
+        return task.outcome
+
+    def _poll(self, timeout=None):
+        """Передает задачи процессам, принимает результаты и следит за временем разбора.
+
+        timeout — сколько ждать ответа процессов; None — пока не придет ответ,
+        не истечет время разбора или не настанет время проверить cancel_event.
+        """
+        from multiprocessing.connection import wait
+
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            self._cancel()
+        if self._cancelled:
+            return
+
+        self._dispatch()
+        if timeout is None:
+            timeout = self._wait_timeout()
+        waitables = {}
+        for worker in self._workers:
+            waitables[worker.connection] = worker
+            waitables[worker.process.sentinel] = worker
+        for ready in wait(list(waitables), timeout):
+            worker = waitables[ready]
+            # Процесс мог быть заменен при обработке другого события
+            if worker in self._workers:
+                self._receive(worker, crashed=ready is worker.process.sentinel)
+
+        if self.file_timeout:
+            now = time.monotonic()
+            for worker in list(self._workers):
+                if worker.started is not None and now - worker.started >= self.file_timeout:
+                    logging.error(f"Разбор файла {worker.task.file_path} прерван: дольше {self.file_timeout} с")
+                    self._replace(worker, f"Превышено время разбора ({self.file_timeout} с)")
+        self._dispatch()
+
+    def _wait_timeout(self):
+        timeout = None
+        if self.file_timeout:
+            started = [worker.started for worker in self._workers if worker.started is not None]
+            if started:
+                timeout = max(0.0, min(started) + self.file_timeout - time.monotonic())
+        if self._cancel_event is not None:
+            timeout = CANCEL_POLL_SECONDS if timeout is None else min(timeout, CANCEL_POLL_SECONDS)
+        return timeout
+
+    def _dispatch(self):
+        """Передает задачи из очереди свободным процессам."""
+        for worker in self._workers:
+            if not self._queue:
+                break
+            if worker.task is None:
+                try:
+                    worker.connection.send(self._queue[0].file_path)
+                except OSError:
+                    # Процесс завершился: его заменит _poll
+                    continue
+                worker.task = self._queue.popleft()
+                worker.started = time.monotonic()
+
+    def _receive(self, worker, crashed=False):
+        """Принимает ответы процесса; если процесс завершился (crashed), заменяет его."""
         try:
-            logging.info(f"Обработка файла: {file_path}")
+            while worker.connection.poll():
+                message = worker.connection.recv()
+                if message is None:
+                    # Процесс готов к работе: время его запуска не считается временем разбора
+                    if worker.task is not None:
+                        worker.started = time.monotonic()
+                    continue
+                task, worker.task, worker.started = worker.task, None, None
+                self._finish(task, message)
+        except (EOFError, OSError):
+            crashed = True
+        if crashed:
+            if worker.task is not None:
+                logging.error(f"Процесс разбора аварийно завершился на файле {worker.task.file_path}")
+            self._replace(worker, "Процесс разбора аварийно завершился (нехватка памяти или сбой библиотеки разбора)")
+
+    def _replace(self, worker, error):
+        """Завершает процесс и запускает вместо него новый. Задача процесса завершается с ошибкой error."""
+        worker.kill()
+        if worker.task is not None:
+            self._finish(worker.task, (worker.task.file_path, None, error, PhaseTimer()))
+        self._workers[self._workers.index(worker)] = _ParseWorker(self._context, self._initargs)
+
+    def _finish(self, task, outcome):
+        task.outcome = outcome
+        self._unfinished -= 1
+
+    def _cancel(self):
+        """Завершает все задачи результатом "Обработка отменена". Процессы остановит close()."""
+        self._cancelled = True
+        tasks = list(self._queue)
+        self._queue.clear()
+        for worker in self._workers:
+            if worker.task is not None:
+                tasks.append(worker.task)
+            worker.task = worker.started = None
+        for task in tasks:
+            self._finish(task, (task.file_path, None, "Обработка отменена", PhaseTimer()))
+
+    def close(self):
+        """Завершает процессы пула. Если остались незавершенные задачи (отмена), процессы останавливаются сразу."""
+        if self._unfinished or self._cancelled:
+            for worker in self._workers:
+                worker.kill()
+            return
+        for worker in self._workers:
+            try:
+                worker.connection.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(WORKER_STOP_SECONDS)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.connection.close()
+
+
+class _FileJob:
+    """Файл в конвейере обработки."""
+
+    __slots__ = ('file_path', 'data', 'digest', 'duplicate_of')
 
-            # Обновляем прогресс
-            if progress_callback:
-                progress_callback(processed_files, total_files, f"Обработка: {os.path.basename(file_path)}")
+    def __init__(self, file_path, data=None, digest=None, duplicate_of=None):
+        self.file_path = file_path
+        self.data = data  # Результат из кэша
+        self.digest = digest  # Хэш содержимого, если уже вычислен
+        self.duplicate_of = duplicate_of  # Путь к оригиналу для копии
 
-            # Парсим HTML файл
-            data = parser.parse_html_file(file_path)
-            if data is None:
-                processed_files += 1
+    @property
+    def needs_parse(self):
+        return self.data is None and self.duplicate_of is None
+
+
+def _prepare_jobs(parser, html_files, cache=None, duplicates=None, journal=None):
+    """Отсеивает копии и найденные в журнале или кэше файлы. Возвращает _FileJob в порядке файлов."""
+    for file_path in html_files:
+        digest = None
+        if duplicates is not None:
+            original, digest = duplicates.check(file_path)
+            if original is not None:
+                logging.info(f"Файл {file_path} совпадает с {original}. Пропускаем.")
+                yield _FileJob(file_path, digest=digest, duplicate_of=original)
                 continue
 
-            # Запись данных в Excel
-            row_num = excel_generator.add_data_to_worksheet(ws, row_num, counter, data)
-            counter += 1
+        data = None
+        if journal is not None:
+            try:
+                data = journal.lookup(file_path)
+            except OSError as e:
+                logging.warning(f"Ошибка проверки журнала для файла {file_path}: {str(e)}")
 
+        if data is None and cache is not None:
+            try:
+                data = cache.lookup(file_path)
+            except OSError as e:
+                logging.warning(f"Ошибка чтения кэша для файла {file_path}: {str(e)}")
+
+        if data is not None:
+            data = {'file_name': os.path.relpath(file_path, start=parser.start_dir), **data}
+        yield _FileJob(file_path, data, digest)
+
+
+def _uses_pool(workers, file_timeout=None, memory_limit=None):
+    """Выполняется ли разбор в пуле процессов (_ParsePool), а не в основном процессе."""
+    return workers > 1 or bool(file_timeout) or bool(memory_limit)
+
+
+def _parse_files(parser, html_files, workers=1, cache=None, duplicates=None, reader=None, parse_stats=None,
+                 journal=None, file_timeout=None, memory_limit=None, cancel_event=None):
+    """Парсит файлы и возвращает результаты в порядке html_files.
+
+    Результат — кортеж (file_path, data, error, duplicate_of, timer). Для
+    копии уже встречавшегося отчета duplicate_of — путь к оригиналу, а data
+    и error равны None: копия не разбирается. timer — замеры времени фаз
+    (PhaseTimer) или None, если файл не разбирался.
+
+    При workers > 1 разбор выполняется в пуле процессов (_ParsePool), а порядок
+    результатов не зависит от того, какой процесс закончил работу первым.
+    С file_timeout или memory_limit пул используется и при workers == 1:
+    зависший разбор можно остановить, только если он идет в отдельном процессе.
+    Пока самый ранний файл разбирается, следующие продолжают передаваться
+    в пул, а их результаты ждут его (не больше MAX_WAITING_RESULTS).
+    cancel_event передается пулу, чтобы ожидание результата прерывалось при отмене.
+    Найденные в журнале или кэше файлы не разбираются; новые результаты
+    сохраняются в кэш и дописываются в журнал (RunJournal).
+    Если передан reader (PrefetchReader), файлы читаются заранее в его
+    потоках, а разбору передается уже прочитанный текст. reader используется
+    только без пула: процессы пула читают файлы сами.
+    """
+    pool = None
+    if _uses_pool(workers, file_timeout, memory_limit):
+        pool = _ParsePool(parser, workers, file_timeout, memory_limit, cancel_event)
+
+    jobs = _prepare_jobs(parser, html_files, cache, duplicates, journal)
+    if reader is not None and pool is None:
+        files = reader.iter(jobs, lambda job: job.file_path if job.needs_parse else None)
+    else:
+        files = ((job, None, None, None) for job in jobs)
+
+    if parse_stats is not None:
+        parse_stats.start()
+
+    try:
+        # (_FileJob, Future или _ParseTask с результатом разбора либо None, замеры чтения) в порядке файлов
+        pending = deque()
+
+        for job, content, read_error, read_timer in files:
+            if not job.needs_parse:
+                future = None
+            elif read_error is not None:
+                future = _completed((job.file_path, None, read_error, PhaseTimer()))
+            elif pool is not None:
+                future = pool.submit(job.file_path)
+            else:
+                future = _completed(_parse_file(parser, job.file_path, content))
+            pending.append((job, future, read_timer))
+
+            while pending:
+                future = pending[0][1]
+                if future is None or future.done() or len(pending) > MAX_WAITING_RESULTS:
+                    yield _take_result(pending.popleft(), cache, parse_stats, journal)
+                elif pool is not None and pool.full:
+                    # Самый ранний файл еще разбирается: следующий передается, как только освободится место
+                    pool.wait()
+                else:
+                    break
+
+        while pending:
+            yield _take_result(pending.popleft(), cache, parse_stats, journal)
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+def _take_result(entry, cache, parse_stats=None, journal=None):
+    """Дожидается результата разбора и при необходимости сохраняет его в кэш и журнал."""
+    job, future, read_timer = entry
+    if future is None:
+        return job.file_path, job.data, None, job.duplicate_of, None
+
+    file_path, data, error, timer = future.result()
+    if parse_stats is not None:
+        parse_stats.add(timer.phases.get('parse', 0.0))
+    if read_timer is not None:
+        timer.merge(read_timer)
+
+    if cache is not None and data is not None:
+        try:
+            # Хэш уже посчитан поиском копий или при чтении файла
+            cache.store(file_path, data, job.digest or timer.digest)
+        except OSError as e:
+            logging.warning(f"Не удалось сохранить в кэш результат для файла {file_path}: {str(e)}")
+    if journal is not None and data is not None:
+        try:
+            journal.store(file_path, data)
+        except OSError as e:
+            logging.warning(f"Не удалось записать в журнал результат для файла {file_path}: {str(e)}")
+
+    return file_path, data, error, None, timer
+
+
+def _add_to_summaries(counter, data, classifier, exporters, software_inventory, host_keys, run_diff, snapshot):
+    """Добавляет записанную в отчет строку в выгрузки, индекс ПО, сравнение и снимок."""
+    if exporters:
+        host, software = host_rows(counter, data, classifier)
+        for exporter in exporters:
+            exporter.write(host, software)
+    if software_inventory is not None:
+        software_inventory.add(counter, data)
+    if host_keys is not None:
+        host_key, signature = host_keys.key(data), host_signature(data)
+        if run_diff is not None:
+            run_diff.add(host_key, signature, data)
+        if snapshot is not None:
+            snapshot.write(host_key, signature, data)
+
+
+def _add_shard_rows_to_summaries(shards, summaries, failed_files, write_stats):
+    """Добавляет в сводные данные строки, запись которых в части подтверждена."""
+    rows = shards.written()
+    if not rows:
+        return
+    started = time.perf_counter()
+    for counter, data, file_path in rows:
+        try:
+            _add_to_summaries(counter, data, *summaries)
         except Exception as e:
             logging.error(f"Ошибка при обработке файла {file_path}: {str(e)}", exc_info=True)
+            failed_files.append((file_path, str(e)))
+    write_stats.add(time.perf_counter() - started, items=0)
+
+
+def _progress_reporter(progress_callback):
+    """Функция прогресса (обработано, всего, сообщение=None, errors=0) поверх progress_callback.
+
+    Число ошибок передается именованным аргументом errors, только если
+    progress_callback его принимает: функции с прежней сигнатурой
+    (обработано, всего, сообщение=None) вызываются с тремя аргументами.
+    """
+    if progress_callback is None:
+        return None
+
+    import inspect
+    try:
+        parameters = inspect.signature(progress_callback).parameters.values()
+    except (TypeError, ValueError):
+        # Сигнатуру некоторых встроенных функций получить нельзя
+        parameters = ()
+    accepts_errors = any(
+        parameter.kind == parameter.VAR_KEYWORD
+        or (parameter.name == 'errors' and parameter.kind != parameter.POSITIONAL_ONLY)
+        for parameter in parameters
+    )
+    if accepts_errors:
+        return progress_callback
+    return lambda current, total, message=None, errors=0: progress_callback(current, total, message)
+
+
+def process_directory(directory, output_file, progress_callback=None, workers=1, streaming=False,
+                      backend=AUTO_BACKEND, cache_path=None, security_rules=None, summary=None,
+                      include=None, exclude=None, follow_symlinks=False, deduplicate=True,
+                      duplicates_sheet=True, read_threads=DEFAULT_READ_THREADS,
+                      prefetch_files=DEFAULT_PREFETCH_FILES, prefetch_bytes=DEFAULT_PREFETCH_BYTES,
+                      metrics_file=None, cancel_event=None, export_formats=None, inventory=True,
+                      snapshot_file=None, previous_snapshot=None, journal_file=None, shard_by=None,
+                      shard_rows=DEFAULT_SHARD_ROWS, shard_writers=DEFAULT_SHARD_WRITERS, file_timeout=None,
+                      memory_limit=None, errors_sheet=True):
+    """Обрабатывает указанную директорию и создает Excel отчет.
+
+    Args:
+        directory (str): Путь к директории с HTML файлами
+        output_file (str): Путь для сохранения Excel отчета
+        progress_callback (function): Функция обратного вызова для обновления прогресса:
+            (обработано, всего, сообщение или None). Если функция принимает именованный
+            аргумент errors, в нем передается число файлов, которые не удалось обработать
+        workers (int): Количество процессов для параллельного парсинга.
+            1 — последовательная обработка, None — по числу ядер процессора
+        streaming (bool): Потоковый разбор отчетов без построения полного DOM
+        backend (str): HTML-библиотека: 'auto', 'bs4', 'lxml' или 'selectolax'.
+            Если выбранная библиотека не установлена, используется bs4
+        cache_path (str): Путь к файлу кэша результатов разбора (SQLite).
+            None — без кэша. Неизмененные с прошлого запуска отчеты не разбираются
+        security_rules (str): Файл с ключевыми словами защитного ПО (по одному на строку).
+            None — встроенный список
+        summary (dict): Если передан, заполняется итогами обработки: число найденных
+            файлов и записанных строк, список ошибок, статистика кэша, парсер и число процессов
+        include (list): Шаблоны имен файлов для обработки (по умолчанию *.htm и *.html)
+        exclude (list): Шаблоны исключаемых файлов и директорий
+        follow_symlinks (bool): Обходить символические ссылки на директории
+        deduplicate (bool): Разбирать одинаковые по содержимому отчеты один раз.
+            Копии не попадают в основную таблицу; копии отчета, который не удалось
+            обработать, перечисляются среди ошибок с той же причиной
+        duplicates_sheet (bool): Добавить лист "Дубликаты" со списком копий и оригиналов
+        read_threads (int): Потоков упреждающего чтения файлов. 0 — файлы читаются
+            при разборе. Используется только при разборе в основном процессе (workers == 1
+            без file_timeout и memory_limit) и не в потоковом режиме: процессы пула читают
+            файлы сами, а потоковый разбор читает файл частями
+        prefetch_files (int): Сколько файлов читать заранее
+        prefetch_bytes (int): Предел размера прочитанных, но еще не разобранных файлов
+        metrics_file (str): Файл для замеров по каждому отчету (время фаз, объем чтения):
+            .csv — таблица, иначе JSON с итогами и списком самых медленных отчетов
+        cancel_event (threading.Event): Если событие установлено, обработка прекращается
+            после текущего файла: задачи пула отменяются, книга не сохраняется,
+            а уже разобранные отчеты остаются в кэше и журнале. Вызывается ProcessingCancelled
+
+        export_formats (list): Форматы нормализованной выгрузки рядом с Excel отчетом
+            ('csv', 'jsonl', 'parquet'): таблица компьютеров и таблица их ПО
+            с отдельными столбцами названия и версии
+        inventory (bool): Добавить сводные листы по установленному ПО: число установок,
+            разброс версий и компьютеры без защитного ПО. Индекс строится по мере записи строк
+        snapshot_file (str): Сохранить снимок результатов для сравнения при следующем запуске.
+            Прежний файл заменяется только после успешного сохранения отчета
+        previous_snapshot (str): Снимок предыдущего запуска. Отличия (новые и пропавшие
+            компьютеры, установленное, удаленное и обновленное ПО, смена ОС, пользователи)
+            выводятся на лист "Изменения". Может совпадать с snapshot_file
+        journal_file (str): Журнал обработки для продолжения прерванного запуска.
+            Разобранные отчеты сразу дописываются в журнал; если запуск прервался,
+            повторный запуск с тем же журналом не разбирает их заново.
+            Журнал удаляется после успешного сохранения отчета
+        shard_by (str): Разбить отчет на книги-части: 'rows' — по shard_rows строк,
+            'folder' — по папкам верхнего уровня, 'os' — по операционной системе.
+            Части сохраняются рядом с output_file (<отчет>.<часть>.xlsx), а output_file
+            становится оглавлением со ссылками на части и сводными листами.
+            None — одна книга
+        shard_rows (int): Строк в части при разбиении по числу строк
+        shard_writers (int): Процессов, параллельно записывающих части
+        file_timeout (float): Предел времени разбора одного файла, секунд. Процесс, который
+            разбирает файл дольше, останавливается, файл попадает в список ошибок,
+            а обработка остальных продолжается. None — без ограничения
+        memory_limit (int): Предел памяти процесса разбора, байт: в Windows — выделенной
+            памяти (Job Object), в остальных системах — адресного пространства. None — без ограничения
+        errors_sheet (bool): Добавить лист "Ошибки" со списком необработанных файлов
+
+    Raises:
+        ProcessingCancelled: Обработка отменена через cancel_event
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Инициализация классов
+    backend = resolve_backend_name(backend)
+    logging.info(f"Используемый HTML-парсер: {backend}")
+    if backend not in EQUIVALENT_BACKENDS:
+        # Режим auto такой парсер не выбирает: он указан явно
+        logging.warning(f"HTML-парсер {backend} разбирает отчеты с ошибками разметки иначе, чем bs4: "
+                        f"{NOT_EQUIVALENT_NOTE} (проверка: benchmarks/equivalence.py)")
+    # Для кэша разбора хэш содержимого считается при чтении: store() не перечитывает файл
+    parser = HtmlParser(directory, streaming=streaming, backend=backend, content_digest=bool(cache_path))
+    classifier = SecurityClassifier.from_file(security_rules) if security_rules else SecurityClassifier()
+    excel_generator = ExcelReportGenerator(classifier)
+
+    # Создаем книгу Excel
+    shards = None
+    if shard_by:
+        # Строки уходят в книги-части, основная книга — оглавление со ссылками на них
+        shards = ShardSet(output_file, shard_by, shard_rows, shard_writers, security_rules, _logging_config())
+        wb, ws = excel_generator.create_index_workbook()
+    else:
+        wb, ws = excel_generator.create_workbook(output_file)
+    exporters = create_exporters(export_formats, output_file) if export_formats else []
+    software_inventory = SoftwareInventory(classifier) if inventory else None
+
+    # Сравнение с предыдущим запуском: предыдущий снимок читается до записи нового
+    run_diff = RunDiff(previous_snapshot) if previous_snapshot else None
+    snapshot = SnapshotWriter(snapshot_file) if snapshot_file else None
+    host_keys = HostKeys(PC_NAME_NOT_FOUND) if run_diff is not None or snapshot is not None else None
+
+    row_num = 2  # Начинаем с 2-й строки (после заголовков)
+    counter = 1  # Счетчик для номера строки
+
+    # Файлы передаются на разбор по мере обнаружения, общее число растет во время поиска
+    discovery = FileDiscovery(directory, include, exclude, follow_symlinks)
+    processed_files = 0
+
+    # Сообщаем о начале обработки
+    logging.info(f"Поиск HTML файлов для обработки в {directory}")
+
+    progress = _progress_reporter(progress_callback)
+    if progress:
+        progress(0, 0, "Начало обработки файлов...", errors=0)
+
+    cache = ParseCache(cache_path, EXTRACTOR_VERSION) if cache_path else None
+    journal = RunJournal(journal_file, EXTRACTOR_VERSION, directory) if journal_file else None
+
+    if workers > 1:
+        logging.info(f"Параллельная обработка: {workers} процессов")
+    duplicates = DuplicateFinder() if deduplicate else None
+
+    # Потоковый разбор сам читает файл частями и прекращает чтение, когда найдены все поля.
+    # Процессы пула тоже читают файлы сами: иначе основной процесс декодировал бы каждый отчет
+    # и передавал бы текст процессу разбора, а это работа на одном ядре
+    reader = None
+    if read_threads and not streaming and not _uses_pool(workers, file_timeout, memory_limit):
+        read_file = partial(read_report, digest=True) if cache_path else read_report
+        reader = PrefetchReader(read_file, read_threads, prefetch_files, prefetch_bytes)
+    parse_stats = StageStats("parse", "Разбор")
+    write_stats = StageStats("write", "Запись")
+    metrics = MetricsRecorder()
+
+    results = _parse_files(parser, discovery, workers, cache, duplicates, reader, parse_stats, journal,
+                           file_timeout, memory_limit, cancel_event)
+
+    failed_files = []  # (file_path, error)
+    duplicate_files = []  # (file_path, original_path)
+    summaries = (classifier, exporters, software_inventory, host_keys, run_diff, snapshot)
+
+    # Записываем результаты в порядке следования файлов
+    for file_path, data, error, duplicate_of, timer in results:
+        if duplicate_of is not None:
+            duplicate_files.append((file_path, duplicate_of))
+            metrics.record(file_path, 'duplicate')
+        elif data is not None:
+            status = 'ok' if timer is not None else 'cached'
+            if timer is None:
+                timer = PhaseTimer()
+            try:
+                with timer.phase('write'):
+                    if shards is not None:
+                        # В сводные данные строка попадет, когда процесс записи ее запишет
+                        shards.write(counter, data, file_path)
+                    else:
+                        row_num = excel_generator.add_data_to_worksheet(ws, row_num, counter, data)
+                        _add_to_summaries(counter, data, *summaries)
+                write_stats.add(timer.phases['write'])
+                counter += 1
+            except Exception as e:
+                logging.error(f"Ошибка при обработке файла {file_path}: {str(e)}", exc_info=True)
+                failed_files.append((file_path, str(e)))
+                status = 'error'
+            metrics.record(file_path, status, timer)
+        else:
+            failed_files.append((file_path, error))
+            metrics.record(file_path, 'error', timer)
+
+        if shards is not None:
+            _add_shard_rows_to_summaries(shards, summaries, failed_files, write_stats)
 
         processed_files += 1
 
         # Обновляем прогресс
-        if progress_callback:
-            progress_callback(processed_files, total_files)
-
-    # Автоподбор высоты строк
-    excel_generator.adjust_row_heights(ws, row_num)
+        if progress:
+            if discovery.finished:
+                progress(processed_files, discovery.found, errors=len(failed_files))
+            else:
+                progress(processed_files, discovery.found,
+                         f"Обработано {processed_files} файлов, найдено {discovery.found} "
+                         f"(поиск продолжается...)", errors=len(failed_files))
+
+        if cancel_event is not None and cancel_event.is_set():
+            # Останавливаем пул процессов и чтение, сохраняем в кэш уже разобранное
+            results.close()
+            if cache is not None:
+                cache.close()
+            # Журнал остается: следующий запуск продолжит с этого места
+            if journal is not None:
+                journal.close()
+            # Книга не сохраняется; закрываем лист, чтобы завершить его временный файл
+            ws.close()
+            for exporter in exporters:
+                exporter.abort()
+            if snapshot is not None:
+                snapshot.abort()
+            if shards is not None:
+                shards.abort()
+            logging.info(f"Обработка отменена пользователем после {processed_files} файлов")
+            raise ProcessingCancelled(f"Обработка отменена: обработано {processed_files} файлов")
+
+    shard_files = []
+    if shards is not None:
+        started = time.perf_counter()
+        shard_files = shards.close()
+        write_stats.add(time.perf_counter() - started, items=0)
+        _add_shard_rows_to_summaries(shards, summaries, failed_files, write_stats)
+        excel_generator.add_shard_rows(ws, output_file, shard_files)
+        failed_files.extend(shards.failed)
+        # Номера строк уже выданы, но не записанные процессами записи строки не считаем
+        # (ни в частях, ни в сводных данных их нет)
+        counter -= len(shards.failed)
+
+    if duplicate_files and failed_files:
+        # Копия совпадает с оригиналом побайтно: если оригинал не обработан, ее компьютер тоже
+        # не попал в отчет. Такие копии перечисляются среди ошибок с причиной оригинала
+        errors = dict(failed_files)
+        failed_copies = [(file_path, errors[original]) for file_path, original in duplicate_files
+                         if original in errors]
+        if failed_copies:
+            duplicate_files = [(file_path, original) for file_path, original in duplicate_files
+                               if original not in errors]
+            failed_files.extend(failed_copies)
+
+    total_files = discovery.found
+    logging.info(f"Найдено {total_files} HTML файлов в {directory}")
+
+    final_message = "Обработка завершена"
+    if cache is not None:
+        cache.close()
+        final_message += f" (кэш: попаданий {cache.stats['hits']}, промахов {cache.stats['misses']})"
+
+    if duplicate_files:
+        logging.info(f"Найдено копий отчетов: {len(duplicate_files)}")
+        if duplicates_sheet:
+            excel_generator.add_duplicates_sheet(wb, [
+                (os.path.relpath(file_path, start=directory), os.path.relpath(original, start=directory))
+                for file_path, original in duplicate_files
+            ])
+
+    if failed_files:
+        logging.info(f"Не удалось обработать файлов: {len(failed_files)}")
+        if errors_sheet:
+            excel_generator.add_errors_sheet(wb, [
+                (os.path.relpath(file_path, start=directory), error) for file_path, error in failed_files
+            ])
+
+    if software_inventory is not None:
+        started = time.perf_counter()
+        excel_generator.add_inventory_sheets(wb, software_inventory)
+        write_stats.add(time.perf_counter() - started, items=0)
+        logging.info(f"Индекс ПО: {len(software_inventory.programs)} программ, "
+                     f"компьютеров без защитного ПО: {len(software_inventory.hosts_without_security())}")
+
+    if run_diff is not None:
+        run_diff.finish()
+        excel_generator.add_changes_sheet(wb, run_diff.changes)
+        totals = run_diff.totals()
+        logging.info(f"Сравнение с предыдущим запуском: без изменений {totals['unchanged']}, "
+                     f"изменено {totals['changed']}, новых {totals['added']}, не найдено {totals['removed']}")
 
     # Сохранение результатов
+    started = time.perf_counter()
     wb.save(output_file)
+    write_stats.add(time.perf_counter() - started, items=0)
     logging.info(f"Результаты сохранены в файл: {output_file}")
 
+    for exporter in exporters:
+        exporter.close()
+    if snapshot is not None:
+        snapshot.close()
+    # Отчет сохранен, продолжать нечего
+    if journal is not None:
+        journal.close(completed=True)
+
+    stages = [stats for stats in (reader.stats if reader else None, parse_stats, write_stats) if stats]
+    for stats in stages:
+        logging.info(f"Стадия {stats}")
+
+    if metrics_file:
+        metrics.dump(metrics_file, stages)
+
+    if summary is not None:
+        summary.update({
+            'files_found': total_files,
+            'rows_written': counter - 1,
+            'failed': [{'file': file_path, 'error': error} for file_path, error in failed_files],
+            'duplicates': [{'file': file_path, 'original': original} for file_path, original in duplicate_files],
+            'backend': backend,
+            'workers': workers,
+            'cache': dict(cache.stats) if cache is not None else None,
+            'stages': {stats.name: stats.to_dict() for stats in stages},
+            'metrics': metrics.totals(),
+            'exports': [path for exporter in exporters for path in exporter.paths.values()],
+            'changes': run_diff.totals() if run_diff is not None else None,
+            'journal': dict(journal.stats) if journal is not None else None,
+            'shards': [{'name': key, 'file': path, 'rows': rows} for key, path, rows in shard_files],
+        })
+
     # Финальное обновление прогресса
-    if progress_callback:
-        progress_callback(total_files, total_files, "Обработка завершена")
+    if progress:
+        progress(total_files, total_files, final_message, errors=len(failed_files))
 
     return counter - 1  # Возвращаем количество обработанных файлов
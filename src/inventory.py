@@ -0,0 +1,111 @@
+import re
+from array import array
+
+from records import ID_TYPECODE
+
+# Суффиксы разрядности и языка, которые не отличают одну программу от другой
+NAME_SUFFIX_PATTERN = re.compile(
+    r'\s*(\((x64|x86|64-bit|32-bit|64-разрядная|32-разрядная)( [a-z]{2})?\)|x64|x86)$',
+    re.IGNORECASE
+)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+VERSION_PART_PATTERN = re.compile(r'\d+|[^\d.\-_ ]+')
+
+# Так выводится пустая ячейка таблицы программ (как в pandas)
+MISSING_VALUE = "nan"
+
+
+def normalize_program_name(name):
+    """Ключ программы в индексе: без учета регистра, лишних пробелов и суффикса разрядности."""
+    name = WHITESPACE_PATTERN.sub(' ', name).strip()
+    name = NAME_SUFFIX_PATTERN.sub('', name)
+    return name.casefold()
+
+
+def version_key(version):
+    """Ключ сортировки версий: числовые части сравниваются как числа (10.2 > 9.15)."""
+    return tuple(
+        (0, int(part), '') if part.isdigit() else (1, 0, part.casefold())
+        for part in VERSION_PART_PATTERN.findall(version or '')
+    )
+
+
+class SoftwareInventory:
+    """Индекс установленного ПО по всем компьютерам пакета.
+
+    Заполняется по мере записи строк отчета (add), второго прохода по
+    данным нет: программа (нормализованное название) -> версия -> номера
+    компьютеров. По индексу строятся сводные листы: число установок,
+    разброс версий и компьютеры без защитного ПО.
+    """
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        # Номер строки в отчете -> (имя файла, имя компьютера, ОС)
+        self.hosts = {}
+        # Названия ОС повторяются на сотнях компьютеров: каждое хранится один раз
+        self._os_names = {}
+        # Ключ программы -> [название при первой встрече, правило защитного ПО или None,
+        #                     {версия: массив номеров компьютеров}]
+        self.programs = {}
+        # Номера компьютеров, на которых найдено защитное ПО
+        self.protected_hosts = set()
+
+    def add(self, host_id, data):
+        """Добавляет в индекс программы одного отчета."""
+        os_info = self._os_names.setdefault(data['os_info'], data['os_info'])
+        self.hosts[host_id] = (data['file_name'], data['pc_name'], os_info)
+
+        for name, version in data['programs']:
+            if name == MISSING_VALUE:
+                continue
+            key = normalize_program_name(name)
+            entry = self.programs.get(key)
+            if entry is None:
+                entry = self.programs[key] = [name, None, {}]
+            # Как и в Excel отчете, правила проверяются по строке «программа версия»
+            rule = self.classifier.match(f"{name} {version}")
+            if rule is not None:
+                entry[1] = entry[1] or rule
+                self.protected_hosts.add(host_id)
+
+            version = '' if version == MISSING_VALUE else version
+            hosts = entry[2].get(version)
+            if hosts is None:
+                hosts = entry[2][version] = array(ID_TYPECODE)
+            # Компьютеры добавляются по порядку, повтор программы в отчете не учитывается
+            if not hosts or hosts[-1] != host_id:
+                hosts.append(host_id)
+
+    def install_counts(self):
+        """Программы по убыванию числа компьютеров.
+
+        Returns:
+            list: (название, компьютеров, версий, правило защитного ПО или None)
+        """
+        rows = []
+        for name, rule, versions in self.programs.values():
+            host_count = len(set().union(*versions.values()))
+            rows.append((name, host_count, len(versions), rule))
+        rows.sort(key=lambda row: (-row[1], row[0].casefold()))
+        return rows
+
+    def version_spread(self):
+        """Версии каждой программы (программы по алфавиту, версии по возрастанию).
+
+        Returns:
+            list: (название, версия, номера компьютеров)
+        """
+        rows = []
+        for name, _, versions in sorted(self.programs.values(), key=lambda entry: entry[0].casefold()):
+            for version in sorted(versions, key=version_key):
+                rows.append((name, version, versions[version]))
+        return rows
+
+    def hosts_without_security(self):
+        """Компьютеры, на которых не найдено защитное ПО: (номер, имя файла, имя компьютера, ОС)."""
+        return [
+            (host_id, *host)
+            for host_id, host in self.hosts.items()
+            if host_id not in self.protected_hosts
+        ]
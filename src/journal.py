@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import time
+
+from records import HostRecord, StringTable
+
+# Суффикс журнала, создаваемого рядом с Excel отчетом
+JOURNAL_SUFFIX = ".journal.jsonl"
+# Как часто записанное сбрасывается на диск (fsync), секунд
+JOURNAL_SYNC_SECONDS = 1.0
+JOURNAL_FORMAT = 1
+
+
+def default_journal_path(output_file):
+    """Возвращает путь к журналу рядом с файлом отчета."""
+    return os.path.splitext(output_file)[0] + JOURNAL_SUFFIX
+
+
+class RunJournal:
+    """Журнал обработки для продолжения прерванного запуска.
+
+    Каждый разобранный отчет сразу дописывается в файл строкой JSON
+    (путь, размер, время изменения и результат разбора). Если запуск
+    прервался (ошибка, выключение, нехватка места при сохранении книги),
+    повторный запуск с тем же журналом берет результаты из него и не
+    разбирает отчеты повторно; измененные с тех пор файлы разбираются
+    заново. Первая строка журнала — заголовок с версией экстракторов и
+    директорией: журнал другого запуска не используется. Оборванная
+    последняя строка (сбой во время записи) отбрасывается.
+    """
+
+    def __init__(self, path, version, directory):
+        self.path = path
+        self.stats = {'resumed': 0, 'written': 0}
+        self._records = {}  # Путь -> (размер, время изменения, HostRecord)
+        self._strings = StringTable()
+        header = {'journal': JOURNAL_FORMAT, 'version': str(version), 'directory': os.path.abspath(directory)}
+
+        self._synced = 0.0
+        valid_size = self._load(header)
+        if valid_size is None:
+            self._file = open(path, 'w', encoding='utf-8')
+            self._append(header)
+        else:
+            # Отбрасываем оборванную запись, иначе следующая строка склеится с ней
+            with open(path, 'r+b') as file:
+                file.truncate(valid_size)
+            self._file = open(path, 'a', encoding='utf-8')
+            if self._records:
+                logging.info(f"Продолжение обработки по журналу {path}: "
+                             f"{len(self._records)} отчетов уже разобрано")
+
+    def _load(self, header):
+        """Читает записи журнала. Returns: размер корректной части файла или None, если журнал не подходит."""
+        try:
+            file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        with file:
+            try:
+                if json.loads(file.readline()) != header:
+                    logging.warning(f"Журнал {self.path} относится к другому запуску и будет перезаписан")
+                    return None
+            except ValueError:
+                return None
+
+            valid_size = file.tell()
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("оборванная строка")
+                    record = json.loads(line)
+                except ValueError:
+                    logging.warning(f"Журнал {self.path}: поврежденная запись в конце файла отброшена")
+                    break
+                self._records[record['path']] = (record['size'], record['mtime_ns'],
+                                                 HostRecord(record['data'], self._strings))
+                valid_size += len(line)
+        return valid_size
+
+    def lookup(self, file_path):
+        """Возвращает результат разбора из журнала или None (нет записи или файл изменился).
+
+        Поле file_name в результат не входит: оно зависит от каталога запуска.
+        """
+        record = self._records.get(os.path.abspath(file_path))
+        if record is None:
+            return None
+        stat = os.stat(file_path)
+        if (record[0], record[1]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        self.stats['resumed'] += 1
+        return record[2].to_data(self._strings)
+
+    def store(self, file_path, data):
+        """Дописывает результат разбора в журнал."""
+        stat = os.stat(file_path)
+        self._append({
+            'path': os.path.abspath(file_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'data': {key: value for key, value in data.items() if key != 'file_name'},
+        })
+        self.stats['written'] += 1
+
+    def _append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        now = time.monotonic()
+        if now - self._synced >= JOURNAL_SYNC_SECONDS:
+            os.fsync(self._file.fileno())
+            self._synced = now
+
+    def close(self, completed=False):
+        """Закрывает журнал. completed=True — отчет сохранен, журнал больше не нужен и удаляется."""
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if completed:
+            os.remove(self.path)
+        logging.info(f"Журнал обработки: продолжено {self.stats['resumed']}, записано {self.stats['written']}"
+                     + (" (удален после сохранения отчета)" if completed else f", файл {self.path}"))
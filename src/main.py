@@ -1,10 +1,41 @@
+import argparse
 import logging
+import sys
+from functools import partial
 import ttkbootstrap as ttk
 from ui import AidaParserUI
-from html_parser import process_directory
+from backends import AUTO_BACKEND, BACKENDS, EQUIVALENT_BACKENDS, NOT_EQUIVALENT_NOTE
+from html_parser import DEFAULT_FILE_TIMEOUT, process_directory, compare_backends
+
+
+def parse_args():
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description="Парсер отчетов AIDA64")
+    parser.add_argument(
+        '--backend',
+        choices=[AUTO_BACKEND, *BACKENDS],
+        default=AUTO_BACKEND,
+        help="HTML-парсер по умолчанию (если библиотека не установлена, используется bs4). "
+             f"{', '.join(name for name in BACKENDS if name not in EQUIVALENT_BACKENDS)}: "
+             f"{NOT_EQUIVALENT_NOTE} от bs4 на отчетах с ошибками разметки"
+    )
+    parser.add_argument(
+        '--verify-backends',
+        metavar='DIR',
+        help="Сравнить результаты всех установленных HTML-парсеров на отчетах из DIR и выйти"
+    )
+    parser.add_argument(
+        '--security-rules',
+        metavar='FILE',
+        help="Файл с ключевыми словами защитного ПО (по одному на строку, '#' — комментарий)"
+    )
+    return parser.parse_args()
+
 
 def main():
     """Основная функция программы."""
+    args = parse_args()
+
     # Настройка логирования
     logging.basicConfig(
         level=logging.INFO,
@@ -13,13 +44,21 @@ def main():
         filemode='a'
     )
 
+    if args.verify_backends:
+        mismatches = compare_backends(args.verify_backends)
+        for file_path, backend, streaming in mismatches:
+            print(f"{file_path}: {backend}{' (потоковый)' if streaming else ''}")
+        print("Расхождений не найдено" if not mismatches else f"Расхождений: {len(mismatches)}")
+        sys.exit(1 if mismatches else 0)
+
     # Создаем главное окно
     root = ttk.Window(themename="superhero")  # Темная тема
     root.title("Парсер отчетов AIDA64")
 
     # Запуск UI с функцией обратного вызова
-    app = AidaParserUI(root, process_directory)
-
+    process_callback = partial(process_directory, security_rules=args.security_rules,
+                               file_timeout=DEFAULT_FILE_TIMEOUT)
+    app = AidaParserUI(root, process_callback, backend=args.backend)
     # Запуск основного цикла приложения
     root.mainloop()
 
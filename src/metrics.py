@@ -0,0 +1,312 @@
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Фазы обработки файла в порядке выполнения
+PHASES = (
+    'read',  # Чтение файла (в потоковом режиме — вместе с декодированием)
+    'decode',  # Декодирование (кодировка определяется по BOM или meta charset)
+    'dom',  # Построение DOM
+    'scan',  # Поиск имени ПК, ОС и якорей разделов за один проход (_scan_document)
+    'sections',  # Разбор сохраненных таблиц разделов (потоковый режим)
+    'software',  # Извлечение списка ПО
+    'users',  # Извлечение пользователей
+    'parse',  # Разбор целиком (включая чтение, если файл не прочитан заранее)
+    'write',  # Добавление строки в Excel
+)
+# Сколько самых медленных файлов попадает в итоги
+SLOWEST_FILES = 20
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+class StageStats:
+    """Счетчики пропускной способности стадии конвейера обработки.
+
+    Стадия может выполняться в нескольких потоках, поэтому счетчики
+    обновляются под блокировкой. busy — суммарное время работы стадии
+    (во всех потоках и процессах), wall — время от начала работы стадии
+    до последнего обработанного элемента.
+    """
+
+    def __init__(self, name, title=None):
+        self.name = name  # Ключ в итогах обработки
+        self.title = title or name  # Название для журнала
+        self.items = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self._started = None
+        self._finished = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Отмечает начало работы стадии (если она еще не начата)."""
+        with self._lock:
+            if self._started is None:
+                self._started = time.perf_counter()
+
+    def add(self, busy=0.0, size=0, items=1):
+        """Учитывает обработанный элемент."""
+        now = time.perf_counter()
+        with self._lock:
+            if self._started is None:
+                self._started = now - busy
+            self._finished = now
+            self.items += items
+            self.bytes += size
+            self.busy += busy
+
+    @property
+    def wall(self):
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+
+    def to_dict(self):
+        """Итоги стадии: число элементов, объем, время и пропускная способность."""
+        wall = self.wall
+        return {
+            'items': self.items,
+            'bytes': self.bytes,
+            'busy_seconds': round(self.busy, 3),
+            'wall_seconds': round(wall, 3),
+            'items_per_second': round(self.items / wall, 1) if wall > 0 else None,
+            'megabytes_per_second': round(self.bytes / wall / (1024 * 1024), 2) if wall > 0 and self.bytes else None,
+        }
+
+    def __str__(self):
+        stats = self.to_dict()
+        text = f"{self.title}: {stats['items']} за {stats['wall_seconds']} с"
+        if stats['items_per_second'] is not None:
+            text += f", {stats['items_per_second']} файлов/с"
+        if stats['megabytes_per_second'] is not None:
+            text += f", {stats['megabytes_per_second']} МБ/с"
+        return text
+
+
+class PhaseTimer:
+    """Время фаз обработки одного файла, объем прочитанных данных и кодировка.
+
+    Передается между процессами вместе с результатом разбора. Если при
+    чтении вычислен хэш содержимого (для кэша разбора), он тоже передается
+    здесь, чтобы не читать файл повторно.
+    """
+
+    __slots__ = ('phases', 'bytes_read', 'encoding', 'decode_errors', 'digest')
+
+    def __init__(self):
+        self.phases = {}
+        self.bytes_read = 0
+        self.encoding = None  # "кодек (bom, meta или default)"
+        self.decode_errors = 0  # Пропущено недекодируемых байтов
+        self.digest = None  # Хэш содержимого файла (cache.content_hasher), если вычислен при чтении
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Замеряет время блока with как фазу name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def merge(self, other):
+        """Добавляет замеры другого таймера (например, стадии чтения)."""
+        for phase, seconds in other.phases.items():
+            self.add(phase, seconds)
+        self.bytes_read += other.bytes_read
+        self.encoding = other.encoding or self.encoding
+        self.decode_errors += other.decode_errors
+        self.digest = other.digest or self.digest
+
+
+def peak_rss_bytes(include_children=True):
+    """Пиковый объем резидентной памяти процесса в байтах (None, если недоступно).
+
+    На Linux и macOS учитываются и завершенные дочерние процессы (рабочие
+    процессы пула) — берется максимум. На Windows — только текущий процесс.
+    """
+    try:
+        import resource
+    except ImportError:
+        return _windows_peak_rss()
+
+    # ru_maxrss: килобайты на Linux, байты на macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak * scale
+
+
+def _windows_peak_rss():
+    try:
+        import ctypes
+        from ctypes import wintypes
+    except ImportError:
+        return None
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    try:
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize
+    except (AttributeError, OSError):
+        return None
+
+
+class MetricsRecorder:
+    """Замеры по каждому файлу пакета.
+
+    Для каждого файла хранится время фаз (PHASES), размер прочитанных
+    данных, кодировка, число недекодируемых байтов и итог обработки.
+    dump() сохраняет замеры в CSV или JSON, чтобы найти самые медленные
+    отчеты и отчеты с ошибками кодировки.
+    """
+
+    STATUSES = ('ok', 'error', 'cached', 'duplicate')
+
+    def __init__(self):
+        # (file_path, status, bytes_read, время фаз в порядке PHASES, кодировка, недекодируемых байтов)
+        self.files = []
+        self.phase_totals = dict.fromkeys(PHASES, 0.0)
+        self.bytes_read = 0
+        self.encodings = {}  # Кодировка -> число файлов
+        self.decode_error_files = 0
+
+    def record(self, file_path, status, timer=None):
+        """Учитывает обработанный файл."""
+        phases = timer.phases if timer is not None else {}
+        bytes_read = timer.bytes_read if timer is not None else 0
+        encoding = timer.encoding if timer is not None else None
+        decode_errors = timer.decode_errors if timer is not None else 0
+
+        self.files.append((file_path, status, bytes_read, tuple(phases.get(phase, 0.0) for phase in PHASES),
+                           encoding, decode_errors))
+        for phase, seconds in phases.items():
+            if phase in self.phase_totals:
+                self.phase_totals[phase] += seconds
+        self.bytes_read += bytes_read
+        if encoding is not None:
+            self.encodings[encoding] = self.encodings.get(encoding, 0) + 1
+        if decode_errors:
+            self.decode_error_files += 1
+            logging.warning(f"Файл {file_path}: пропущено недекодируемых байтов: {decode_errors} ({encoding})")
+
+    def slowest(self, count=SLOWEST_FILES):
+        """Самые медленные файлы по времени разбора и записи."""
+        parse_index = PHASES.index('parse')
+        write_index = PHASES.index('write')
+        files = sorted(self.files, key=lambda item: item[3][parse_index] + item[3][write_index], reverse=True)
+        return [self._file_dict(item) for item in files[:count]]
+
+    def totals(self):
+        """Итоги по всем файлам."""
+        return {
+            'files': len(self.files),
+            'bytes_read': self.bytes_read,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'phase_seconds': {phase: round(seconds, 3) for phase, seconds in self.phase_totals.items()},
+            'encodings': dict(self.encodings),
+            'decode_error_files': self.decode_error_files,
+        }
+
+    def dump(self, path, stages=None):
+        """Сохраняет замеры: CSV (по строке на файл) или JSON (итоги, самые медленные и все файлы)."""
+        if os.path.splitext(path)[1].lower() == '.csv':
+            with open(path, 'w', newline='', encoding='utf-8-sig') as file:
+                writer = csv.writer(file)
+                writer.writerow(['file', 'status', 'bytes_read', *(f"{phase}_seconds" for phase in PHASES),
+                                 'encoding', 'decode_errors'])
+                for file_path, status, bytes_read, timings, encoding, decode_errors in self.files:
+                    writer.writerow([file_path, status, bytes_read, *(f"{seconds:.6f}" for seconds in timings),
+                                     encoding or '', decode_errors])
+        else:
+            document = {
+                'totals': self.totals(),
+                'stages': {stats.name: stats.to_dict() for stats in stages or ()},
+                'slowest': self.slowest(),
+                'files': [self._file_dict(item) for item in self.files],
+            }
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(document, file, ensure_ascii=False, indent=1)
+
+        logging.info(f"Замеры обработки сохранены в файл: {path}")
+
+    @staticmethod
+    def _file_dict(item):
+        file_path, status, bytes_read, timings, encoding, decode_errors = item
+        return {
+            'file': file_path,
+            'status': status,
+            'bytes_read': bytes_read,
+            'seconds': {phase: round(seconds, 6) for phase, seconds in zip(PHASES, timings) if seconds},
+            'encoding': encoding,
+            'decode_errors': decode_errors,
+        }
+
+
+@contextmanager
+def profiling(kind, output_file):
+    """Профилирует блок with с помощью cProfile или pyinstrument.
+
+    cProfile сохраняет статистику в формате pstats (смотреть через
+    python -m pstats или snakeviz), pyinstrument — HTML отчет. Если
+    pyinstrument не установлен, используется cProfile. Профилируется
+    только текущий процесс: чтобы в профиль попал разбор, используйте
+    один рабочий процесс.
+    """
+    if kind not in PROFILERS:
+        raise ValueError(f"Неизвестный профилировщик: {kind}. Доступны: {', '.join(PROFILERS)}")
+
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logging.warning("pyinstrument не установлен. Используется cProfile")
+            kind = 'cprofile'
+
+    if kind == 'pyinstrument':
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(output_file, 'w', encoding='utf-8') as file:
+                file.write(profiler.output_html())
+            logging.info(f"Профиль pyinstrument сохранен в файл: {output_file}")
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(output_file)
+            logging.info(f"Профиль cProfile сохранен в файл: {output_file}")
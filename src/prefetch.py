@@ -0,0 +1,92 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import PhaseTimer, StageStats
+
+# Потоков чтения: на сетевых дисках чтение упирается в задержки, а не в CPU
+DEFAULT_READ_THREADS = 4
+# Сколько файлов читать заранее
+DEFAULT_PREFETCH_FILES = 32
+# Предел суммарного размера прочитанных, но еще не разобранных файлов
+DEFAULT_PREFETCH_BYTES = 256 * 1024 * 1024
+
+
+class PrefetchReader:
+    """Стадия упреждающего чтения файлов.
+
+    Пока разбираются уже прочитанные отчеты, следующие читаются и
+    декодируются в пуле потоков. Заранее читается не больше queue_size
+    файлов; новые чтения не начинаются, пока прочитанные, но не
+    отданные на разбор данные занимают больше max_bytes (чтения, уже
+    начатые к этому моменту, завершаются).
+
+    read_file(file_path, timer) должна возвращать (содержимое, размер в байтах)
+    и записывать время фаз чтения в timer (PhaseTimer).
+    """
+
+    def __init__(self, read_file, threads=DEFAULT_READ_THREADS, queue_size=DEFAULT_PREFETCH_FILES,
+                 max_bytes=DEFAULT_PREFETCH_BYTES):
+        self.read_file = read_file
+        self.threads = max(1, threads)
+        self.queue_size = max(1, queue_size)
+        self.max_bytes = max_bytes
+        self.stats = StageStats("read", "Чтение")
+
+    def iter(self, items, path_of):
+        """Перебирает элементы в исходном порядке вместе с прочитанными данными.
+
+        Для каждого элемента выдается (item, content, error, timer), где timer —
+        замеры чтения (PhaseTimer). Если path_of(item) возвращает None, файл
+        не читается, а content, error и timer равны None.
+        """
+        items = iter(items)
+        exhausted = False
+        pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="reader")
+        self.stats.start()
+        try:
+            # (элемент, Future чтения или None) в исходном порядке
+            pending = deque()
+            while True:
+                while not exhausted and len(pending) < self.queue_size and self._buffered(pending) < self.max_bytes:
+                    item = next(items, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    file_path = path_of(item)
+                    future = pool.submit(self._read, file_path) if file_path is not None else None
+                    pending.append((item, future))
+
+                if not pending:
+                    break
+
+                item, future = pending.popleft()
+                if future is None:
+                    yield item, None, None, None
+                else:
+                    content, _, error, timer = future.result()
+                    yield item, content, error, timer
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _read(self, file_path):
+        """Читает файл. Возвращает (содержимое, размер, текст ошибки, замеры)."""
+        timer = PhaseTimer()
+        started = time.perf_counter()
+        try:
+            content, size = self.read_file(file_path, timer)
+        except (OSError, UnicodeDecodeError) as e:
+            logging.error(f"Ошибка чтения файла {file_path}: {str(e)}")
+            return None, 0, str(e), timer
+
+        self.stats.add(time.perf_counter() - started, size)
+        return content, size, None, timer
+
+    @staticmethod
+    def _buffered(pending):
+        """Размер прочитанных, но еще не отданных данных."""
+        return sum(
+            future.result()[1] for _, future in pending
+            if future is not None and future.done() and not future.cancelled()
+        )
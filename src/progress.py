@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+from collections import deque
+
+# Частота обновления индикатора прогресса в окне
+PROGRESS_FPS = 10
+# Окно усреднения скорости обработки, секунд
+RATE_WINDOW = 5.0
+
+
+class ProgressChannel:
+    """Канал прогресса между потоком обработки и окном.
+
+    Поток обработки передает post в process_directory как progress_callback:
+    обновления складываются в потокобезопасную очередь и не трогают Tk.
+    Окно с фиксированной частотой вызывает drain() и показывает только
+    последнее состояние, поэтому тысячи мелких отчетов не засоряют очередь
+    событий Tk. cancel_event передается в process_directory для отмены.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self.cancel_event = threading.Event()
+
+    def post(self, current, total, message=None, errors=0):
+        """Добавляет обновление прогресса (вызывается из потока обработки)."""
+        self._queue.put((current, total, message, errors))
+
+    def drain(self):
+        """Забирает накопленные обновления.
+
+        Returns:
+            tuple: Последнее состояние (current, total, message, errors) или None,
+                если обновлений не было
+        """
+        state = None
+        while True:
+            try:
+                state = self._queue.get_nowait()
+            except queue.Empty:
+                return state
+
+    def cancel(self):
+        """Запрашивает остановку обработки."""
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+
+class RateMeter:
+    """Скорость обработки (файлов в секунду) за последние window секунд и оценка оставшегося времени."""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self._samples = deque()  # (время, обработано файлов)
+
+    def update(self, count, now=None):
+        """Учитывает текущее число обработанных файлов."""
+        now = time.monotonic() if now is None else now
+        self._samples.append((now, count))
+        # Оставляем одну точку старше окна, чтобы скорость считалась по полному окну
+        while len(self._samples) > 2 and self._samples[1][0] <= now - self.window:
+            self._samples.popleft()
+
+    @property
+    def rate(self):
+        """Файлов в секунду или None, если данных мало."""
+        if len(self._samples) < 2:
+            return None
+        (start, first), (end, last) = self._samples[0], self._samples[-1]
+        if end <= start:
+            return None
+        return (last - first) / (end - start)
+
+    def eta(self, current, total):
+        """Оставшееся время в секундах или None, если оценить нельзя."""
+        rate = self.rate
+        if not rate or total <= current:
+            return None
+        return (total - current) / rate
+
+
+def format_duration(seconds):
+    """Форматирует длительность как Ч:ММ:СС или ММ:СС."""
+    seconds = int(round(seconds))
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,78 @@
+"""Компактное хранение результатов разбора для больших пакетов.
+
+Результат разбора (словарь с кортежами программ) удобен для записи строки
+отчета, но дорог, если держать его в памяти весь запуск: у 15 тысяч
+компьютеров по несколько сотен программ — миллионы строк, большинство
+которых повторяется от компьютера к компьютеру. Поэтому там, где записи
+хранятся до конца запуска (снимок предыдущего запуска, журнал обработки),
+названия, версии, ОС и пользователи хранятся один раз в StringTable,
+а запись компьютера (HostRecord) — это номера строк в массиве array.
+Словарь результата собирается обратно (to_data) только когда он нужен.
+"""
+from array import array
+
+# Тип элементов массива номеров: 4 байта без знака
+ID_TYPECODE = 'I'
+
+
+class StringTable:
+    """Словарь строк: каждая строка хранится один раз, записи ссылаются на нее номером."""
+
+    __slots__ = ('strings', '_ids')
+
+    def __init__(self):
+        self.strings = []  # Номер -> строка
+        self._ids = {}  # Строка -> номер
+
+    def __len__(self):
+        return len(self.strings)
+
+    def add(self, text):
+        """Возвращает номер строки, при первой встрече добавляет ее в словарь."""
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = self._ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def encode(self, texts):
+        """Массив номеров строк."""
+        return array(ID_TYPECODE, map(self.add, texts))
+
+    def decode(self, ids):
+        """Список строк по массиву номеров."""
+        strings = self.strings
+        return [strings[string_id] for string_id in ids]
+
+
+class HostRecord:
+    """Результат разбора одного отчета в компактном виде.
+
+    Программы хранятся одним массивом номеров: название и версия поочередно.
+    Имя файла и имя компьютера почти всегда уникальны и хранятся как есть.
+    """
+
+    __slots__ = ('file_name', 'pc_name', 'os_id', 'program_ids', 'user_ids')
+
+    def __init__(self, data, table):
+        # В журнале обработки имени файла нет: оно зависит от каталога запуска
+        self.file_name = data.get('file_name')
+        self.pc_name = data['pc_name']
+        self.os_id = table.add(data['os_info'])
+        self.program_ids = table.encode(value for program in data['programs'] for value in program)
+        self.user_ids = table.encode(data['users'])
+
+    def os_info(self, table):
+        return table.strings[self.os_id]
+
+    def to_data(self, table):
+        """Собирает словарь результата разбора, как его возвращает HtmlParser."""
+        values = table.decode(self.program_ids)
+        data = {} if self.file_name is None else {'file_name': self.file_name}
+        data.update({
+            'pc_name': self.pc_name,
+            'os_info': self.os_info(table),
+            'programs': list(zip(values[::2], values[1::2])),
+            'users': table.decode(self.user_ids),
+        })
+        return data
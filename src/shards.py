@@ -0,0 +1,291 @@
+"""Разбиение Excel отчета на части для очень больших пакетов.
+
+Одна книга на десятки тысяч компьютеров долго сохраняется и долго
+открывается в Excel. При разбиении строки распределяются по книгам-частям:
+по числу строк, по папке верхнего уровня (площадка, отдел) или по ОС.
+Части пишут отдельные процессы; каждая часть закреплена за одним
+процессом, поэтому строки в ней идут в порядке файлов. Основной файл
+отчета становится оглавлением со ссылками на части и сводными листами.
+"""
+import logging
+import os
+import re
+from collections import deque
+
+# Способы разбиения
+SHARD_BY_ROWS = "rows"
+SHARD_BY_FOLDER = "folder"
+SHARD_BY_OS = "os"
+SHARD_MODES = (SHARD_BY_ROWS, SHARD_BY_FOLDER, SHARD_BY_OS)
+
+DEFAULT_SHARD_ROWS = 5000
+DEFAULT_SHARD_WRITERS = 2
+# Строк в одной передаче процессу записи
+SHARD_BATCH_ROWS = 64
+# Сколько передач может ждать в очереди процесса записи, прежде чем основной процесс остановится
+SHARD_MAX_PENDING = 8
+# Сколько переданных строк может ждать подтверждения записи (см. ShardSet.written)
+SHARD_MAX_UNCONFIRMED = 2048
+
+# Часть для отчетов, лежащих прямо во входной директории (при разбиении по папкам)
+ROOT_FOLDER_SHARD = "Корневая папка"
+# Символы, недопустимые в именах файлов Windows
+INVALID_NAME_PATTERN = re.compile(r'[<>:"/\\|?*\x00-\x1f]+')
+SHARD_NAME_LIMIT = 80
+
+
+def shard_key(mode, counter, data, rows=DEFAULT_SHARD_ROWS):
+    """Название части для строки отчета.
+
+    Args:
+        mode (str): Способ разбиения (SHARD_MODES)
+        counter (int): Номер строки в отчете (№), начиная с 1
+        data (dict): Результат разбора отчета
+        rows (int): Строк в части при разбиении по числу строк
+    """
+    if mode == SHARD_BY_ROWS:
+        first = (counter - 1) // rows * rows + 1
+        return f"{first:06d}-{first + rows - 1:06d}"
+    if mode == SHARD_BY_FOLDER:
+        parts = data['file_name'].replace('\\', '/').split('/')
+        return parts[0] if len(parts) > 1 else ROOT_FOLDER_SHARD
+    return data['os_info']
+
+
+def shard_file_name(key):
+    """Часть имени файла по названию части: без недопустимых символов и не слишком длинная."""
+    name = INVALID_NAME_PATTERN.sub('_', key)[:SHARD_NAME_LIMIT].strip(' .')
+    return name or '_'
+
+
+class ShardSet:
+    """Книги-части отчета и процессы, которые их пишут.
+
+    Строки передаются процессам записи пачками по SHARD_BATCH_ROWS. Часть
+    по числу строк сохраняется, как только заполнена; части по папкам и
+    по ОС — в close(), так как отчеты одной папки или ОС могут встретиться
+    в любом месте пакета. Строки, которые не удалось записать, попадают
+    в failed по мере получения ответов процессов записи и не учитываются
+    в числе строк части. Записанные строки отдает written() в порядке
+    номеров: по ним строятся сводные листы, выгрузки и снимок.
+    """
+
+    def __init__(self, output_file, mode, rows=DEFAULT_SHARD_ROWS, writers=DEFAULT_SHARD_WRITERS,
+                 security_rules=None, log_config=None):
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Неизвестный способ разбиения отчета: {mode}. Доступны: {', '.join(SHARD_MODES)}")
+        if rows < 1:
+            raise ValueError("Число строк в части отчета должно быть больше нуля")
+
+        self.mode = mode
+        self.rows = rows
+        self._base = os.path.splitext(output_file)[0]
+        # Название части -> [путь, номер процесса записи, строк]
+        self.shards = {}
+        self._paths = set()
+        self._current = None  # Последняя начатая часть
+        self.failed = []  # (file_path, error)
+        # Переданные строки, которые еще не отданы written(), по порядку номеров:
+        # номер -> [название части, data, file_path, записана (None — ответа еще нет)]
+        self._rows = {}
+        self._order = deque()
+
+        from concurrent.futures import ProcessPoolExecutor
+        self._writers = [
+            ProcessPoolExecutor(max_workers=1, initializer=_init_shard_writer, initargs=(security_rules, log_config))
+            for _ in range(max(1, writers))
+        ]
+        self._batches = [[] for _ in self._writers]
+        # (Future, номера строк пачки) в порядке передачи
+        self._pending = [deque() for _ in self._writers]
+
+    def write(self, counter, data, file_path):
+        """Передает строку отчета в ее часть. Возвращает название части."""
+        key = shard_key(self.mode, counter, data, self.rows)
+        shard = self.shards.get(key)
+        if shard is None:
+            # Строки идут по порядку номеров: предыдущая часть по числу строк заполнена
+            if self.mode == SHARD_BY_ROWS and self._current is not None:
+                self._save(self._current)
+            shard = self.shards[key] = [self._shard_path(key), len(self.shards) % len(self._writers), 0]
+            self._current = key
+
+        path, writer, _ = shard
+        shard[2] += 1
+        self._rows[counter] = [key, data, file_path, None]
+        self._order.append(counter)
+        batch = self._batches[writer]
+        batch.append((path, counter, data, file_path))
+        if len(batch) >= SHARD_BATCH_ROWS:
+            self._flush(writer)
+        return key
+
+    def _shard_path(self, key):
+        path = f"{self._base}.{shard_file_name(key)}.xlsx"
+        number = 2
+        # Разные названия могут дать одно имя файла после замены символов
+        while os.path.normcase(path) in self._paths:
+            path = f"{self._base}.{shard_file_name(key)} ({number}).xlsx"
+            number += 1
+        self._paths.add(os.path.normcase(path))
+        return path
+
+    def written(self):
+        """Строки, запись которых подтверждена, в порядке номеров.
+
+        Строка отдается, когда получены ответы и для всех строк с меньшими
+        номерами; строки, которые не удалось записать, пропускаются.
+
+        Returns:
+            list: (номер строки, результат разбора, путь к отчету)
+        """
+        for pending in self._pending:
+            while pending and pending[0][0].done():
+                self._take(*pending.popleft())
+        # Не держим в памяти слишком много строк: дожидаемся записи самой старой
+        while len(self._order) > SHARD_MAX_UNCONFIRMED and self._rows[self._order[0]][3] is None:
+            self._wait(self._order[0])
+
+        rows = []
+        while self._order and self._rows[self._order[0]][3] is not None:
+            counter = self._order.popleft()
+            _, data, file_path, written = self._rows.pop(counter)
+            if written:
+                rows.append((counter, data, file_path))
+        return rows
+
+    def _wait(self, counter):
+        """Дожидается ответа процесса записи о строке."""
+        row = self._rows[counter]
+        writer = self.shards[row[0]][1]
+        self._flush(writer)
+        while row[3] is None:
+            self._take(*self._pending[writer].popleft())
+
+    def _flush(self, writer):
+        batch = self._batches[writer]
+        if batch:
+            self._batches[writer] = []
+            self._submit(writer, [row[1] for row in batch], _write_shard_rows, batch)
+
+    def _submit(self, writer, counters, function, *args):
+        pending = self._pending[writer]
+        pending.append((self._writers[writer].submit(function, *args), counters))
+        # Не держим в памяти лишние строки: ждем, пока процесс запишет старые пачки.
+        # result() передает сюда ошибку процесса записи
+        while pending and (pending[0][0].done() or len(pending) > SHARD_MAX_PENDING):
+            self._take(*pending.popleft())
+
+    def _take(self, future, counters):
+        for counter, file_path, error in future.result() or ():
+            row = self._rows[counter]
+            row[3] = False
+            self.shards[row[0]][2] -= 1
+            self.failed.append((file_path, error))
+        for counter in counters:
+            row = self._rows[counter]
+            if row[3] is None:
+                row[3] = True
+
+    def _save(self, key):
+        path, writer, _ = self.shards[key]
+        self._flush(writer)
+        self._submit(writer, (), _save_shard, path)
+
+    def close(self):
+        """Сохраняет все части и завершает процессы записи.
+
+        Оставшиеся записанные строки после этого отдает written().
+
+        Returns:
+            list: (название части, путь к файлу, записано строк) в порядке появления частей
+        """
+        try:
+            for writer in range(len(self._writers)):
+                self._flush(writer)
+                self._submit(writer, (), _save_shards)
+            for pending in self._pending:
+                while pending:
+                    self._take(*pending.popleft())
+        except BaseException:
+            self.abort()
+            raise
+
+        for executor in self._writers:
+            executor.shutdown()
+        shards = [(key, path, rows) for key, (path, _, rows) in self.shards.items()]
+        logging.info(f"Отчет разбит на {len(shards)} частей")
+        return shards
+
+    def abort(self):
+        """Прерывает запись и удаляет файлы частей."""
+        for executor in self._writers:
+            # Ждем уже переданные пачки: открытые листы нужно закрыть, чтобы удалить их временные файлы
+            try:
+                executor.submit(_discard_shards)
+            except RuntimeError:
+                # Процесс записи уже завершился с ошибкой
+                pass
+            executor.shutdown()
+        for path, _, _ in self.shards.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Состояние процесса записи: генератор отчета и открытые книги (путь -> [книга, лист, следующая строка])
+_shard_generator = None
+_shard_books = {}
+
+
+def _init_shard_writer(security_rules=None, log_config=None):
+    """Инициализирует процесс записи частей."""
+    global _shard_generator
+    # Запущенный заново процесс (spawn) не наследует настройки журнала
+    if log_config and not logging.getLogger().handlers:
+        logging.basicConfig(**log_config)
+    from classifier import SecurityClassifier
+    from html_parser import ExcelReportGenerator
+    classifier = SecurityClassifier.from_file(security_rules) if security_rules else SecurityClassifier()
+    _shard_generator = ExcelReportGenerator(classifier)
+
+
+def _write_shard_rows(rows):
+    """Записывает пачку строк (путь к части, номер строки, результат разбора, путь к отчету).
+
+    Returns:
+        list: (номер строки, file_path, error) для строк, которые не удалось записать
+    """
+    failed = []
+    for path, counter, data, file_path in rows:
+        book = _shard_books.get(path)
+        if book is None:
+            wb, ws = _shard_generator.create_workbook(path)
+            book = _shard_books[path] = [wb, ws, 2]
+        try:
+            book[2] = _shard_generator.add_data_to_worksheet(book[1], book[2], counter, data)
+        except Exception as e:
+            logging.error(f"Ошибка при обработке файла {file_path}: {str(e)}", exc_info=True)
+            failed.append((counter, file_path, str(e)))
+    return failed
+
+
+def _save_shard(path):
+    """Сохраняет заполненную часть."""
+    wb = _shard_books.pop(path)[0]
+    wb.save(path)
+    logging.info(f"Часть отчета сохранена в файл: {path}")
+
+
+def _save_shards():
+    """Сохраняет все открытые части процесса записи."""
+    for path in list(_shard_books):
+        _save_shard(path)
+
+
+def _discard_shards():
+    """Закрывает открытые части без сохранения."""
+    for _, ws, _ in _shard_books.values():
+        ws.close()
+    _shard_books.clear()
@@ -5,6 +5,10 @@ from ttkbootstrap.constants import *
 import os
 import threading
 import logging
+from backends import AUTO_BACKEND, BACKENDS, available_backends, backend_label
+from cache import default_cache_path
+from journal import default_journal_path
+from progress import PROGRESS_FPS, ProgressChannel, RateMeter, format_duration
 
 # Configure logging
 logging.basicConfig(
@@ -16,10 +20,10 @@ logging.basicConfig(
 
 
 class AidaParserUI:
-    def __init__(self, root, process_callback):
+    def __init__(self, root, process_callback, backend=AUTO_BACKEND):
         self.root = root
         self.root.title("Парсер отчетов AIDA64")
-        self.root.geometry("600x650")
+        self.root.geometry("600x910")
         self.root.resizable(True, True)
 
         # Store the callback function for processing
@@ -28,11 +32,28 @@ class AidaParserUI:
         # Variables for tracking progress
         self.progress_var = ttk.DoubleVar()
         self.status_var = StringVar(value="Готов к работе")
+        self.stats_var = StringVar()
+
+        # Progress channel of the current run (None when idle)
+        self.channel = None
+        self.rate_meter = None
+        self.processing = False
 
         # Input/output path variables
         self.input_dir_var = StringVar()
         self.output_file_var = StringVar()
 
+        # Processing options
+        self.workers_var = ttk.IntVar(value=os.cpu_count() or 1)
+        self.streaming_var = ttk.BooleanVar(value=False)
+        # The combobox shows labels: parsers whose rows may differ from bs4 carry a note
+        self.backend_names = {backend_label(name): name for name in (AUTO_BACKEND, *BACKENDS)}
+        self.backend_var = StringVar(value=backend_label(backend))
+        self.cache_var = ttk.BooleanVar(value=True)
+        self.dedup_var = ttk.BooleanVar(value=True)
+        self.inventory_var = ttk.BooleanVar(value=True)
+        self.journal_var = ttk.BooleanVar(value=True)
+
         # Create UI
         self.create_ui()
 
@@ -87,6 +108,69 @@ class AidaParserUI:
         # Configure grid
         dir_frame.columnconfigure(1, weight=1)
 
+        # Options section
+        options_frame = ttk.LabelFrame(main_frame, text="Параметры", padding=10)
+        options_frame.pack(fill=X, pady=10)
+
+        workers_label = ttk.Label(options_frame, text="Процессов для обработки:")
+        workers_label.grid(row=0, column=0, sticky=W, pady=5)
+
+        workers_spinbox = ttk.Spinbox(
+            options_frame,
+            from_=1,
+            to=max(os.cpu_count() or 1, 1) * 2,
+            textvariable=self.workers_var,
+            width=5
+        )
+        workers_spinbox.grid(row=0, column=1, sticky=W, padx=5, pady=5)
+
+        streaming_check = ttk.Checkbutton(
+            options_frame,
+            text="Потоковый разбор (экономия памяти)",
+            variable=self.streaming_var
+        )
+        streaming_check.grid(row=1, column=0, columnspan=2, sticky=W, pady=5)
+
+        backend_label = ttk.Label(options_frame, text="HTML-парсер:")
+        backend_label.grid(row=2, column=0, sticky=W, pady=5)
+
+        backend_combobox = ttk.Combobox(
+            options_frame,
+            textvariable=self.backend_var,
+            values=[backend_label(name) for name in (AUTO_BACKEND, *available_backends())],
+            state="readonly",
+            width=38
+        )
+        backend_combobox.grid(row=2, column=1, sticky=W, padx=5, pady=5)
+
+        cache_check = ttk.Checkbutton(
+            options_frame,
+            text="Кэшировать результаты разбора (повторный запуск быстрее)",
+            variable=self.cache_var
+        )
+        cache_check.grid(row=3, column=0, columnspan=2, sticky=W, pady=5)
+
+        dedup_check = ttk.Checkbutton(
+            options_frame,
+            text="Пропускать копии отчетов (список на листе \"Дубликаты\")",
+            variable=self.dedup_var
+        )
+        dedup_check.grid(row=4, column=0, columnspan=2, sticky=W, pady=5)
+
+        inventory_check = ttk.Checkbutton(
+            options_frame,
+            text="Сводные листы по ПО (установки, версии, компьютеры без защитного ПО)",
+            variable=self.inventory_var
+        )
+        inventory_check.grid(row=5, column=0, columnspan=2, sticky=W, pady=5)
+
+        journal_check = ttk.Checkbutton(
+            options_frame,
+            text="Продолжать прерванную обработку (без повторного разбора готовых отчетов)",
+            variable=self.journal_var
+        )
+        journal_check.grid(row=6, column=0, columnspan=2, sticky=W, pady=5)
+
         # Instructions section
         info_frame = ttk.LabelFrame(main_frame, text="Информация", padding=10)
         info_frame.pack(fill=X, pady=10)
@@ -108,15 +192,28 @@ class AidaParserUI:
         )
         info_label.pack(fill=X, padx=5, pady=5)
 
-        # Process button
-        process_button = ttk.Button(
-            main_frame,
+        # Process and cancel buttons
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.pack(pady=20)
+
+        self.process_button = ttk.Button(
+            buttons_frame,
             text="Начать обработку",
             command=self.start_processing,
             bootstyle="success",
             width=20
         )
-        process_button.pack(pady=20)
+        self.process_button.pack(side=LEFT, padx=5)
+
+        self.cancel_button = ttk.Button(
+            buttons_frame,
+            text="Отмена",
+            command=self.cancel_processing,
+            bootstyle="danger",
+            width=12,
+            state=DISABLED
+        )
+        self.cancel_button.pack(side=LEFT, padx=5)
 
         # Status bar
         status_frame = ttk.Frame(main_frame)
@@ -139,6 +236,14 @@ class AidaParserUI:
         )
         status_label.pack(side=LEFT, padx=5)
 
+        # Rate, ETA and error count
+        stats_label = ttk.Label(
+            status_frame,
+            textvariable=self.stats_var,
+            font=("Arial", 10)
+        )
+        stats_label.pack(side=RIGHT, padx=5)
+
     def select_input_dir(self):
         """Opens file dialog to select input directory."""
         directory = filedialog.askdirectory(title="Выберите директорию с отчетами AIDA64")
@@ -185,51 +290,124 @@ class AidaParserUI:
             messagebox.showerror("Ошибка", f"Невозможно создать файл отчета: {e}")
             return
 
+        try:
+            workers = max(1, self.workers_var.get())
+        except tk.TclError:
+            messagebox.showerror("Ошибка", "Укажите корректное количество процессов")
+            return
+
+        cache_path = default_cache_path(output_file) if self.cache_var.get() else None
+        # The journal is kept after a cancel or crash, the next run with the same output resumes from it
+        journal_file = default_journal_path(output_file) if self.journal_var.get() else None
+
         # Reset progress
         self.progress_var.set(0)
         self.status_var.set("Подготовка к обработке...")
+        self.stats_var.set("")
+
+        # Workers post progress to the channel, the UI polls it at a fixed frame rate
+        self.channel = ProgressChannel()
+        self.rate_meter = RateMeter()
+        self.processing = True
+        self.process_button.configure(state=DISABLED)
+        self.cancel_button.configure(state=NORMAL)
 
         # Start processing in a separate thread
         threading.Thread(
             target=self.process_thread,
-            args=(input_dir, output_file),
+            args=(self.channel, input_dir, output_file, workers, self.streaming_var.get(),
+                  self.backend_names.get(self.backend_var.get(), AUTO_BACKEND),
+                  cache_path, self.dedup_var.get(), self.inventory_var.get(), journal_file),
             daemon=True
         ).start()
 
-    def process_thread(self, input_dir, output_file):
+        self.root.after(1000 // PROGRESS_FPS, self.poll_progress)
+
+    def process_thread(self, channel, input_dir, output_file, workers, streaming, backend, cache_path, deduplicate,
+                       inventory, journal_file):
         """Processing thread to avoid UI freezing."""
         try:
-            # Call the callback with a progress update function
+            # Progress goes through the channel: the thread never touches Tk widgets
             self.process_callback(
                 input_dir,
                 output_file,
-                self.update_progress
+                channel.post,
+                workers=workers,
+                streaming=streaming,
+                backend=backend,
+                cache_path=cache_path,
+                deduplicate=deduplicate,
+                inventory=inventory,
+                journal_file=journal_file,
+                cancel_event=channel.cancel_event
             )
             # Processing completed successfully
             self.root.after(0, lambda: self.complete_processing(True))
         except Exception as e:
+            if channel.cancelled:
+                logging.info(f"Processing cancelled: {e}")
+                self.root.after(0, lambda: self.complete_processing(False, cancelled=True))
+                return
             logging.error(f"Error processing files: {e}", exc_info=True)
-            # Processing failed
-            self.root.after(0, lambda: self.complete_processing(False, str(e)))
-
-    def update_progress(self, current, total, message=None):
-        """Updates progress bar and status message."""
-        progress = (current / total) * 100 if total > 0 else 0
+            # Processing failed (e is unbound after the except block, so pass the text)
+            error_message = str(e)
+            self.root.after(0, lambda: self.complete_processing(False, error_message))
+
+    def cancel_processing(self):
+        """Asks the processing thread to stop after the current file."""
+        if self.channel is not None and self.processing:
+            self.channel.cancel()
+            self.cancel_button.configure(state=DISABLED)
+            self.status_var.set("Остановка обработки...")
+
+    def poll_progress(self):
+        """Shows the latest progress state; runs at PROGRESS_FPS while processing."""
+        if self.channel is None:
+            return
 
-        def update_ui():
-            self.progress_var.set(progress)
-            if message:
-                self.status_var.set(message)
-            else:
-                self.status_var.set(f"Обработано {current} из {total} файлов ({int(progress)}%)")
+        state = self.channel.drain()
+        if state is not None:
+            self.update_progress(*state)
 
-        self.root.after(0, update_ui)
+        if self.processing:
+            self.root.after(1000 // PROGRESS_FPS, self.poll_progress)
 
-    def complete_processing(self, success, error_message=None):
+    def update_progress(self, current, total, message=None, errors=0):
+        """Updates progress bar, status message, rate, ETA and error count."""
+        progress = (current / total) * 100 if total > 0 else 0
+        self.progress_var.set(progress)
+
+        # While stopping, keep the "stopping" message
+        if self.channel is None or not self.channel.cancelled:
+            self.status_var.set(message or f"Обработано {current} из {total} файлов ({int(progress)}%)")
+
+        self.rate_meter.update(current)
+        stats = []
+        rate = self.rate_meter.rate
+        if rate is not None:
+            stats.append(f"{rate:.1f} файлов/с")
+        eta = self.rate_meter.eta(current, total)
+        if eta is not None:
+            stats.append(f"осталось {format_duration(eta)}")
+        stats.append(f"ошибок: {errors}")
+        self.stats_var.set(" · ".join(stats))
+
+    def complete_processing(self, success, error_message=None, cancelled=False):
         """Updates UI after processing is complete."""
+        # Show the final state before the channel is dropped
+        self.processing = False
+        state = self.channel.drain() if self.channel is not None else None
+        if state is not None and not cancelled:
+            self.update_progress(*state)
+        self.channel = None
+        self.process_button.configure(state=NORMAL)
+        self.cancel_button.configure(state=DISABLED)
+
         if success:
             self.status_var.set("Обработка завершена успешно")
             messagebox.showinfo("Успех", f"Отчет успешно сохранен:\n{self.output_file_var.get()}")
+        elif cancelled:
+            self.status_var.set("Обработка отменена")
         else:
             self.status_var.set("Ошибка при обработке")
             messagebox.showerror("Ошибка", f"Не удалось обработать файлы:\n{error_message}")